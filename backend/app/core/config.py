@@ -24,6 +24,14 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET_FILE: Optional[str] = None  # Path to OAuth client secret JSON file
     GOOGLE_CLIENT_ID: str = ""  # For OAuth verification (set in .env)
     GOOGLE_CLIENT_SECRET: str = ""  # Google OAuth client secret (set in .env)
+    CALENDAR_BACKEND: str = "google"  # "google" or "fake" (in-memory, for tests)
+
+    # Pre-provisioned Meet link pool
+    MEET_POOL_SIZE: int = 0  # Target number of ready links (0 disables the pool)
+    MEET_POOL_LOW_WATERMARK: int = 5  # Refill immediately below this depth
+    MEET_POOL_BATCH_SIZE: int = 10  # Events created per refill tick
+    MEET_POOL_REFILL_INTERVAL_SECONDS: float = 60.0
+    MEET_POOL_QUIET_HOURS: list = [0, 1, 2, 3, 4, 5]  # UTC hours for topping up to full size
 
     # Email/SMTP Settings
     MAIL_HOST: str = "smtp.hostinger.com"
@@ -37,6 +45,41 @@ class Settings(BaseSettings):
     # Razorpay Settings
     RAZORPAY_KEY_ID: str = ""
     RAZORPAY_KEY_SECRET: str = ""
+    RAZORPAY_API_URL: str = "https://api.razorpay.com/v1"  # Point at razorpay_stub.py for offline runs
+    RAZORPAY_TIMEOUT_SECONDS: float = 10.0
+    RAZORPAY_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    RAZORPAY_MAX_RETRIES: int = 2
+    RAZORPAY_RETRY_BASE_SECONDS: float = 0.25
+    RAZORPAY_MAX_CONNECTIONS: int = 20
+    RAZORPAY_WEBHOOK_SECRET: str = ""  # Set in the Razorpay dashboard when adding the webhook
+
+    RAZORPAY_RECONCILE_INTERVAL_SECONDS: float = 3600.0  # 0 disables the periodic reconciliation
+    RAZORPAY_RECONCILE_LOOKBACK_HOURS: int = 48
+    RAZORPAY_RECONCILE_PAGE_CONCURRENCY: int = 4  # Provider list pages fetched in parallel
+    RAZORPAY_RECONCILE_BATCH_SIZE: int = 1000  # Orders joined per $in lookup
+
+    # Webhook processing
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 2.0
+    WEBHOOK_BATCH_SIZE: int = 200
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+
+    # Idempotency-Key handling for create endpoints
+    IDEMPOTENCY_TTL_HOURS: int = 24  # How long first responses are replayed
+    IDEMPOTENCY_LOCK_SECONDS: float = 30.0  # Lock lifetime for an in-flight request
+    IDEMPOTENCY_WAIT_SECONDS: float = 5.0  # Concurrent duplicates wait this long for the first response
+
+    # WebSocket fan-out across workers
+    WS_BACKPLANE: str = "mongo"  # "mongo" (capped collection, multi-worker) or "memory" (single process, tests)
+    WS_BACKPLANE_COLLECTION: str = "ws_events"
+    WS_BACKPLANE_SIZE_MB: int = 64  # Capped collection size; only recent events are needed
+    WS_SEND_QUEUE_SIZE: int = 100  # Messages buffered per socket before it is evicted
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # A single send taking longer evicts the socket
+
+    # Notifications
+    ANNOUNCEMENT_MAX_AGE_DAYS: int = 30  # Announcements older than this drop out of notification lists
+    ANNOUNCEMENT_CACHE_SECONDS: float = 30.0  # Per-process cache of recent announcements
+    NOTIFICATION_INSERT_CHUNK_SIZE: int = 1000  # Rows per insert_many for targeted broadcasts
+    UNREAD_REPAIR_INTERVAL_SECONDS: float = 3600.0  # Recount of unread counters; 0 disables the job
 
     # MinIO Settings
     MINIO_ENDPOINT: str = "localhost:9000"
@@ -46,6 +89,35 @@ class Settings(BaseSettings):
     MINIO_BUCKET: str = "tutor-images"
     MINIO_PUBLIC_URL: Optional[str] = None  # External URL for accessing images
 
+    # Outbox relay (booking side effects)
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 5.0
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_LEASE_SECONDS: int = 60
+    OUTBOX_CONCURRENCY: int = 8  # Bookings processed in parallel per tick
+    CALENDAR_MAX_CONCURRENCY: int = 4  # Parallel Google Calendar API calls
+
+    # Session reminders
+    REMINDER_OFFSETS_MINUTES: list = [1440, 15]  # Send reminders 24h and 15m before start
+    REMINDER_TICK_SECONDS: float = 30.0
+    REMINDER_WINDOW_MINUTES: int = 60  # How far ahead reminders are loaded into memory
+    REMINDER_RESCAN_SECONDS: float = 120.0  # Re-read the loaded window to pick up late confirmations
+    REMINDER_GRACE_MINUTES: int = 10  # Still send reminders this late
+
+    # Elapsed-session sweeper
+    SWEEPER_INTERVAL_SECONDS: float = 300.0
+    SWEEPER_CHUNK_SIZE: int = 500
+
+    # Admin dashboard stats cache
+    DASHBOARD_STATS_TTL_SECONDS: float = 30.0  # Served without recomputing
+    DASHBOARD_STATS_MAX_STALE_SECONDS: float = 300.0  # Served while refreshing in background
+
+    # Platform settings cache
+    PLATFORM_SETTINGS_POLL_SECONDS: float = 10.0  # How often each worker checks for a newer version
+
+    # Admin exports
+    EXPORT_BATCH_SIZE: int = 1000  # Cursor batch size and rows enriched per lookup
+
     class Config:
         env_file = ".env"
 
@@ -1,9 +1,122 @@
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from app.core.config import settings
 
 client: AsyncIOMotorClient = None
 
+
+async def _dedupe_payments(db) -> None:
+    """
+    Payments used to be created without a unique booking_id, so a booking may
+    have several. Keep the most advanced one per booking and move the others
+    aside (booking_id "<id>#duplicate:<payment id>") so init_beanie can build
+    the unique index the Payment model declares.
+    """
+    payments = db["payments"]
+    indexes = await payments.index_information()
+    if indexes.get("booking_id_1", {}).get("unique"):
+        return
+
+    duplicated = [
+        row["_id"] async for row in payments.aggregate([
+            {"$group": {"_id": "$booking_id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ])
+    ]
+    by_booking: dict = {}
+    async for row in payments.find(
+        {"booking_id": {"$in": duplicated}},
+        projection={"booking_id": 1, "status": 1, "razorpay_order_id": 1, "created_at": 1}
+    ):
+        by_booking.setdefault(row["booking_id"], []).append(row)
+
+    moved = 0
+    for booking_id, rows in by_booking.items():
+        rows.sort(key=lambda row: (
+            row.get("status") not in ("completed", "refunded"),
+            not row.get("razorpay_order_id"),
+            row.get("created_at") or datetime.min
+        ))
+        for row in rows[1:]:
+            await payments.update_one(
+                {"_id": row["_id"]},
+                {"$set": {"booking_id": f"{booking_id}#duplicate:{row['_id']}"}}
+            )
+            moved += 1
+    if moved:
+        print(f"[Database] Moved aside {moved} duplicate payments of {len(by_booking)} bookings")
+
+    if "booking_id_1" in indexes:
+        await payments.drop_index("booking_id_1")  # Rebuilt as unique by init_beanie
+
+
+async def _merge_relations(db) -> None:
+    """
+    Concurrent first bookings could create several relation rows for one
+    student-tutor pair. Fold them into the oldest row (summing the counters
+    and uniting booking_ids) and drop the old non-unique pair index, so
+    init_beanie can build the unique one StudentTutorRelation declares.
+    """
+    relations = db["student_tutor_relations"]
+    indexes = await relations.index_information()
+    if indexes.get("student_id_1_tutor_id_1", {}).get("unique"):
+        return
+
+    duplicated = [
+        row["_id"] async for row in relations.aggregate([
+            {"$group": {"_id": {"student_id": "$student_id", "tutor_id": "$tutor_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ])
+    ]
+    merged = 0
+    for pair in duplicated:
+        rows = await relations.find(pair).to_list(None)
+        rows.sort(key=lambda row: (row.get("first_booking_date") or datetime.min, row["_id"]))
+        keep, extra = rows[0], rows[1:]
+        booking_ids = []
+        for row in rows:
+            booking_ids += [b for b in row.get("booking_ids", []) if b not in booking_ids]
+        await relations.update_one(
+            {"_id": keep["_id"]},
+            {"$set": {
+                "total_bookings": sum(row.get("total_bookings", 1) for row in rows),
+                "total_spent": sum(row.get("total_spent", 0.0) for row in rows),
+                "booking_ids": booking_ids,
+                "updated_at": max(row.get("updated_at") or datetime.min for row in rows)
+            }}
+        )
+        await relations.delete_many({"_id": {"$in": [row["_id"] for row in extra]}})
+        merged += len(extra)
+    if merged:
+        print(f"[Database] Merged {merged} duplicate student-tutor relations into {len(duplicated)}")
+
+    if "student_id_1_tutor_id_1" in indexes:
+        await relations.drop_index("student_id_1_tutor_id_1")  # Rebuilt as unique by init_beanie
+
+
+async def _adopt_legacy_settings(db) -> None:
+    """
+    Settings documents created before the singleton key have none, and
+    several of them would break the unique index on `singleton`. The oldest
+    becomes the singleton (unless one already is); any others get a
+    "legacy-<_id>" key so init_beanie can build the index.
+    """
+    from app.models.platform_settings import SINGLETON_KEY
+
+    collection = db["platform_settings"]
+    legacy = await collection.find({"singleton": None}, projection={"_id": 1}).sort("_id", 1).to_list(None)
+    if not legacy:
+        return
+
+    if not await collection.find_one({"singleton": SINGLETON_KEY}, projection={"_id": 1}):
+        await collection.update_one({"_id": legacy.pop(0)["_id"]}, {"$set": {"singleton": SINGLETON_KEY}})
+    for doc in legacy:
+        await collection.update_one({"_id": doc["_id"]}, {"$set": {"singleton": f"legacy-{doc['_id']}"}})
+    if legacy:
+        print(f"[Database] Set aside {len(legacy)} extra platform settings documents")
+
+
 async def connect_to_mongo():
     global client
     client = AsyncIOMotorClient(settings.MONGODB_URL)
@@ -18,10 +131,21 @@ async def connect_to_mongo():
     from app.models.withdrawal import Withdrawal
     from app.models.material import Material, Assignment, TutorRating
     from app.models.platform_settings import PlatformSettings
+    from app.models.meeting_link import PooledMeetingLink
+    from app.models.worker_lease import WorkerLease
+    from app.models.tutor_balance import TutorBalance
+    from app.models.counter import Counter
+    from app.models.webhook_event import WebhookEvent
+    from app.models.idempotency_key import IdempotencyKey
+    from app.models.announcement import Announcement, AnnouncementReceipt
+
+    await _dedupe_payments(client[settings.DATABASE_NAME])
+    await _merge_relations(client[settings.DATABASE_NAME])
+    await _adopt_legacy_settings(client[settings.DATABASE_NAME])
 
     await init_beanie(
         database=client[settings.DATABASE_NAME],
-        document_models=[User, TutorProfile, Subject, Booking, Review, TutorAvailability, BlockedDate, TimeSlot, Notification, Payment, PlatformRevenue, StudentTutorRelation, Blog, Withdrawal, Material, Assignment, TutorRating, PlatformSettings]
+        document_models=[User, TutorProfile, Subject, Booking, Review, TutorAvailability, BlockedDate, TimeSlot, Notification, Payment, PlatformRevenue, StudentTutorRelation, Blog, Withdrawal, Material, Assignment, TutorRating, PlatformSettings, PooledMeetingLink, WorkerLease, TutorBalance, Counter, WebhookEvent, IdempotencyKey, Announcement, AnnouncementReceipt]
     )
 
 async def close_mongo_connection():
@@ -4,17 +4,48 @@ from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import connect_to_mongo, close_mongo_connection
 from app.routes import api_router
+from app.services.outbox_service import outbox_relay
+from app.services.google_meet import google_meet_service
+from app.services.meeting_link_pool import meeting_link_pool
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.session_sweeper import session_sweeper
+from app.services.platform_settings_cache import platform_settings_cache
+from app.services.razorpay_service import razorpay_service
+from app.services.webhook_processor import webhook_processor
+from app.services.payment_reconciliation import payment_reconciler
+from app.services.websocket_manager import manager
+from app.services.unread_counter import unread_counter_repair
+import asyncio
 import traceback
 
+def get_background_workers() -> list:
+    """Background loops started with the app (leader-only ones elect via MongoDB lease)"""
+    workers = [manager.backplane, platform_settings_cache, outbox_relay, webhook_processor, reminder_scheduler, session_sweeper]
+    if meeting_link_pool.enabled:
+        workers.append(meeting_link_pool)
+    if payment_reconciler.enabled:
+        workers.append(payment_reconciler)
+    if unread_counter_repair.enabled:
+        workers.append(unread_counter_repair)
+    return workers
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    workers = get_background_workers()
     try:
         await connect_to_mongo()
         print("Database connected successfully")
+        for worker in workers:
+            worker.start()
+        # Build the Calendar client off the event loop before the first confirmation
+        asyncio.get_running_loop().run_in_executor(None, google_meet_service.warm_up)
     except Exception as e:
         print(f"Failed to connect to database: {e}")
         traceback.print_exc()
     yield
+    for worker in reversed(workers):
+        await worker.stop()
+    await razorpay_service.close()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -0,0 +1,41 @@
+"""
+Announcement Model - System notifications stored once and read by many users
+"""
+
+from beanie import Document, Indexed
+from pydantic import Field
+from pymongo import IndexModel
+from typing import Optional
+from datetime import datetime
+from app.models.user import UserRole
+
+
+class Announcement(Document):
+    """A broadcast shown in every matching user's notification list (fan-out on read)"""
+    title: str
+    message: str
+    link: Optional[str] = None
+    audience: Optional[UserRole] = None  # None = every user
+    created_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "announcements"
+        indexes = [
+            [("created_at", -1)],
+        ]
+
+
+class AnnouncementReceipt(Document):
+    """Per-user read/dismiss marker; users without one have not read the announcement"""
+    user_id: Indexed(str)
+    announcement_id: str
+    read_at: Optional[datetime] = None
+    hidden: bool = False  # Deleted from the user's list
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "announcement_receipts"
+        indexes = [
+            IndexModel([("user_id", 1), ("announcement_id", 1)], unique=True),
+        ]
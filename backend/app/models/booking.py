@@ -1,8 +1,10 @@
 from beanie import Document, Indexed
-from pydantic import Field
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+from pymongo import IndexModel
+import uuid
 
 class BookingStatus(str, Enum):
     PENDING = "pending"
@@ -14,6 +16,33 @@ class SessionType(str, Enum):
     PRIVATE = "private"
     GROUP = "group"
 
+class BookingEventType(str, Enum):
+    CREATE_PAYMENT = "create_payment"          # Payment record with fee breakdown
+    NOTIFY_NEW_BOOKING = "notify_new_booking"  # In-app notification for the tutor
+    EMAIL_NEW_BOOKING = "email_new_booking"    # New booking email for the tutor
+    CREATE_MEETING = "create_meeting"          # Google Calendar event with Meet link
+    UPDATE_MEETING = "update_meeting"          # Move a pooled event to the session time
+    CANCEL_MEETING = "cancel_meeting"          # Delete the Google Calendar event
+
+
+class OutboxEvent(BaseModel):
+    """
+    Side effect recorded on the booking in the same write as the state change.
+    Processed (at least once) by the outbox relay and removed when done.
+    """
+    event_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    type: BookingEventType
+    payload: dict = Field(default_factory=dict)
+    attempts: int = 0
+    next_attempt_at: Optional[datetime] = Field(default_factory=datetime.utcnow)  # None = dead-lettered
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_document(self) -> dict:
+        """Plain BSON-ready dict, for `$push` onto Booking.outbox."""
+        return {**self.model_dump(), "type": self.type.value}
+
+
 class Booking(Document):
     student_id: Indexed(str)
     tutor_id: Indexed(str)
@@ -38,11 +67,30 @@ class Booking(Document):
     student_email: Optional[str] = None
     tutor_email: Optional[str] = None
 
+    completed_at: Optional[datetime] = None
+    # False from completion until lesson counts and payments are applied (see session_sweeper)
+    completion_applied: Optional[bool] = None
+
+    # Reminder offsets (minutes before start) already sent
+    reminders_sent: List[int] = Field(default_factory=list)
+
+    # Transactional outbox (see app/services/outbox_service.py)
+    outbox: List[OutboxEvent] = Field(default_factory=list)
+    outbox_locked_until: Optional[datetime] = None
+
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "bookings"
+        indexes = [
+            "outbox.next_attempt_at",
+            [("status", 1), ("scheduled_at", 1)],
+            [("student_id", 1), ("scheduled_at", 1)],
+            [("tutor_id", 1), ("scheduled_at", 1)],
+            [("status", 1), ("created_at", -1)],
+            IndexModel([("completion_applied", 1)], partialFilterExpression={"completion_applied": False}),
+        ]
 
 class Review(Document):
     student_id: Indexed(str)
@@ -0,0 +1,17 @@
+"""
+Counter Model - Named counters maintained with $inc
+"""
+
+from beanie import Document, Indexed
+from pydantic import Field
+from datetime import datetime
+
+
+class Counter(Document):
+    """A single integer kept in step with the data it counts"""
+    name: Indexed(str, unique=True)
+    value: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "counters"
@@ -0,0 +1,28 @@
+"""
+Idempotency Key Model - Stored first responses for retried POST requests
+"""
+
+from beanie import Document, Indexed
+from pydantic import Field
+from pymongo import IndexModel
+from typing import Any, Optional
+from datetime import datetime
+
+
+class IdempotencyKey(Document):
+    """One client-supplied Idempotency-Key, scoped to an endpoint and user"""
+    key: Indexed(str, unique=True)  # "<scope>:<user_id>:<Idempotency-Key header>"
+    request_hash: str  # Replays with a different body are rejected
+    completed: bool = False
+    locked_until: Optional[datetime] = None  # A crashed request's lock can be taken over after this
+    owner: Optional[str] = None  # Token of the request holding the lock; only it may store or release
+    status_code: Optional[int] = None
+    response: Optional[Any] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "idempotency_keys"
+        indexes = [
+            IndexModel([("expires_at", 1)], expireAfterSeconds=0),  # TTL
+        ]
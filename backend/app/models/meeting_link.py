@@ -0,0 +1,32 @@
+"""
+Meeting Link Model - Pre-provisioned Google Meet events
+"""
+
+from beanie import Document
+from pydantic import Field
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class MeetingLinkStatus(str, Enum):
+    AVAILABLE = "available"
+    CLAIMED = "claimed"
+
+
+class PooledMeetingLink(Document):
+    """A placeholder calendar event with a ready Meet link, claimed on confirmation"""
+    event_id: str
+    meet_link: str
+    status: MeetingLinkStatus = MeetingLinkStatus.AVAILABLE
+
+    booking_id: Optional[str] = None
+    claimed_at: Optional[datetime] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "meeting_link_pool"
+        indexes = [
+            [("status", 1), ("created_at", 1)],
+        ]
@@ -2,8 +2,9 @@
 Notification Model for real-time notifications
 """
 
-from beanie import Document, Indexed
+from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel
 from typing import Optional, Literal
 from datetime import datetime
 from enum import Enum
@@ -21,7 +22,7 @@ class NotificationType(str, Enum):
 
 
 class Notification(Document):
-    user_id: Indexed(str)  # Recipient user ID
+    user_id: str  # Recipient user ID
     type: NotificationType
     title: str
     message: str
@@ -45,7 +46,7 @@ class Notification(Document):
     class Settings:
         name = "notifications"
         indexes = [
-            "user_id",
-            "is_read",
-            "created_at",
+            # Inbox pages: equality on user (and read state), keyset on (created_at, _id)
+            IndexModel([("user_id", 1), ("is_read", 1), ("created_at", -1), ("_id", -1)]),
+            "is_read",  # Unread recount across users (repair job)
         ]
@@ -1,8 +1,9 @@
 from beanie import Document, Indexed
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
+from pymongo import IndexModel
 
 
 class PaymentStatus(str, Enum):
@@ -19,7 +20,7 @@ class FeeType(str, Enum):
 
 class Payment(Document):
     """Track all payments and platform fees"""
-    booking_id: Indexed(str)
+    booking_id: Indexed(str, unique=True)  # One payment per booking
     student_id: Indexed(str)
     tutor_id: Indexed(str)
 
@@ -44,16 +45,32 @@ class Payment(Document):
     payment_method: str = "razorpay"
 
     # Timestamps
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
+    refunded_at: Optional[datetime] = None
+
+    # Set with a status change, cleared once its rollup and ledger effects are applied
+    effects_pending: Optional[PaymentStatus] = None
+    effects_pending_at: Optional[datetime] = None
 
     class Settings:
         name = "payments"
+        indexes = [
+            [("status", 1), ("completed_at", 1)],
+            "razorpay_order_id",  # Webhook events are matched by gateway ids
+            "razorpay_payment_id",
+        ]
 
 
 class PlatformRevenue(Document):
-    """Track platform revenue summary"""
-    date: Indexed(datetime)  # Daily summary
+    """
+    Daily platform revenue rollup, one row per (date, currency).
+
+    Maintained with $inc upserts when a payment completes or is refunded,
+    bucketed by the payment's completion day. Amounts are net of refunds.
+    """
+    date: datetime  # Midnight UTC of the day
+    currency: str = "INR"
 
     # Revenue breakdown
     total_session_fees: float = 0.0  # Sum of all session amounts
@@ -66,11 +83,20 @@ class PlatformRevenue(Document):
     total_bookings: int = 0
     new_student_bookings: int = 0
 
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    # Refunds of payments completed on this day
+    total_refunds: float = 0.0
+    refunded_bookings: int = 0
+
+    revision: int = 0  # Bumped by every write, so a rebuild can detect concurrent ones
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "platform_revenue"
+        indexes = [
+            IndexModel([("date", 1), ("currency", 1)], unique=True),
+        ]
 
 
 class StudentTutorRelation(Document):
@@ -81,14 +107,15 @@ class StudentTutorRelation(Document):
     first_booking_date: datetime
     total_bookings: int = 1
     total_spent: float = 0.0
+    booking_ids: List[str] = Field(default_factory=list)  # Bookings already counted
 
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "student_tutor_relations"
         indexes = [
-            [("student_id", 1), ("tutor_id", 1)],  # Compound index
+            IndexModel([("student_id", 1), ("tutor_id", 1)], unique=True),  # One relation per pair
         ]
 
 
@@ -114,6 +141,8 @@ class PaymentResponse(BaseModel):
 
 class RevenueStats(BaseModel):
     """Revenue statistics for admin dashboard"""
+    currency: str = "INR"
+
     # Overall totals
     total_revenue: float
     total_admission_fees: float
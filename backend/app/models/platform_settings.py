@@ -4,12 +4,18 @@ Platform Settings Model - Configurable platform-wide settings
 
 from datetime import datetime
 from typing import Optional
-from beanie import Document
+from beanie import Document, Indexed
 from pydantic import Field
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+SINGLETON_KEY = "global"
 
 
 class PlatformSettings(Document):
     """Singleton document for platform-wide settings"""
+    singleton: Indexed(str, unique=True) = SINGLETON_KEY
+    version: int = 0  # Bumped on every update so other workers can detect changes
     minimum_withdrawal_amount: float = 10.0
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     updated_by: Optional[str] = None
@@ -19,9 +25,17 @@ class PlatformSettings(Document):
 
     @classmethod
     async def get_or_create(cls) -> "PlatformSettings":
-        """Get the platform settings (creates default if none exist)"""
-        settings = await cls.find_one()
-        if not settings:
-            settings = cls()
-            await settings.insert()
-        return settings
+        """Get the platform settings (atomically creates defaults if none exist)"""
+        collection = cls.get_motor_collection()
+        defaults = cls().model_dump(by_alias=True, exclude={"id", "singleton"})
+        try:
+            doc = await collection.find_one_and_update(
+                {"singleton": SINGLETON_KEY},
+                {"$setOnInsert": defaults},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lost the insert race; the winner's document is there now
+            doc = await collection.find_one({"singleton": SINGLETON_KEY})
+        return cls.model_validate(doc)
@@ -0,0 +1,29 @@
+"""
+Tutor Balance Model - Running per-tutor earnings ledger
+"""
+
+from beanie import Document, Indexed
+from pydantic import Field
+from datetime import datetime
+
+
+class TutorBalance(Document):
+    """
+    Materialised balance of one tutor, keyed by TutorProfile id.
+
+    Every amount is in exactly one bucket: `available`, `pending_withdrawals`
+    (requested or approved, i.e. reserved) or `withdrawn_amount`. Buckets are
+    only changed with $inc, so total_earnings == sum of the three.
+    """
+    tutor_id: Indexed(str, unique=True)
+    currency: str = "INR"
+
+    total_earnings: float = 0.0  # Completed payments net of refunds
+    available: float = 0.0
+    pending_withdrawals: float = 0.0
+    withdrawn_amount: float = 0.0
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "tutor_balances"
@@ -24,6 +24,9 @@ class User(Document):
 
     class Settings:
         name = "users"
+        indexes = [
+            [("role", 1), ("created_at", -1)],
+        ]
 
     class Config:
         json_schema_extra = {
@@ -0,0 +1,36 @@
+"""
+Webhook Event Model - Raw payment gateway events awaiting processing
+"""
+
+from beanie import Document, Indexed
+from pydantic import Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class WebhookEventStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSED = "processed"
+    IGNORED = "ignored"  # Event type we do not act on, or still no matching payment after WEBHOOK_MAX_ATTEMPTS
+    FAILED = "failed"  # Gave up after WEBHOOK_MAX_ATTEMPTS
+
+
+class WebhookEvent(Document):
+    """One delivered webhook, stored once per gateway event id"""
+    event_id: Indexed(str, unique=True)
+    source: str = "razorpay"
+    event: str  # e.g. "payment.captured"
+    payload: Dict[str, Any] = {}
+    status: WebhookEventStatus = WebhookEventStatus.PENDING
+    attempts: int = 0
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None  # Retry backoff; None = due now
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+    processed_at: Optional[datetime] = None
+
+    class Settings:
+        name = "webhook_events"
+        indexes = [
+            [("status", 1), ("received_at", 1)],
+        ]
@@ -55,3 +55,7 @@ class Withdrawal(Document):
 
     class Settings:
         name = "withdrawals"
+        indexes = [
+            [("status", 1), ("created_at", -1), ("_id", -1)],
+            [("created_at", -1), ("_id", -1)],
+        ]
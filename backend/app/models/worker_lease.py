@@ -0,0 +1,17 @@
+"""
+Worker Lease Model - Cross-worker leader election for background jobs
+"""
+
+from beanie import Document, Indexed
+from datetime import datetime
+
+
+class WorkerLease(Document):
+    """Time-bound lease; the holder is the only process running the named job"""
+    name: Indexed(str, unique=True)
+    holder: str
+    expires_at: datetime
+    acquired_at: datetime
+
+    class Settings:
+        name = "worker_leases"
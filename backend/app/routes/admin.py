@@ -2,20 +2,43 @@
 Admin Routes - Manage users, tutors, and bookings
 """
 
+import asyncio
+import json
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from app.models.user import User, UserRole
 from app.models.tutor import TutorProfile
-from app.models.booking import Booking
-from app.models.payment import Payment, PaymentStatus
+from app.models.booking import Booking, BookingStatus
+from app.models.payment import Payment, PaymentStatus, RevenueStats
 from app.routes.auth import get_current_user
+from app.core.config import settings
 from app.services.notification_service import notification_service
-from app.services.payment_service import payment_service, COMMISSION_RATE, ADMISSION_RATE
+from app.services.payment_service import payment_service, COMMISSION_RATE, ADMISSION_RATE, TUTOR_EARNINGS_SORT_FIELDS
+from app.services.entity_loader import RequestLoaders, get_loaders
+from app.services.dashboard_stats import dashboard_stats
+from app.services.revenue_rollup import revenue_rollup, DAY, WEEK, MONTH
+from app.services.platform_settings_cache import platform_settings_cache
+from app.services.payment_reconciliation import payment_reconciler
+from app.services.announcement_service import announcement_service
+from app.services.razorpay_service import RazorpayError
+from app.services.export_service import EXPORTS, CSV, NDJSON, stream_export
+from app.services.session_sweeper import complete_bookings
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+# Upper bound on buckets returned by the revenue time series
+MAX_TIMESERIES_POINTS = 5000
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Query datetimes may carry an offset; stored datetimes are naive UTC."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 
 # --- Schemas ---
 class UserResponse(BaseModel):
@@ -93,49 +116,8 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
 async def get_dashboard_stats(admin: User = Depends(get_admin_user)):
     """Get overall dashboard statistics"""
     try:
-        now = datetime.utcnow()
-        week_ago = now - timedelta(days=7)
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        # Count users
-        total_users = await User.count()
-        all_users = await User.find_all().to_list()
-        total_students = len([u for u in all_users if (u.role.value if hasattr(u.role, 'value') else u.role) == 'student'])
-        total_tutors = len([u for u in all_users if (u.role.value if hasattr(u.role, 'value') else u.role) == 'tutor'])
-
-        # Count bookings - use simple approach
-        all_bookings_list = await Booking.find_all().to_list()
-        total_bookings = len(all_bookings_list)
-        pending_bookings = len([b for b in all_bookings_list if b.status == "pending"])
-        confirmed_bookings = len([b for b in all_bookings_list if b.status == "confirmed"])
-        completed_bookings = len([b for b in all_bookings_list if b.status == "completed"])
-        cancelled_bookings = len([b for b in all_bookings_list if b.status == "cancelled"])
-
-        # Revenue calculations
-        paid_bookings = [b for b in all_bookings_list if b.status in ["confirmed", "completed"]]
-        revenue_total = sum(b.price for b in paid_bookings)
-
-        month_bookings = [b for b in paid_bookings if b.created_at >= month_start]
-        revenue_this_month = sum(b.price for b in month_bookings)
-
-        # New this week
-        new_users_this_week = len([u for u in all_users if u.created_at >= week_ago])
-        new_bookings_this_week = len([b for b in all_bookings_list if b.created_at >= week_ago])
-
-        return DashboardStats(
-            total_users=total_users,
-            total_students=total_students,
-            total_tutors=total_tutors,
-            total_bookings=total_bookings,
-            pending_bookings=pending_bookings,
-            confirmed_bookings=confirmed_bookings,
-            completed_bookings=completed_bookings,
-            cancelled_bookings=cancelled_bookings,
-            revenue_total=revenue_total,
-            revenue_this_month=revenue_this_month,
-            new_users_this_week=new_users_this_week,
-            new_bookings_this_week=new_bookings_this_week
-        )
+        stats = await dashboard_stats.get_stats()
+        return DashboardStats(**stats)
     except Exception as e:
         print(f"Error in get_dashboard_stats: {e}")
         import traceback
@@ -365,7 +347,8 @@ async def get_all_bookings(
     search: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    admin: User = Depends(get_admin_user)
+    admin: User = Depends(get_admin_user),
+    loaders: RequestLoaders = Depends(get_loaders)
 ):
     """Get all bookings"""
     query = Booking.find()
@@ -375,11 +358,17 @@ async def get_all_bookings(
 
     bookings = await query.sort(-Booking.created_at).skip(skip).limit(limit).to_list()
 
+    # Batch related lookups: one query per collection for the whole page
+    tutor_profiles = await loaders.tutors.load_many(b.tutor_id for b in bookings)
+    await loaders.users.load_many(
+        [b.student_id for b in bookings] + [t.user_id for t in tutor_profiles if t]
+    )
+
     result = []
     for b in bookings:
-        student = await User.get(b.student_id)
-        tutor_profile = await TutorProfile.get(b.tutor_id)
-        tutor_user = await User.get(tutor_profile.user_id) if tutor_profile else None
+        student = await loaders.users.load(b.student_id)
+        tutor_profile = await loaders.tutors.load(b.tutor_id)
+        tutor_user = await loaders.users.load(tutor_profile.user_id) if tutor_profile else None
 
         if search:
             search_lower = search.lower()
@@ -419,9 +408,15 @@ async def update_booking_status(
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    booking.status = status
-    booking.updated_at = datetime.utcnow()
-    await booking.save()
+    if status == BookingStatus.COMPLETED.value:
+        # Same path as the sweeper, so lesson counts and payments follow
+        others = [s for s in BookingStatus if s != BookingStatus.COMPLETED]
+        await complete_bookings([booking.id], others)
+    else:
+        await Booking.get_motor_collection().update_one(
+            {"_id": booking.id},
+            {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+        )
 
     return {"message": f"Booking status updated to {status}"}
 
@@ -439,6 +434,7 @@ async def delete_booking(booking_id: str, admin: User = Depends(get_admin_user))
 
 # --- Revenue Management ---
 class RevenueStatsResponse(BaseModel):
+    currency: str = "INR"
     total_revenue: float
     total_admission_fees: float
     total_commission_fees: float
@@ -453,6 +449,7 @@ class RevenueStatsResponse(BaseModel):
     weekly_bookings: int
     commission_rate: float
     admission_rate: float
+    by_currency: List[RevenueStats] = []  # Every currency; the fields above repeat the first
 
 
 class PaymentResponse(BaseModel):
@@ -485,11 +482,19 @@ class TutorEarningsResponse(BaseModel):
 
 
 @router.get("/revenue/stats", response_model=RevenueStatsResponse)
-async def get_revenue_stats(admin: User = Depends(get_admin_user)):
-    """Get platform revenue statistics"""
+async def get_revenue_stats(
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Get platform revenue statistics. Top-level fields are for `currency`, or
+    for the currency with the most revenue; by_currency lists every currency.
+    """
     try:
-        stats = await payment_service.get_revenue_stats()
+        all_stats = await payment_service.get_revenue_stats(currency.upper() if currency else None)
+        stats = all_stats[0]
         return RevenueStatsResponse(
+            currency=stats.currency,
             total_revenue=stats.total_revenue,
             total_admission_fees=stats.total_admission_fees,
             total_commission_fees=stats.total_commission_fees,
@@ -503,7 +508,8 @@ async def get_revenue_stats(admin: User = Depends(get_admin_user)):
             weekly_revenue=stats.weekly_revenue,
             weekly_bookings=stats.weekly_bookings,
             commission_rate=COMMISSION_RATE * 100,
-            admission_rate=ADMISSION_RATE * 100
+            admission_rate=ADMISSION_RATE * 100,
+            by_currency=all_stats
         )
     except Exception as e:
         print(f"Error getting revenue stats: {e}")
@@ -512,22 +518,97 @@ async def get_revenue_stats(admin: User = Depends(get_admin_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/revenue/rollups/rebuild")
+async def rebuild_revenue_rollups(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    admin: User = Depends(get_admin_user)
+):
+    """Recompute daily revenue rollups from payments (backfill), optionally for [start, end)"""
+    rows = await revenue_rollup.rebuild(start=_utc_naive(start), end=_utc_naive(end))
+    return {"success": True, "rows": rows}
+
+
+@router.post("/payments/reconcile")
+async def reconcile_payments(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    apply: bool = False,
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Compare Razorpay payments created in [start, end] (default: the
+    configured lookback) with ours and report discrepancies. Dry run unless
+    `apply` is set.
+    """
+    end = _utc_naive(end) or datetime.utcnow()
+    start = _utc_naive(start) or end - timedelta(hours=settings.RAZORPAY_RECONCILE_LOOKBACK_HOURS)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    try:
+        return await payment_reconciler.reconcile(start, end, apply=apply)
+    except RazorpayError as e:
+        raise HTTPException(status_code=502, detail=f"Razorpay: {e}")
+
+
+@router.get("/payments/reconcile/last")
+async def get_last_reconciliation(admin: User = Depends(get_admin_user)):
+    """Report of the last reconciliation run in this process"""
+    if payment_reconciler.last_report is None:
+        raise HTTPException(status_code=404, detail="No reconciliation has run yet")
+    return payment_reconciler.last_report
+
+
+@router.get("/revenue/timeseries")
+async def get_revenue_timeseries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query(DAY, pattern=f"^({DAY}|{WEEK}|{MONTH})$"),
+    currency: str = Query("INR", min_length=3, max_length=3),
+    source: str = Query("rollups", pattern="^(rollups|payments)$"),
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Revenue and booking counts per day, week or month as column arrays.
+    Defaults to the last 30 days. `source=payments` aggregates raw payments
+    instead of the daily rollups (e.g. before a backfill).
+    """
+    end = _utc_naive(end) or datetime.utcnow()
+    start = _utc_naive(start) or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    days_per_point = {DAY: 1, WEEK: 7, MONTH: 28}[granularity]
+    if (end - start).days / days_per_point > MAX_TIMESERIES_POINTS:
+        raise HTTPException(status_code=400, detail="Range too large for this granularity")
+
+    return await revenue_rollup.get_timeseries(
+        currency.upper(), start, end, granularity, from_payments=source == "payments"
+    )
+
+
 @router.get("/revenue/payments", response_model=List[PaymentResponse])
 async def get_all_payments(
     status: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    admin: User = Depends(get_admin_user)
+    admin: User = Depends(get_admin_user),
+    loaders: RequestLoaders = Depends(get_loaders)
 ):
     """Get all payment records"""
     try:
         payments = await payment_service.get_all_payments(status=status, skip=skip, limit=limit)
 
+        await asyncio.gather(
+            loaders.users.load_many(p.student_id for p in payments),
+            loaders.tutors.load_many(p.tutor_id for p in payments)
+        )
+
         result = []
         for p in payments:
             # Get student and tutor names
-            student = await User.get(p.student_id)
-            tutor = await TutorProfile.get(p.tutor_id)
+            student = await loaders.users.load(p.student_id)
+            tutor = await loaders.tutors.load(p.tutor_id)
 
             result.append(PaymentResponse(
                 id=str(p.id),
@@ -569,26 +650,16 @@ async def get_payment_breakdown(payment_id: str, admin: User = Depends(get_admin
 async def get_all_tutor_earnings(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    sort_by: str = Query("total_earnings", pattern=f"^({'|'.join(TUTOR_EARNINGS_SORT_FIELDS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
     admin: User = Depends(get_admin_user)
 ):
-    """Get earnings breakdown for all tutors"""
+    """Get earnings breakdown for all tutors, sorted and paginated server-side"""
     try:
-        tutors = await TutorProfile.find_all().skip(skip).limit(limit).to_list()
-
-        result = []
-        for tutor in tutors:
-            earnings = await payment_service.get_tutor_earnings(str(tutor.id))
-            result.append(TutorEarningsResponse(
-                tutor_id=str(tutor.id),
-                tutor_name=tutor.full_name or "Unknown",
-                email=tutor.email or "",
-                total_sessions=earnings["total_sessions"],
-                total_earnings=earnings["total_earnings"],
-                platform_fees_paid=earnings["platform_fees_paid"],
-                pending_earnings=earnings["pending_earnings"]
-            ))
-
-        return result
+        rows = await payment_service.get_tutor_earnings_report(
+            skip=skip, limit=limit, sort_by=sort_by, descending=order == "desc"
+        )
+        return [TutorEarningsResponse(**row) for row in rows]
     except Exception as e:
         print(f"Error getting tutor earnings: {e}")
         import traceback
@@ -596,6 +667,20 @@ async def get_all_tutor_earnings(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/revenue/tutor-earnings/stream")
+async def stream_all_tutor_earnings(
+    sort_by: str = Query("total_earnings", pattern=f"^({'|'.join(TUTOR_EARNINGS_SORT_FIELDS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    admin: User = Depends(get_admin_user)
+):
+    """Stream earnings for every tutor as NDJSON (one object per line), e.g. for payout runs"""
+    async def rows():
+        async for row in payment_service.stream_tutor_earnings(sort_by=sort_by, descending=order == "desc"):
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
 @router.get("/revenue/tutor-earnings/{tutor_id}")
 async def get_tutor_earnings(tutor_id: str, admin: User = Depends(get_admin_user)):
     """Get earnings breakdown for a specific tutor"""
@@ -624,8 +709,7 @@ class PlatformSettingsUpdate(BaseModel):
 @router.get("/settings", response_model=PlatformSettingsResponse)
 async def get_platform_settings(admin: User = Depends(get_admin_user)):
     """Get platform settings"""
-    from app.models.platform_settings import PlatformSettings
-    settings = await PlatformSettings.get_or_create()
+    settings = await platform_settings_cache.get()
     return PlatformSettingsResponse(
         minimum_withdrawal_amount=settings.minimum_withdrawal_amount
     )
@@ -634,18 +718,93 @@ async def get_platform_settings(admin: User = Depends(get_admin_user)):
 @router.put("/settings", response_model=PlatformSettingsResponse)
 async def update_platform_settings(data: PlatformSettingsUpdate, admin: User = Depends(get_admin_user)):
     """Update platform settings"""
-    from app.models.platform_settings import PlatformSettings
-    settings = await PlatformSettings.get_or_create()
-
+    changes = {}
     if data.minimum_withdrawal_amount is not None:
         if data.minimum_withdrawal_amount < 0:
             raise HTTPException(status_code=400, detail="Minimum withdrawal amount cannot be negative")
-        settings.minimum_withdrawal_amount = data.minimum_withdrawal_amount
+        changes["minimum_withdrawal_amount"] = data.minimum_withdrawal_amount
 
-    settings.updated_at = datetime.utcnow()
-    settings.updated_by = str(admin.id)
-    await settings.save()
+    settings = await platform_settings_cache.update(changes, updated_by=str(admin.id))
 
     return PlatformSettingsResponse(
         minimum_withdrawal_amount=settings.minimum_withdrawal_amount
     )
+
+
+# --- Exports ---
+
+@router.get("/export/{kind}")
+async def export_data(
+    kind: str,
+    format: str = Query(CSV, pattern=f"^({CSV}|{NDJSON})$"),
+    gzip: bool = False,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Stream bookings, payments, users or withdrawals as CSV or NDJSON.
+    `status` filters by status (by role for users); start/end filter created_at.
+    """
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {kind}")
+
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}" + (".gz" if gzip else "")
+    media_type = "text/csv" if format == CSV else "application/x-ndjson"
+    return StreamingResponse(
+        stream_export(kind, fmt=format, gzip=gzip, status=status, start=_utc_naive(start), end=_utc_naive(end)),
+        media_type="application/gzip" if gzip else media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# --- Payment Gateway ---
+
+@router.get("/razorpay/metrics")
+async def get_razorpay_metrics(admin: User = Depends(get_admin_user)):
+    """Get Razorpay call counts, retries and latency percentiles for this worker"""
+    from app.services.razorpay_service import razorpay_service
+    return razorpay_service.get_metrics()
+
+
+# --- Meeting Link Pool ---
+
+@router.get("/meeting-pool/stats")
+async def get_meeting_pool_stats(admin: User = Depends(get_admin_user)):
+    """Get pre-provisioned Meet link pool depth, refill rate and claim latency"""
+    from app.services.meeting_link_pool import meeting_link_pool
+    return await meeting_link_pool.get_stats()
+
+
+# ============ ANNOUNCEMENTS ============
+
+class AnnouncementCreate(BaseModel):
+    title: str
+    message: str
+    link: Optional[str] = None
+    audience: Optional[UserRole] = None  # None = every user
+    user_ids: Optional[List[str]] = None  # Targeted list instead of an audience
+
+
+@router.post("/announcements")
+async def create_announcement(data: AnnouncementCreate, admin: User = Depends(get_admin_user)):
+    """
+    Send a system notification. Without user_ids it is stored once as an
+    announcement for the whole audience; with user_ids a notification is
+    written for each listed user.
+    """
+    if data.user_ids:
+        notifications = await notification_service.broadcast_system_notification(
+            data.user_ids, title=data.title, message=data.message, link=data.link
+        )
+        return {"success": True, "recipients": len(notifications)}
+
+    announcement = await announcement_service.publish(
+        title=data.title,
+        message=data.message,
+        link=data.link,
+        audience=data.audience,
+        created_by=str(admin.id)
+    )
+    return {"success": True, "announcement_id": str(announcement.id)}
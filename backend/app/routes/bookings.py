@@ -1,15 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Header
 from typing import List, Optional
 from pydantic import BaseModel
-from app.models.booking import Booking, Review, BookingStatus
+from app.models.booking import Booking, Review, BookingStatus, BookingEventType, OutboxEvent
 from app.models.tutor import TutorProfile
 from app.models.user import User
-from app.schemas.booking import BookingCreate, BookingUpdate, BookingResponse, ReviewCreate, ReviewResponse
+from app.schemas.booking import BookingCreate, BookingUpdate, BookingResponse, BookingFeedResponse, ReviewCreate, ReviewResponse
 from app.routes.auth import get_current_user
-from app.services.google_meet import google_meet_service
 from app.services.notification_service import notification_service
 from app.services.payment_service import payment_service
+from app.services.outbox_service import outbox_relay
+from app.services.meeting_link_pool import meeting_link_pool
+from app.services.idempotency import idempotency_service
+from app.services.booking_feed import get_booking_feed, get_all_bookings_for, UPCOMING, PAST
 from datetime import datetime
+from pymongo import ReturnDocument
+import uuid
 
 router = APIRouter()
 
@@ -44,9 +49,20 @@ INR_TO_USD_RATE = 0.012
 @router.post("", response_model=BookingResponse)
 async def create_booking(
     booking_data: BookingCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Create a new booking request"""
+    """
+    Create a new booking request.
+    Retries sent with the same Idempotency-Key header return the first response.
+    """
+    return await idempotency_service.run(
+        "bookings:create", str(current_user.id), idempotency_key, booking_data,
+        lambda: _create_booking(booking_data, current_user)
+    )
+
+
+async def _create_booking(booking_data: BookingCreate, current_user: User) -> BookingResponse:
     tutor = await TutorProfile.get(booking_data.tutor_id)
     if not tutor:
         raise HTTPException(status_code=404, detail="Tutor not found")
@@ -80,52 +96,67 @@ async def create_booking(
         student_name=current_user.full_name,
         tutor_name=tutor.full_name,
         student_email=current_user.email,
-        tutor_email=tutor.email
+        tutor_email=tutor.email,
+        # Payment record and tutor notifications are delivered by the outbox relay
+        outbox=[
+            OutboxEvent(type=BookingEventType.CREATE_PAYMENT),
+            OutboxEvent(type=BookingEventType.NOTIFY_NEW_BOOKING, payload={"tutor_user_id": tutor.user_id}),
+            OutboxEvent(type=BookingEventType.EMAIL_NEW_BOOKING, payload={"tutor_user_id": tutor.user_id})
+        ]
     )
     await booking.insert()
-
-    # Create payment record with fee calculation
-    try:
-        payment = await payment_service.create_payment(
-            booking_id=str(booking.id),
-            student_id=str(current_user.id),
-            tutor_id=booking_data.tutor_id,
-            session_amount=session_price,
-            currency=booking_data.currency
-        )
-        print(f"[Payment] Created payment {payment.id} - Commission: {payment.commission_fee}, Admission: {payment.admission_fee}")
-    except Exception as e:
-        print(f"[Payment] Failed to create payment record: {e}")
-
-    # Send notification to tutor
-    try:
-        await notification_service.notify_new_booking(
-            tutor_user_id=tutor.user_id,
-            student_name=current_user.full_name,
-            student_id=str(current_user.id),
-            subject=booking.subject,
-            booking_id=str(booking.id),
-            scheduled_at=booking.scheduled_at
-        )
-    except Exception as e:
-        print(f"Failed to send booking notification: {e}")
+    outbox_relay.wake()
 
     return create_booking_response(booking)
 
 
 @router.get("", response_model=List[BookingResponse])
-async def get_my_bookings(current_user: User = Depends(get_current_user)):
-    """Get all bookings for the current user (as student or tutor)"""
-    bookings = await Booking.find(
-        {"$or": [
-            {"student_id": str(current_user.id)},
-            {"tutor_id": str(current_user.id)}
-        ]}
-    ).sort("-created_at").to_list()
+async def get_my_bookings(
+    limit: int = Query(200, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the current user's bookings (as student or tutor), latest scheduled
+    first, up to `limit`. Use /feed to page through a full history.
+    """
+    user_id = str(current_user.id)
+    bookings = await get_all_bookings_for([("student_id", user_id), ("tutor_id", user_id)], limit)
 
     return [create_booking_response(b) for b in bookings]
 
 
+@router.get("/feed", response_model=BookingFeedResponse)
+async def get_booking_feed_page(
+    role: str = Query("student", pattern="^(student|tutor)$"),
+    window: str = Query(UPCOMING, pattern=f"^({UPCOMING}|{PAST})$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a page of upcoming (soonest first) or past (most recent first) bookings.
+    Pass the returned next_cursor to fetch the following page.
+    """
+    user_id = str(current_user.id)
+    if role == "tutor":
+        tutor = await TutorProfile.find_one(TutorProfile.user_id == user_id)
+        if not tutor:
+            raise HTTPException(status_code=404, detail="Tutor profile not found")
+        sources = [("tutor_id", str(tutor.id))]
+    else:
+        sources = [("student_id", user_id)]
+
+    try:
+        bookings, next_cursor = await get_booking_feed(sources, window=window, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return BookingFeedResponse(
+        bookings=[create_booking_response(b) for b in bookings],
+        next_cursor=next_cursor
+    )
+
+
 @router.put("/{booking_id}", response_model=BookingResponse)
 async def update_booking(
     booking_id: str,
@@ -140,14 +171,19 @@ async def update_booking(
     if booking.student_id != str(current_user.id) and booking.tutor_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    # Targeted $set, so fields written concurrently by the relay and scheduler survive
     update_data = booking_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(booking, field, value)
-    booking.updated_at = datetime.utcnow()
-
-    await booking.save()
+    if update_data.get("status"):
+        update_data["status"] = update_data["status"].value
+    doc = await Booking.get_motor_collection().find_one_and_update(
+        {"_id": booking.id},
+        {"$set": {**update_data, "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Booking not found")
 
-    return create_booking_response(booking)
+    return create_booking_response(Booking.model_validate(doc))
 
 
 @router.post("/{booking_id}/confirm", response_model=BookingResponse)
@@ -156,7 +192,9 @@ async def confirm_booking(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Confirm a booking and generate Google Meet link.
+    Confirm a booking. A pooled Google Meet link is returned immediately when
+    available; otherwise it is generated in the background and delivered over
+    WebSocket (BOOKING_UPDATED) once ready.
     Only the tutor can confirm a booking.
     """
     booking = await Booking.get(booking_id)
@@ -171,25 +209,40 @@ async def confirm_booking(
     if booking.status == BookingStatus.CONFIRMED:
         raise HTTPException(status_code=400, detail="Booking is already confirmed")
 
-    # Create Google Meet event
-    session_type_str = "1-on-1" if booking.session_type.value == "private" else "Group"
-    meet_result = google_meet_service.create_meet_event(
-        title=f"{booking.subject} Tutoring Session - {session_type_str}",
-        description=f"Tutoring session with {booking.tutor_name}\nStudent: {booking.student_name}\nSubject: {booking.subject}\n\nNotes: {booking.notes or 'None'}",
-        start_time=booking.scheduled_at,
-        duration_minutes=booking.duration_minutes,
-        tutor_email=booking.tutor_email,
-        student_email=booking.student_email
-    )
-
-    # Update booking with Meet link
-    booking.status = BookingStatus.CONFIRMED
-    if meet_result:
-        booking.meeting_link = meet_result.get('meet_link')
-        booking.google_event_id = meet_result.get('event_id')
-    booking.updated_at = datetime.utcnow()
+    changes = {"status": BookingStatus.CONFIRMED.value, "updated_at": datetime.utcnow()}
+
+    # Use a pre-provisioned Meet link if available; its time and attendees are
+    # patched in the background. Otherwise the link is created off the request
+    # path and pushed to both parties when ready.
+    pooled_link = await meeting_link_pool.claim(str(booking.id))
+    if pooled_link:
+        changes["meeting_link"] = pooled_link.meet_link
+        changes["google_event_id"] = pooled_link.event_id
+        event = OutboxEvent(
+            type=BookingEventType.UPDATE_MEETING,
+            payload={"google_event_id": pooled_link.event_id}
+        )
+    else:
+        event = OutboxEvent(
+            type=BookingEventType.CREATE_MEETING,
+            payload={
+                "tutor_user_id": str(current_user.id),
+                "calendar_event_id": uuid.uuid4().hex
+            }
+        )
 
-    await booking.save()
+    # Status flip and outbox event in one conditional write
+    doc = await Booking.get_motor_collection().find_one_and_update(
+        {"_id": booking.id, "status": {"$ne": BookingStatus.CONFIRMED.value}},
+        {"$set": changes, "$push": {"outbox": event.to_document()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        if pooled_link:
+            await meeting_link_pool.release(pooled_link)
+        raise HTTPException(status_code=400, detail="Booking is already confirmed")
+    booking = Booking.model_validate(doc)
+    outbox_relay.wake()
 
     # Complete the payment when booking is confirmed
     try:
@@ -240,12 +293,15 @@ async def update_meet_link(
     if not tutor or str(tutor.id) != booking.tutor_id:
         raise HTTPException(status_code=403, detail="Only the tutor can update the Meet link")
 
-    booking.meeting_link = data.meeting_link
-    booking.updated_at = datetime.utcnow()
-
-    await booking.save()
+    doc = await Booking.get_motor_collection().find_one_and_update(
+        {"_id": booking.id},
+        {"$set": {"meeting_link": data.meeting_link, "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Booking not found")
 
-    return create_booking_response(booking)
+    return create_booking_response(Booking.model_validate(doc))
 
 
 @router.post("/{booking_id}/cancel", response_model=BookingResponse)
@@ -269,14 +325,37 @@ async def cancel_booking(
     if booking.status == BookingStatus.CANCELLED:
         raise HTTPException(status_code=400, detail="Booking is already cancelled")
 
-    # Cancel Google Calendar event if exists
+    # Status flip and event deletion in one conditional write
+    update: dict = {"$set": {"status": BookingStatus.CANCELLED.value, "updated_at": datetime.utcnow()}}
     if booking.google_event_id:
-        google_meet_service.cancel_event(booking.google_event_id)
-
+        update["$push"] = {"outbox": OutboxEvent(
+            type=BookingEventType.CANCEL_MEETING,
+            payload={"google_event_id": booking.google_event_id}
+        ).to_document()}
+    collection = Booking.get_motor_collection()
+    before = await collection.find_one_and_update(
+        {"_id": booking.id, "status": {"$ne": BookingStatus.CANCELLED.value}},
+        update,
+        return_document=ReturnDocument.BEFORE
+    )
+    if not before:
+        raise HTTPException(status_code=400, detail="Booking is already cancelled")
+    if before.get("google_event_id") and before["google_event_id"] != booking.google_event_id:
+        # The relay attached a Meet event after we read the booking
+        await collection.update_one({"_id": booking.id}, {"$push": {"outbox": OutboxEvent(
+            type=BookingEventType.CANCEL_MEETING,
+            payload={"google_event_id": before["google_event_id"]}
+        ).to_document()}})
+
+    # Drop Meet work that has not run yet (its handlers also skip cancelled bookings)
+    await collection.update_one(
+        {"_id": booking.id},
+        {"$pull": {"outbox": {"type": {"$in": [
+            BookingEventType.CREATE_MEETING.value, BookingEventType.UPDATE_MEETING.value
+        ]}}}}
+    )
+    outbox_relay.wake()
     booking.status = BookingStatus.CANCELLED
-    booking.updated_at = datetime.utcnow()
-
-    await booking.save()
 
     # Send notification to the other party
     try:
@@ -310,28 +389,19 @@ async def cancel_booking(
 
 
 @router.get("/tutor/my-bookings", response_model=List[BookingResponse])
-async def get_tutor_bookings(current_user: User = Depends(get_current_user)):
-    """Get all bookings for the current tutor"""
-    print(f"[TutorBookings] Fetching bookings for user: {current_user.id} ({current_user.email})")
-
+async def get_tutor_bookings(
+    limit: int = Query(200, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the current tutor's bookings, latest scheduled first, up to `limit`.
+    Use /feed?role=tutor to page through a full history.
+    """
     tutor = await TutorProfile.find_one(TutorProfile.user_id == str(current_user.id))
     if not tutor:
-        print(f"[TutorBookings] No tutor profile found for user_id: {current_user.id}")
         raise HTTPException(status_code=404, detail="Tutor profile not found")
 
-    print(f"[TutorBookings] Found tutor profile ID: {tutor.id}")
-
-    bookings = await Booking.find(
-        Booking.tutor_id == str(tutor.id)
-    ).sort("-scheduled_at").to_list()
-
-    print(f"[TutorBookings] Found {len(bookings)} bookings for tutor {tutor.id}")
-
-    # Also check if there are any bookings with different tutor_id format
-    all_bookings = await Booking.find_all().to_list()
-    print(f"[TutorBookings] Total bookings in system: {len(all_bookings)}")
-    for b in all_bookings[:5]:
-        print(f"[TutorBookings] Booking {b.id}: tutor_id={b.tutor_id}, status={b.status}")
+    bookings = await get_all_bookings_for([("tutor_id", str(tutor.id))], limit)
 
     return [create_booking_response(b) for b in bookings]
 
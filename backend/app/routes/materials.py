@@ -6,6 +6,7 @@ from app.models.material import Material, Assignment, TutorRating
 from app.models.user import User
 from app.routes.auth import get_current_user
 from app.services.minio_service import minio_service
+from app.services.entity_loader import RequestLoaders, get_loaders
 
 router = APIRouter()
 
@@ -89,7 +90,10 @@ class BookedStudentResponse(BaseModel):
 
 
 @router.get("/materials/students", response_model=List[BookedStudentResponse])
-async def get_booked_students(current_user: User = Depends(get_current_user)):
+async def get_booked_students(
+    current_user: User = Depends(get_current_user),
+    loaders: RequestLoaders = Depends(get_loaders)
+):
     """Get all students who have booked sessions with this tutor"""
     if current_user.role != "tutor":
         raise HTTPException(status_code=403, detail="Only tutors can access this endpoint")
@@ -108,10 +112,9 @@ async def get_booked_students(current_user: User = Depends(get_current_user)):
     # Get unique student IDs
     student_ids = list(set(b.student_id for b in bookings if b.student_id))
 
-    # Get student details
+    # Get student details in a single batched query
     students = []
-    for student_id in student_ids:
-        student = await User.get(student_id)
+    for student in await loaders.users.load_many(student_ids):
         if student:
             students.append(BookedStudentResponse(
                 id=str(student.id),
@@ -10,9 +10,13 @@ from jose import jwt, JWTError
 
 from app.models.user import User
 from app.models.notification import Notification, NotificationType
+from app.models.announcement import Announcement
 from app.routes.auth import get_current_user
 from app.services.websocket_manager import manager, NotificationPayload
 from app.services.notification_service import notification_service
+from app.services.announcement_service import announcement_service
+from app.services.unread_counter import unread_counters
+from app.services.cursor import encode_cursor, decode_cursor, after_clause
 from app.core.config import settings
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
@@ -35,7 +39,7 @@ class NotificationResponse(BaseModel):
 
 class NotificationListResponse(BaseModel):
     notifications: List[NotificationResponse]
-    total: int
+    next_cursor: Optional[str] = None
     unread_count: int
 
 
@@ -60,6 +64,18 @@ def notification_to_response(n: Notification) -> NotificationResponse:
     )
 
 
+def announcement_to_response(a: Announcement, is_read: bool) -> NotificationResponse:
+    return NotificationResponse(
+        id=str(a.id),
+        type=NotificationType.SYSTEM.value,
+        title=a.title,
+        message=a.message,
+        link=a.link,
+        is_read=is_read,
+        created_at=a.created_at
+    )
+
+
 async def get_user_from_token(token: str) -> Optional[User]:
     """Validate JWT token and return user for WebSocket authentication."""
     try:
@@ -76,54 +92,55 @@ async def get_user_from_token(token: str) -> Optional[User]:
 # --- REST API Endpoints ---
 @router.get("", response_model=NotificationListResponse)
 async def get_notifications(
-    skip: int = Query(0, ge=0),
+    before: Optional[str] = Query(None, description="next_cursor of the previous page"),
     limit: int = Query(20, ge=1, le=100),
     unread_only: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's notifications with pagination."""
+    """
+    Get user's notifications (merged with announcements), newest first.
+    Pass next_cursor as `before` to get the following page.
+    """
     user_id = str(current_user.id)
-
-    # Debug: Print user_id
-    print(f"[Notifications] Fetching for user_id: {user_id}")
-
-    # Build query
-    query = Notification.find(Notification.user_id == user_id)
-    if unread_only:
-        query = query.find(Notification.is_read == False)
-
-    # Get total count
-    total = await query.count()
-
-    # Debug: Print total found
-    print(f"[Notifications] Total found: {total}")
-
-    # Get notifications sorted by created_at desc
-    notifications = await query.sort(-Notification.created_at).skip(skip).limit(limit).to_list()
-
-    # Debug: Check all notifications in DB
-    all_notifications = await Notification.find_all().to_list()
-    print(f"[Notifications] All notifications in DB: {len(all_notifications)}")
-    for n in all_notifications:
-        print(f"  - Notification user_id: {n.user_id}, title: {n.title}")
-
-    # Get unread count
-    unread_count = await Notification.find(
-        Notification.user_id == user_id,
-        Notification.is_read == False
-    ).count()
+    cursor = None
+    if before:
+        try:
+            cursor = decode_cursor(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Both read states are listed explicitly so the (user_id, is_read, created_at, _id)
+    # index serves the sort by merging its two ranges
+    query: dict = {"user_id": user_id, "is_read": False if unread_only else {"$in": [False, True]}}
+    if cursor:
+        query["$or"] = after_clause("created_at", cursor, ascending=False)
+    notifications = await Notification.find(query).sort(
+        [("created_at", -1), ("_id", -1)]
+    ).limit(limit + 1).to_list()
+
+    announcements = await announcement_service.list_for_user(user_id, current_user.role.value, unread_only)
+    if cursor:
+        announcements = [(a, is_read) for a, is_read in announcements if (a.created_at, a.id) < cursor]
+
+    items = [(n.created_at, n.id, notification_to_response(n)) for n in notifications]
+    items += [(a.created_at, a.id, announcement_to_response(a, is_read)) for a, is_read in announcements]
+    items.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    last = items[-1] if items else None
 
     return NotificationListResponse(
-        notifications=[notification_to_response(n) for n in notifications],
-        total=total,
-        unread_count=unread_count
+        notifications=[response for _, _, response in items],
+        next_cursor=encode_cursor(last[0], last[1]) if has_more and last else None,
+        unread_count=await notification_service.get_unread_count(user_id, current_user.role.value)
     )
 
 
 @router.get("/unread-count", response_model=UnreadCountResponse)
 async def get_unread_count(current_user: User = Depends(get_current_user)):
     """Get the count of unread notifications."""
-    count = await notification_service.get_unread_count(str(current_user.id))
+    count = await notification_service.get_unread_count(str(current_user.id), current_user.role.value)
     return UnreadCountResponse(count=count)
 
 
@@ -132,21 +149,31 @@ async def mark_as_read(
     notification_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    """Mark a notification as read."""
+    """Mark a notification (or announcement) as read."""
     notification = await Notification.get(notification_id)
     if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
+        announcement = await announcement_service.get(notification_id)
+        if not announcement or (announcement.audience and announcement.audience != current_user.role):
+            raise HTTPException(status_code=404, detail="Notification not found")
+        if await announcement_service.mark_read(str(current_user.id), notification_id):
+            await notification_service.send_unread_count(
+                str(current_user.id), current_user.role.value, receipts_changed=True
+            )
+        return {"message": "Notification marked as read"}
 
     if notification.user_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    if not notification.is_read:
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-        await notification.save()
+    # Conditional on is_read so concurrent reads decrement the counter once
+    result = await Notification.get_motor_collection().update_one(
+        {"_id": notification.id, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.utcnow()}}
+    )
+    if result.modified_count:
+        await unread_counters.add(str(current_user.id), -1)
 
         # Send updated unread count via WebSocket
-        await notification_service.send_unread_count(str(current_user.id))
+        await notification_service.send_unread_count(str(current_user.id), current_user.role.value)
 
     return {"message": "Notification marked as read"}
 
@@ -157,10 +184,12 @@ async def mark_all_as_read(current_user: User = Depends(get_current_user)):
     user_id = str(current_user.id)
 
     # Update all unread notifications
-    await Notification.find(
-        Notification.user_id == user_id,
-        Notification.is_read == False
-    ).update({"$set": {"is_read": True, "read_at": datetime.utcnow()}})
+    result = await Notification.get_motor_collection().update_many(
+        {"user_id": user_id, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.utcnow()}}
+    )
+    await unread_counters.add(user_id, -result.modified_count)
+    await announcement_service.mark_all_read(user_id, current_user.role.value)
 
     # Send WebSocket update
     payload = NotificationPayload.all_notifications_read()
@@ -174,18 +203,30 @@ async def delete_notification(
     notification_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    """Delete a notification."""
+    """Delete a notification (announcements are dismissed for this user only)."""
     notification = await Notification.get(notification_id)
     if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
+        announcement = await announcement_service.get(notification_id)
+        if not announcement or (announcement.audience and announcement.audience != current_user.role):
+            raise HTTPException(status_code=404, detail="Notification not found")
+        await announcement_service.hide(str(current_user.id), notification_id)
+        await notification_service.send_unread_count(
+            str(current_user.id), current_user.role.value, receipts_changed=True
+        )
+        return {"message": "Notification deleted"}
 
     if notification.user_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    await notification.delete()
+    deleted = await Notification.get_motor_collection().find_one_and_delete(
+        {"_id": notification.id},
+        projection={"is_read": 1}
+    )
+    if deleted and not deleted["is_read"]:
+        await unread_counters.add(str(current_user.id), -1)
 
-    # Send updated unread count via WebSocket
-    await notification_service.send_unread_count(str(current_user.id))
+        # Send updated unread count via WebSocket
+        await notification_service.send_unread_count(str(current_user.id), current_user.role.value)
 
     return {"message": "Notification deleted"}
 
@@ -198,11 +239,13 @@ async def delete_all_notifications(
     """Delete all notifications or only read ones."""
     user_id = str(current_user.id)
 
-    query = Notification.find(Notification.user_id == user_id)
-    if read_only:
-        query = query.find(Notification.is_read == True)
-
-    await query.delete()
+    collection = Notification.get_motor_collection()
+    await collection.delete_many({"user_id": user_id, "is_read": True})
+    await announcement_service.hide_all(user_id, current_user.role.value, read_only=read_only)
+    if not read_only:
+        result = await collection.delete_many({"user_id": user_id, "is_read": False})
+        await unread_counters.add(user_id, -result.deleted_count)
+    await notification_service.send_unread_count(user_id, current_user.role.value, receipts_changed=True)
 
     return {"message": "Notifications deleted"}
 
@@ -232,14 +275,14 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     user_id = str(user.id)
 
     # Connect
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id, user.role.value)
 
     try:
-        # Send connection confirmation
-        await websocket.send_json(NotificationPayload.connection_established(user_id))
+        # Send connection confirmation (through the socket's queue, so writes stay ordered)
+        connection.send(NotificationPayload.connection_established(user_id))
 
         # Send current unread count
-        await notification_service.send_unread_count(user_id)
+        await notification_service.send_unread_count(user_id, user.role.value)
 
         # Keep connection alive and handle incoming messages
         while True:
@@ -249,10 +292,11 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
 
                 # Handle client requests
                 if data.get("type") == "PING":
-                    await websocket.send_json({"type": "PONG", "timestamp": datetime.utcnow().isoformat()})
+                    connection.send({"type": "PONG", "timestamp": datetime.utcnow().isoformat()})
 
                 elif data.get("type") == "GET_UNREAD_COUNT":
-                    await notification_service.send_unread_count(user_id)
+                    count = await notification_service.get_unread_count(user_id, user.role.value)
+                    connection.send(NotificationPayload.unread_count(count))
 
             except Exception as e:
                 # Handle receive errors (usually means client closed connection)
@@ -2,17 +2,24 @@
 Payment Routes - Razorpay Integration
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+import hashlib
+import json
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
 from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
 from typing import Optional
 from datetime import datetime
 from app.models.user import User
 from app.models.booking import Booking
 from app.models.payment import Payment, PaymentStatus
+from app.models.webhook_event import WebhookEvent
 from app.routes.auth import get_current_user
 from app.services.razorpay_service import razorpay_service
 from app.services.payment_service import payment_service
 from app.services.notification_service import notification_service
+from app.services.outbox_service import handle_create_payment
+from app.services.webhook_processor import webhook_processor
+from app.services.idempotency import idempotency_service
 from app.core.config import settings
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
@@ -59,12 +66,22 @@ class PaymentDetailsResponse(BaseModel):
 @router.post("/create-order", response_model=CreateOrderResponse)
 async def create_razorpay_order(
     request: CreateOrderRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Create a Razorpay order for a booking.
     This should be called before initiating the payment.
+    Retries sent with the same Idempotency-Key header return the first order.
     """
+    return await idempotency_service.run(
+        "payments:create-order", str(current_user.id), idempotency_key, request,
+        lambda: _create_razorpay_order(request, current_user),
+        cache_if=lambda response: response.success  # Let clients retry gateway failures
+    )
+
+
+async def _create_razorpay_order(request: CreateOrderRequest, current_user: User) -> CreateOrderResponse:
     # Get the booking
     booking = await Booking.get(request.booking_id)
     if not booking:
@@ -74,8 +91,11 @@ async def create_razorpay_order(
     if booking.student_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # Get or create payment record
+    # Get or create payment record (the outbox relay may not have created it yet)
     payment = await payment_service.get_payment_by_booking(request.booking_id)
+    if not payment:
+        await handle_create_payment(booking, {})
+        payment = await payment_service.get_payment_by_booking(request.booking_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment record not found")
 
@@ -84,7 +104,7 @@ async def create_razorpay_order(
         raise HTTPException(status_code=400, detail="Payment already completed")
 
     # Create Razorpay order
-    order_result = razorpay_service.create_order(
+    order_result = await razorpay_service.create_order(
         amount=payment.session_amount,
         currency=payment.currency,
         receipt=f"booking_{request.booking_id}",
@@ -101,9 +121,14 @@ async def create_razorpay_order(
             error=order_result.get("error", "Failed to create order")
         )
 
-    # Update payment with Razorpay order ID
-    payment.razorpay_order_id = order_result["order_id"]
-    await payment.save()
+    # Attach the order ID only while the payment is still open; a full save of
+    # the copy read before the gateway call could revert a concurrent completion
+    result = await Payment.get_motor_collection().update_one(
+        {"_id": payment.id, "status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.FAILED.value]}},
+        {"$set": {"razorpay_order_id": order_result["order_id"]}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=400, detail="Payment already completed")
 
     return CreateOrderResponse(
         success=True,
@@ -150,33 +175,28 @@ async def verify_razorpay_payment(
     )
 
     if not is_valid:
-        payment.status = PaymentStatus.FAILED
-        await payment.save()
+        await Payment.get_motor_collection().update_one(
+            {"_id": payment.id, "status": PaymentStatus.PENDING.value},
+            {"$set": {"status": PaymentStatus.FAILED.value}}
+        )
         raise HTTPException(status_code=400, detail="Payment verification failed")
 
     # Update payment record
-    payment.razorpay_payment_id = request.razorpay_payment_id
-    payment.razorpay_signature = request.razorpay_signature
-    payment.status = PaymentStatus.COMPLETED
-    payment.completed_at = datetime.utcnow()
-    await payment.save()
+    completed = await payment_service.complete_payment(
+        str(payment.id),
+        razorpay_payment_id=request.razorpay_payment_id,
+        razorpay_signature=request.razorpay_signature
+    )
 
     # Update booking status to indicate payment received
-    booking.payment_status = "paid"
-    await booking.save()
+    await payment_service.set_booking_payment_status([(str(booking.id), "paid")])
 
-    # Send notification to tutor about new paid booking
-    try:
-        await notification_service.notify_new_booking(
-            tutor_user_id=booking.tutor_id,
-            student_name=current_user.full_name,
-            student_id=str(current_user.id),
-            subject=booking.subject,
-            booking_id=str(booking.id),
-            scheduled_at=booking.scheduled_at
-        )
-    except Exception as e:
-        print(f"[Notification] Failed to send: {e}")
+    # Send notification to tutor about new paid booking (unless the webhook completed it first)
+    if completed:
+        try:
+            await notification_service.notify_bookings_paid([str(booking.id)])
+        except Exception as e:
+            print(f"[Notification] Failed to send: {e}")
 
     return {
         "success": True,
@@ -186,6 +206,40 @@ async def verify_razorpay_payment(
     }
 
 
+@router.post("/webhook")
+async def razorpay_webhook(
+    request: Request,
+    x_razorpay_signature: Optional[str] = Header(None),
+    x_razorpay_event_id: Optional[str] = Header(None)
+):
+    """
+    Razorpay webhook receiver. Verifies the signature, stores the raw event
+    once per event id and acknowledges; the webhook processor applies it.
+    """
+    body = await request.body()
+    if not razorpay_service.verify_webhook_signature(body, x_razorpay_signature):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    event = WebhookEvent(
+        # Redeliveries carry the same event id; fall back to the body hash without one
+        event_id=x_razorpay_event_id or hashlib.sha256(body).hexdigest(),
+        event=data.get("event", ""),
+        payload=data.get("payload") or {}
+    )
+    try:
+        await event.insert()
+    except DuplicateKeyError:
+        return {"status": "duplicate"}
+
+    webhook_processor.wake()
+    return {"status": "accepted"}
+
+
 @router.get("/booking/{booking_id}", response_model=PaymentDetailsResponse)
 async def get_payment_details(
     booking_id: str,
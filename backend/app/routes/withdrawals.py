@@ -2,10 +2,11 @@
 Withdrawal Routes - API endpoints for withdrawal management
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 
 from app.models.withdrawal import Withdrawal, WithdrawalStatus, PaymentMethod
 from app.models.payment import Payment, PaymentStatus
@@ -13,9 +14,20 @@ from app.models.booking import Booking
 from app.models.tutor import TutorProfile
 from app.models.user import User
 from app.routes.auth import get_current_user
+from app.services.tutor_ledger import tutor_ledger, WITHDRAWAL_BUCKETS, AVAILABLE, RESERVED
+from app.services.counter_service import counter_service
+from app.services.platform_settings_cache import platform_settings_cache
+from app.services.cursor import encode_cursor, decode_cursor, after_clause
 
 router = APIRouter(prefix="/withdrawals", tags=["Withdrawals"])
 
+# Maintained count of withdrawals in PENDING status
+PENDING_COUNTER = "withdrawals:pending"
+
+
+async def _count_pending() -> int:
+    return await Withdrawal.find({"status": WithdrawalStatus.PENDING}).count()
+
 
 # ============================================
 # Schemas
@@ -67,6 +79,12 @@ class WithdrawalResponse(BaseModel):
     processed_at: Optional[datetime]
 
 
+class WithdrawalPageResponse(BaseModel):
+    """One page of the admin withdrawal queue"""
+    withdrawals: List[WithdrawalResponse]
+    next_cursor: Optional[str] = None
+
+
 class WithdrawalUpdate(BaseModel):
     """Schema for admin updating withdrawal"""
     status: WithdrawalStatus
@@ -109,61 +127,47 @@ async def get_tutor_stats(current_user: User = Depends(get_current_user)):
 
     # Use TutorProfile ID for queries (payments/bookings use TutorProfile ID, not User ID)
     tutor_id = str(tutor_profile.id)
-    user_id = str(current_user.id)  # For withdrawals which use User ID
-
-    # Get all bookings for this tutor
-    bookings = await Booking.find({"tutor_id": tutor_id}).to_list()
-
-    total_sessions = len(bookings)
-    completed_sessions = len([b for b in bookings if b.status == "completed"])
-    pending_sessions = len([b for b in bookings if b.status in ["pending", "confirmed"]])
-    cancelled_sessions = len([b for b in bookings if b.status == "cancelled"])
-
-    # Get all completed payments for this tutor
-    payments = await Payment.find({
-        "tutor_id": tutor_id,
-        "status": PaymentStatus.COMPLETED
-    }).to_list()
-
-    total_earnings = sum(p.tutor_earnings for p in payments)
-    currency = payments[0].currency if payments else "INR"
 
-    # Get withdrawal info (withdrawals use User ID, not TutorProfile ID)
-    withdrawals = await Withdrawal.find({"tutor_id": user_id}).to_list()
+    # Session counts by status
+    status_rows = await Booking.get_motor_collection().aggregate([
+        {"$match": {"tutor_id": tutor_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    sessions_by_status = {row["_id"]: row["count"] for row in status_rows}
 
-    pending_withdrawals = sum(
-        w.amount for w in withdrawals
-        if w.status in [WithdrawalStatus.PENDING, WithdrawalStatus.APPROVED]
-    )
-    withdrawn_amount = sum(
-        w.amount for w in withdrawals
-        if w.status == WithdrawalStatus.COMPLETED
-    )
+    total_sessions = sum(sessions_by_status.values())
+    completed_sessions = sessions_by_status.get("completed", 0)
+    pending_sessions = sessions_by_status.get("pending", 0) + sessions_by_status.get("confirmed", 0)
+    cancelled_sessions = sessions_by_status.get("cancelled", 0)
 
-    available_balance = total_earnings - pending_withdrawals - withdrawn_amount
+    # Earnings and withdrawals come from the tutor's ledger row
+    balance = await tutor_ledger.get_balance(tutor_id)
 
     # This month stats
     now = datetime.utcnow()
     month_start = datetime(now.year, now.month, 1)
 
-    monthly_payments = [p for p in payments if p.created_at >= month_start]
+    monthly_payments = await Payment.find({
+        "tutor_id": tutor_id,
+        "status": PaymentStatus.COMPLETED,
+        "completed_at": {"$gte": month_start}
+    }).to_list()
     monthly_sessions = len(monthly_payments)
     monthly_earnings = sum(p.tutor_earnings for p in monthly_payments)
 
     # Get minimum withdrawal amount from platform settings
-    from app.models.platform_settings import PlatformSettings
-    platform_settings = await PlatformSettings.get_or_create()
+    platform_settings = await platform_settings_cache.get()
 
     return TutorStats(
         total_sessions=total_sessions,
         completed_sessions=completed_sessions,
         pending_sessions=pending_sessions,
         cancelled_sessions=cancelled_sessions,
-        total_earnings=total_earnings,
-        available_balance=max(0, available_balance),
-        pending_withdrawals=pending_withdrawals,
-        withdrawn_amount=withdrawn_amount,
-        currency=currency,
+        total_earnings=round(balance.total_earnings, 2),
+        available_balance=max(0, round(balance.available, 2)),
+        pending_withdrawals=round(balance.pending_withdrawals, 2),
+        withdrawn_amount=round(balance.withdrawn_amount, 2),
+        currency=balance.currency,
         monthly_sessions=monthly_sessions,
         monthly_earnings=monthly_earnings,
         minimum_withdrawal_amount=platform_settings.minimum_withdrawal_amount
@@ -184,32 +188,11 @@ async def request_withdrawal(
     if not tutor_profile:
         raise HTTPException(status_code=404, detail="Tutor profile not found")
 
-    tutor_id = str(tutor_profile.id)  # For payment queries
+    tutor_id = str(tutor_profile.id)  # Ledger key
     user_id = str(current_user.id)  # For withdrawal storage/queries
 
-    # Calculate available balance (payments use TutorProfile ID)
-    payments = await Payment.find({
-        "tutor_id": tutor_id,
-        "status": PaymentStatus.COMPLETED
-    }).to_list()
-    total_earnings = sum(p.tutor_earnings for p in payments)
-
-    # Withdrawals use User ID
-    withdrawals = await Withdrawal.find({"tutor_id": user_id}).to_list()
-    pending_withdrawals = sum(
-        w.amount for w in withdrawals
-        if w.status in [WithdrawalStatus.PENDING, WithdrawalStatus.APPROVED]
-    )
-    withdrawn_amount = sum(
-        w.amount for w in withdrawals
-        if w.status == WithdrawalStatus.COMPLETED
-    )
-
-    available_balance = total_earnings - pending_withdrawals - withdrawn_amount
-
     # Get minimum withdrawal amount from platform settings
-    from app.models.platform_settings import PlatformSettings
-    platform_settings = await PlatformSettings.get_or_create()
+    platform_settings = await platform_settings_cache.get()
     min_amount = platform_settings.minimum_withdrawal_amount
 
     # Validate amount
@@ -222,10 +205,13 @@ async def request_withdrawal(
             detail=f"Minimum withdrawal amount is {min_amount:.2f}"
         )
 
-    if request.amount > available_balance:
+    # Reserve the funds atomically; fails if another request got there first
+    balance = await tutor_ledger.reserve(tutor_id, request.amount)
+    if not balance:
+        current = await tutor_ledger.get_balance(tutor_id)
         raise HTTPException(
             status_code=400,
-            detail=f"Insufficient balance. Available: {available_balance:.2f}"
+            detail=f"Insufficient balance. Available: {max(0, current.available):.2f}"
         )
 
     # Create withdrawal request (store User ID)
@@ -234,13 +220,18 @@ async def request_withdrawal(
         tutor_name=current_user.full_name,
         tutor_email=current_user.email,
         amount=request.amount,
-        currency=payments[0].currency if payments else "INR",
+        currency=balance.currency,
         payment_method=request.payment_method,
         payment_details=request.payment_details,
         status=WithdrawalStatus.PENDING
     )
 
-    await withdrawal.insert()
+    try:
+        await withdrawal.insert()
+    except Exception:
+        await tutor_ledger.move(tutor_id, request.amount, RESERVED, AVAILABLE)
+        raise
+    await counter_service.increment(PENDING_COUNTER, upsert=False)
     return withdrawal_to_response(withdrawal)
 
 
@@ -264,9 +255,14 @@ async def get_my_withdrawals(current_user: User = Depends(get_current_user)):
 @router.get("/admin/all", response_model=List[WithdrawalResponse])
 async def get_all_withdrawals(
     status: Optional[WithdrawalStatus] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all withdrawal requests (admin only)"""
+    """
+    Get up to `limit` withdrawal requests, newest first (admin only). Use
+    /admin/queue to page through them all.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
@@ -274,17 +270,58 @@ async def get_all_withdrawals(
     if status:
         query["status"] = status
 
-    withdrawals = await Withdrawal.find(query).sort("-created_at").to_list()
+    withdrawals = await Withdrawal.find(query).sort("-created_at").skip(skip).limit(limit).to_list()
     return [withdrawal_to_response(w) for w in withdrawals]
 
 
+@router.get("/admin/queue", response_model=WithdrawalPageResponse)
+async def get_withdrawal_queue(
+    status: Optional[WithdrawalStatus] = WithdrawalStatus.PENDING,
+    all_statuses: bool = False,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cursor-paginated withdrawal queue (admin only). Defaults to pending
+    requests, oldest first; `all_statuses` lists every request instead.
+    Pass next_cursor to get the following page.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    ascending = order == "asc"
+    query: dict = {}
+    if status and not all_statuses:
+        query["status"] = status.value
+    if cursor:
+        try:
+            query["$or"] = after_clause("created_at", decode_cursor(cursor), ascending)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    direction = 1 if ascending else -1
+    withdrawals = await Withdrawal.find(query).sort(
+        [("created_at", direction), ("_id", direction)]
+    ).limit(limit + 1).to_list()
+
+    has_more = len(withdrawals) > limit
+    withdrawals = withdrawals[:limit]
+    last = withdrawals[-1] if withdrawals else None
+    return WithdrawalPageResponse(
+        withdrawals=[withdrawal_to_response(w) for w in withdrawals],
+        next_cursor=encode_cursor(last.created_at, last.id) if has_more and last else None
+    )
+
+
 @router.get("/admin/pending-count")
 async def get_pending_count(current_user: User = Depends(get_current_user)):
     """Get count of pending withdrawal requests"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    count = await Withdrawal.find({"status": WithdrawalStatus.PENDING}).count()
+    count = await counter_service.get(PENDING_COUNTER, _count_pending)
     return {"pending_count": count}
 
 
@@ -302,17 +339,42 @@ async def update_withdrawal(
     if not withdrawal:
         raise HTTPException(status_code=404, detail="Withdrawal not found")
 
-    withdrawal.status = update.status
-    withdrawal.admin_notes = update.admin_notes
-    withdrawal.processed_by = str(current_user.id)
-    withdrawal.processed_at = datetime.utcnow()
-    withdrawal.updated_at = datetime.utcnow()
+    # Move the amount to the ledger bucket of the new status
+    source = WITHDRAWAL_BUCKETS[withdrawal.status]
+    target = WITHDRAWAL_BUCKETS[update.status]
+    tutor_profile = await TutorProfile.find_one(TutorProfile.user_id == withdrawal.tutor_id)
+    moved = False
+    if tutor_profile and source != target:
+        if not await tutor_ledger.move(str(tutor_profile.id), withdrawal.amount, source, target):
+            raise HTTPException(status_code=400, detail="Insufficient balance for this withdrawal")
+        moved = True
 
+    now = datetime.utcnow()
+    changes = {
+        "status": update.status.value,
+        "admin_notes": update.admin_notes,
+        "processed_by": str(current_user.id),
+        "processed_at": now,
+        "updated_at": now
+    }
     if update.transaction_id:
-        withdrawal.transaction_id = update.transaction_id
+        changes["transaction_id"] = update.transaction_id
 
-    await withdrawal.save()
-    return withdrawal_to_response(withdrawal)
+    doc = await Withdrawal.get_motor_collection().find_one_and_update(
+        {"_id": withdrawal.id, "status": withdrawal.status.value},
+        {"$set": changes},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        if moved:
+            await tutor_ledger.move(str(tutor_profile.id), withdrawal.amount, target, source)
+        raise HTTPException(status_code=409, detail="Withdrawal was updated by someone else, please retry")
+
+    pending_delta = (update.status == WithdrawalStatus.PENDING) - (withdrawal.status == WithdrawalStatus.PENDING)
+    if pending_delta:
+        await counter_service.increment(PENDING_COUNTER, pending_delta, upsert=False)
+
+    return withdrawal_to_response(Withdrawal.model_validate(doc))
 
 
 @router.get("/admin/stats")
@@ -321,21 +383,27 @@ async def get_withdrawal_stats(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    all_withdrawals = await Withdrawal.find_all().to_list()
-
-    pending = [w for w in all_withdrawals if w.status == WithdrawalStatus.PENDING]
-    approved = [w for w in all_withdrawals if w.status == WithdrawalStatus.APPROVED]
-    completed = [w for w in all_withdrawals if w.status == WithdrawalStatus.COMPLETED]
-    rejected = [w for w in all_withdrawals if w.status == WithdrawalStatus.REJECTED]
-
-    return {
-        "pending_count": len(pending),
-        "pending_amount": sum(w.amount for w in pending),
-        "approved_count": len(approved),
-        "approved_amount": sum(w.amount for w in approved),
-        "completed_count": len(completed),
-        "completed_amount": sum(w.amount for w in completed),
-        "rejected_count": len(rejected),
-        "rejected_amount": sum(w.amount for w in rejected),
-        "total_requests": len(all_withdrawals)
-    }
+    rows = await Withdrawal.get_motor_collection().aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}, "amount": {"$sum": "$amount"}}}
+    ]).to_list(None)
+    by_status = {row["_id"]: row for row in rows}
+
+    stats = {}
+    for status in (WithdrawalStatus.PENDING, WithdrawalStatus.APPROVED, WithdrawalStatus.COMPLETED, WithdrawalStatus.REJECTED):
+        row = by_status.get(status.value, {})
+        stats[f"{status.value}_count"] = row.get("count", 0)
+        stats[f"{status.value}_amount"] = row.get("amount", 0)
+    stats["total_requests"] = sum(row["count"] for row in rows)
+    return stats
+
+
+@router.post("/admin/reconcile-balances")
+async def reconcile_balances(repair: bool = False, current_user: User = Depends(get_current_user)):
+    """Recompute tutor balances from payments and withdrawals (admin only). Pass repair=true to fix drift."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    drift = await tutor_ledger.reconcile(repair=repair)
+    if repair:
+        await counter_service.reset(PENDING_COUNTER, _count_pending)
+    return {"drift_count": len(drift), "repaired": repair, "drift": drift}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from app.models.booking import BookingStatus, SessionType
 
@@ -38,6 +38,10 @@ class BookingResponse(BaseModel):
     google_event_id: Optional[str] = None
     created_at: datetime
 
+class BookingFeedResponse(BaseModel):
+    bookings: List[BookingResponse]
+    next_cursor: Optional[str] = None
+
 class ReviewCreate(BaseModel):
     tutor_id: str
     booking_id: Optional[str] = None
@@ -0,0 +1,200 @@
+"""
+Announcement Service - System broadcasts with fan-out on read
+
+A broadcast is stored as one Announcement document and pushed once over
+WebSocket to every connected user of its audience. Notification lists and
+unread counts merge in the announcements of the last
+ANNOUNCEMENT_MAX_AGE_DAYS at query time; per-user AnnouncementReceipt
+documents record reads and dismissals, so users who never open their
+notifications cost nothing. Recent announcements are cached per process
+for ANNOUNCEMENT_CACHE_SECONDS.
+
+Receipts of users connected to this worker are kept in the connection
+manager's mirror, so their unread counts need no query. The copy records
+which announcements it covers: a new announcement is simply not covered
+and triggers one reload, and receipt writes drop it (locally here, on
+other workers through the receipts_changed unread-count message).
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.core.config import settings
+from app.models.announcement import Announcement, AnnouncementReceipt
+from app.models.user import UserRole
+from app.services.websocket_manager import manager, NotificationPayload
+
+
+def announcement_to_dict(announcement: Announcement, is_read: bool) -> dict:
+    """Announcement in the shape of a notification (type "system")."""
+    return {
+        "id": str(announcement.id),
+        "type": "system",
+        "title": announcement.title,
+        "message": announcement.message,
+        "link": announcement.link,
+        "related_id": None,
+        "actor_id": None,
+        "actor_name": None,
+        "actor_avatar": None,
+        "is_read": is_read,
+        "created_at": announcement.created_at.isoformat()
+    }
+
+
+class AnnouncementService:
+    """Publishing announcements and per-user read state."""
+
+    def __init__(self):
+        self._recent: Optional[List[Announcement]] = None
+        self._loaded_at = 0.0
+
+    async def publish(
+        self,
+        title: str,
+        message: str,
+        link: Optional[str] = None,
+        audience: Optional[UserRole] = None,
+        created_by: Optional[str] = None
+    ) -> Announcement:
+        """Store one announcement and push it to connected users of the audience."""
+        announcement = Announcement(title=title, message=message, link=link, audience=audience, created_by=created_by)
+        await announcement.insert()
+        self._recent = None
+        manager.announcement_receipts.clear()
+
+        payload = NotificationPayload.new_notification(announcement_to_dict(announcement, is_read=False))
+        await manager.broadcast(payload, role=audience.value if audience else None)
+        print(f"[Announcements] Published '{title}' to {audience.value if audience else 'all users'}")
+        return announcement
+
+    async def recent(self) -> List[Announcement]:
+        """Announcements of the last ANNOUNCEMENT_MAX_AGE_DAYS, newest first (cached)."""
+        if self._recent is None or time.monotonic() - self._loaded_at > settings.ANNOUNCEMENT_CACHE_SECONDS:
+            since = datetime.utcnow() - timedelta(days=settings.ANNOUNCEMENT_MAX_AGE_DAYS)
+            self._recent = await Announcement.find(Announcement.created_at >= since).sort(-Announcement.created_at).to_list()
+            self._loaded_at = time.monotonic()
+        return self._recent
+
+    async def visible_to(self, role: Optional[str]) -> List[Announcement]:
+        return [a for a in await self.recent() if a.audience is None or a.audience.value == role]
+
+    async def _receipts(self, user_id: str, announcements: List[Announcement]) -> Dict[str, dict]:
+        if not announcements:
+            return {}
+        ids = frozenset(str(a.id) for a in announcements)
+        mirrored = manager.announcement_receipts.get(user_id)
+        if mirrored and ids <= mirrored[0]:
+            return mirrored[1]
+
+        cursor = AnnouncementReceipt.get_motor_collection().find(
+            {"user_id": user_id, "announcement_id": {"$in": list(ids)}},
+            projection={"announcement_id": 1, "read_at": 1, "hidden": 1}
+        )
+        receipts = {doc["announcement_id"]: doc async for doc in cursor}
+        if manager.is_user_online(user_id):
+            manager.announcement_receipts[user_id] = (ids, receipts)
+        return receipts
+
+    @staticmethod
+    def _forget_receipts(user_id: str) -> None:
+        manager.announcement_receipts.pop(user_id, None)
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        role: Optional[str],
+        unread_only: bool = False
+    ) -> List[Tuple[Announcement, bool]]:
+        """(announcement, is_read) pairs the user has not dismissed, newest first."""
+        announcements = await self.visible_to(role)
+        receipts = await self._receipts(user_id, announcements)
+        result = []
+        for announcement in announcements:
+            receipt = receipts.get(str(announcement.id), {})
+            if receipt.get("hidden"):
+                continue
+            is_read = receipt.get("read_at") is not None
+            if unread_only and is_read:
+                continue
+            result.append((announcement, is_read))
+        return result
+
+    async def unread_count(self, user_id: str, role: Optional[str]) -> int:
+        return len(await self.list_for_user(user_id, role, unread_only=True))
+
+    @staticmethod
+    async def get(announcement_id: str) -> Optional[Announcement]:
+        if not ObjectId.is_valid(announcement_id):
+            return None
+        return await Announcement.get(announcement_id)
+
+    async def mark_read(self, user_id: str, announcement_id: str) -> bool:
+        """Record a read; True if the announcement was unread for this user."""
+        now = datetime.utcnow()
+        try:
+            await AnnouncementReceipt.get_motor_collection().find_one_and_update(
+                {"user_id": user_id, "announcement_id": announcement_id, "read_at": None},
+                {"$set": {"read_at": now, "updated_at": now}, "$setOnInsert": {"hidden": False}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # Receipt exists with read_at set
+        finally:
+            self._forget_receipts(user_id)
+
+    async def mark_all_read(self, user_id: str, role: Optional[str]) -> int:
+        """Mark every visible unread announcement as read; returns how many were unread."""
+        unread = await self.list_for_user(user_id, role, unread_only=True)
+        if not unread:
+            return 0
+        now = datetime.utcnow()
+        try:
+            await AnnouncementReceipt.get_motor_collection().bulk_write([
+                UpdateOne(
+                    {"user_id": user_id, "announcement_id": str(announcement.id), "read_at": None},
+                    {"$set": {"read_at": now, "updated_at": now}, "$setOnInsert": {"hidden": False}},
+                    upsert=True
+                )
+                for announcement, _ in unread
+            ], ordered=False)
+        except BulkWriteError:
+            pass  # Concurrently read; those receipts already have read_at
+        self._forget_receipts(user_id)
+        return len(unread)
+
+    async def hide(self, user_id: str, announcement_id: str) -> bool:
+        """Dismiss an announcement for one user; True if it was still unread."""
+        before = await AnnouncementReceipt.get_motor_collection().find_one_and_update(
+            {"user_id": user_id, "announcement_id": announcement_id},
+            {"$set": {"hidden": True, "updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        self._forget_receipts(user_id)
+        return before is None or (before.get("read_at") is None and not before.get("hidden"))
+
+    async def hide_all(self, user_id: str, role: Optional[str], read_only: bool = False) -> None:
+        """Dismiss all visible announcements for a user (or only the read ones)."""
+        visible = await self.list_for_user(user_id, role)
+        ids = [str(announcement.id) for announcement, is_read in visible if is_read or not read_only]
+        if not ids:
+            return
+        now = datetime.utcnow()
+        await AnnouncementReceipt.get_motor_collection().bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "announcement_id": announcement_id},
+                {"$set": {"hidden": True, "updated_at": now}},
+                upsert=True
+            )
+            for announcement_id in ids
+        ], ordered=False)
+        self._forget_receipts(user_id)
+
+
+# Singleton instance
+announcement_service = AnnouncementService()
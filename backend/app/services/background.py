@@ -0,0 +1,102 @@
+"""
+Background Worker - Shared loop for periodic in-process jobs
+"""
+
+import asyncio
+from typing import Optional
+from app.services.leader_lease import LeaderLease
+
+
+class PeriodicWorker:
+    """
+    Runs `run_once` on a fixed interval inside the application's event loop.
+
+    Subclasses set `name` and implement `run_once`, returning True when more
+    work is immediately available (the loop then skips the sleep). Calling
+    `wake()` cuts the current sleep short so new work is picked up at once.
+
+    Passing `lease_name` makes the job leader-only: each tick first acquires
+    or renews a MongoDB lease and skips `run_once` on every other worker.
+    """
+
+    name: str = "Worker"
+
+    def __init__(self, interval: float, lease_name: Optional[str] = None, lease_ttl: Optional[float] = None):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._wake_event = asyncio.Event()
+        self._lease = LeaderLease(lease_name, lease_ttl or max(interval * 3, 30)) if lease_name else None
+
+    async def run_once(self) -> bool:
+        raise NotImplementedError
+
+    def on_leadership_lost(self) -> None:
+        """Called when a leader-only worker loses its lease. Drop in-memory state here."""
+
+    def start(self) -> None:
+        """Start the worker loop if it is not already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the worker loop and wait for it to exit."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._lease:
+            try:
+                await self._lease.release()
+            except Exception as e:
+                print(f"[{self.name}] Failed to release lease: {e}")
+
+    def wake(self) -> None:
+        """Run the next tick immediately instead of waiting for the interval."""
+        self._wake_event.set()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        print(f"[{self.name}] Worker started (interval: {self.interval}s)")
+        while True:
+            self._wake_event.clear()
+            try:
+                if self._lease and not await self._is_leader():
+                    has_more = False
+                else:
+                    has_more = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{self.name}] Tick failed: {e}")
+                has_more = False
+
+            if has_more:
+                # Yield to the loop between back-to-back batches
+                await asyncio.sleep(0)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _is_leader(self) -> bool:
+        """Acquire or renew the lease, resetting state if leadership was lost."""
+        was_leader = self._lease.is_leader
+        try:
+            await self._lease.acquire()
+        except Exception:
+            # Cannot confirm the lease, so stop acting as leader
+            self._lease.is_leader = False
+            raise
+        finally:
+            if was_leader and not self._lease.is_leader:
+                self.on_leadership_lost()
+        return self._lease.is_leader
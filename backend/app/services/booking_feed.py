@@ -0,0 +1,99 @@
+"""
+Booking Feed - Keyset-paginated, date-windowed booking queries
+
+A user's bookings come from up to two sources (as student by `student_id`,
+as tutor by `tutor_id`). Instead of one `$or` query, each source is read with
+its own range scan on the (field, scheduled_at) compound index and the
+sorted results are merged. Pages are addressed by an opaque cursor on
+(scheduled_at, _id), so page N costs the same as page 1.
+"""
+
+import heapq
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from app.models.booking import Booking
+from app.services.cursor import encode_cursor, decode_cursor, after_clause
+
+UPCOMING = "upcoming"
+PAST = "past"
+
+
+def _window_query(field: str, value: str, window: str, now: datetime, after: Optional[Tuple[datetime, ObjectId]]) -> dict:
+    ascending = window == UPCOMING
+    query = {
+        field: value,
+        "scheduled_at": {"$gte": now} if ascending else {"$lt": now}
+    }
+    if after:
+        query["$or"] = after_clause("scheduled_at", after, ascending)
+    return query
+
+
+async def get_booking_feed(
+    sources: List[Tuple[str, str]],
+    window: str = UPCOMING,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    now: Optional[datetime] = None
+) -> Tuple[List[Booking], Optional[str]]:
+    """
+    Get one page of bookings for the given (field, value) sources.
+
+    Upcoming sessions are returned soonest first, past sessions most recent
+    first. Returns the page and the cursor for the next page (None at the end).
+    """
+    now = now or datetime.utcnow()
+    after = decode_cursor(cursor) if cursor else None
+    ascending = window == UPCOMING
+    direction = 1 if ascending else -1
+
+    scans = []
+    for field, value in sources:
+        scans.append(await Booking.find(
+            _window_query(field, value, window, now, after)
+        ).sort(
+            [("scheduled_at", direction), ("_id", direction)]
+        ).limit(limit + 1).to_list())
+
+    def sort_key(b: Booking):
+        return (b.scheduled_at, b.id)
+
+    merged = heapq.merge(*scans, key=sort_key, reverse=not ascending)
+    page: List[Booking] = []
+    seen = set()
+    for booking in merged:
+        if booking.id in seen:
+            continue
+        seen.add(booking.id)
+        page.append(booking)
+        if len(page) > limit:
+            break
+
+    has_more = len(page) > limit
+    page = page[:limit]
+    next_cursor = encode_cursor(page[-1].scheduled_at, page[-1].id) if has_more and page else None
+    return page, next_cursor
+
+
+async def get_all_bookings_for(sources: List[Tuple[str, str]], limit: int) -> List[Booking]:
+    """
+    Up to `limit` bookings for the given sources, latest scheduled first,
+    merged from per-field scans of the (field, scheduled_at) indexes.
+    """
+    scans = [
+        await Booking.find({field: value}).sort(
+            [("scheduled_at", -1), ("_id", -1)]
+        ).limit(limit).to_list()
+        for field, value in sources
+    ]
+    merged = heapq.merge(*scans, key=lambda b: (b.scheduled_at, b.id), reverse=True)
+    seen = set()
+    result = []
+    for booking in merged:
+        if booking.id not in seen:
+            seen.add(booking.id)
+            result.append(booking)
+            if len(result) == limit:
+                break
+    return result
@@ -0,0 +1,64 @@
+"""
+Counter Service - Maintained counts that replace count() on hot paths
+
+Writers `$inc` a named counter alongside the change they make. Readers get
+the stored value with one indexed lookup; a missing counter is seeded from
+the caller's exact count the first time it is read. Counters whose history
+predates them should be incremented with upsert=False, so a write never
+creates a counter that misses the rows written before it existed.
+"""
+
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from pymongo import ReturnDocument, UpdateOne
+from app.models.counter import Counter
+
+
+class CounterService:
+    """Read and update named counters."""
+
+    @staticmethod
+    async def increment(name: str, delta: int = 1, upsert: bool = True) -> Optional[int]:
+        """Add `delta` and return the new value (None if the counter does not exist and upsert is off)."""
+        doc = await Counter.get_motor_collection().find_one_and_update(
+            {"name": name},
+            {"$inc": {"value": delta}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["value"] if doc else None
+
+    @staticmethod
+    async def increment_many(deltas: Dict[str, int], upsert: bool = True) -> None:
+        """Apply many {name: delta} increments in one bulk_write."""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({"name": name}, {"$inc": {"value": delta}, "$set": {"updated_at": now}}, upsert=upsert)
+            for name, delta in deltas.items() if delta
+        ]
+        if operations:
+            await Counter.get_motor_collection().bulk_write(operations, ordered=False)
+
+    @staticmethod
+    async def get(name: str, recount: Callable[[], Awaitable[int]]) -> int:
+        """Current value, seeded with `await recount()` if the counter does not exist yet."""
+        doc = await Counter.get_motor_collection().find_one({"name": name})
+        if doc:
+            return doc["value"]
+        return await CounterService.reset(name, recount)
+
+    @staticmethod
+    async def reset(name: str, recount: Callable[[], Awaitable[int]]) -> int:
+        """Overwrite the counter with an exact recount (repair)."""
+        value = await recount()
+        doc = await Counter.get_motor_collection().find_one_and_update(
+            {"name": name},
+            {"$set": {"value": value, "updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["value"]
+
+
+# Singleton instance
+counter_service = CounterService()
@@ -0,0 +1,36 @@
+"""
+Cursor - Opaque keyset pagination cursors on (timestamp, _id)
+"""
+
+import base64
+import calendar
+from datetime import datetime
+from typing import Tuple
+from bson import ObjectId
+
+
+def encode_cursor(timestamp: datetime, document_id: ObjectId) -> str:
+    """Opaque cursor pointing just after the row with this sort key."""
+    millis = calendar.timegm(timestamp.utctimetuple()) * 1000 + timestamp.microsecond // 1000
+    raw = f"{millis}:{document_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        millis, document_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return datetime.utcfromtimestamp(int(millis) / 1000), ObjectId(document_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def after_clause(field: str, after: Tuple[datetime, ObjectId], ascending: bool) -> list:
+    """`$or` branches selecting rows strictly after `after` in (field, _id) order."""
+    timestamp, document_id = after
+    op = "$gt" if ascending else "$lt"
+    return [
+        {field: {op: timestamp}},
+        {field: timestamp, "_id": {op: document_id}}
+    ]
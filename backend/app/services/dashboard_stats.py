@@ -0,0 +1,119 @@
+"""
+Dashboard Stats - Aggregated admin dashboard counters with a short-lived cache
+
+Every counter is its own small query that starts with a `$match` on the
+(role, created_at) or (status, created_at) index, run concurrently, so the
+database does the counting from index ranges and only a handful of numbers
+cross the wire. Results are
+cached for DASHBOARD_STATS_TTL_SECONDS; after that, stale values are still
+served for up to DASHBOARD_STATS_MAX_STALE_SECONDS while a single background
+refresh runs. Concurrent callers share one in-flight computation.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from app.core.config import settings
+from app.models.user import User, UserRole
+from app.models.booking import Booking, BookingStatus
+
+PAID_STATUSES = [BookingStatus.CONFIRMED.value, BookingStatus.COMPLETED.value]
+ROLES = [role.value for role in UserRole]
+STATUSES = [status.value for status in BookingStatus]
+
+
+async def _sum_price(match: dict) -> float:
+    result = await Booking.get_motor_collection().aggregate([
+        {"$match": match},
+        {"$group": {"_id": None, "revenue": {"$sum": "$price"}}}
+    ]).to_list(None)
+    return result[0]["revenue"] if result else 0
+
+
+class DashboardStatsService:
+    """Computes and caches the admin dashboard counters."""
+
+    def __init__(self):
+        self._value: Optional[dict] = None
+        self._computed_at: float = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+
+    async def get_stats(self) -> dict:
+        """Cached stats, refreshed in the background once the TTL has passed."""
+        age = time.monotonic() - self._computed_at
+        if self._value is not None and age < settings.DASHBOARD_STATS_TTL_SECONDS:
+            return self._value
+
+        refresh = self._start_refresh()
+        if self._value is not None and age < settings.DASHBOARD_STATS_MAX_STALE_SECONDS:
+            return self._value
+        return await asyncio.shield(refresh)
+
+    def invalidate(self) -> None:
+        """Force the next call to recompute."""
+        self._computed_at = 0.0
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._recompute())
+            self._refresh.add_done_callback(self._log_refresh_error)
+        return self._refresh
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            print(f"[DashboardStats] Refresh failed: {task.exception()}")
+
+    async def _recompute(self) -> dict:
+        now = datetime.utcnow()
+        week_ago = now - timedelta(days=7)
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        users, bookings = await asyncio.gather(
+            self._user_stats(week_ago),
+            self._booking_stats(week_ago, month_start)
+        )
+        self._value = {**users, **bookings}
+        self._computed_at = time.monotonic()
+        return self._value
+
+    @staticmethod
+    async def _user_stats(week_ago: datetime) -> dict:
+        users = User.get_motor_collection()
+        *by_role, new_this_week = await asyncio.gather(
+            *[users.count_documents({"role": role}) for role in ROLES],
+            users.count_documents({"role": {"$in": ROLES}, "created_at": {"$gte": week_ago}})
+        )
+        by_role = dict(zip(ROLES, by_role))
+        return {
+            "total_users": sum(by_role.values()),
+            "total_students": by_role[UserRole.STUDENT.value],
+            "total_tutors": by_role[UserRole.TUTOR.value],
+            "new_users_this_week": new_this_week
+        }
+
+    @staticmethod
+    async def _booking_stats(week_ago: datetime, month_start: datetime) -> dict:
+        bookings = Booking.get_motor_collection()
+        *by_status, new_this_week, revenue_total, revenue_this_month = await asyncio.gather(
+            *[bookings.count_documents({"status": status}) for status in STATUSES],
+            bookings.count_documents({"status": {"$in": STATUSES}, "created_at": {"$gte": week_ago}}),
+            _sum_price({"status": {"$in": PAID_STATUSES}}),
+            _sum_price({"status": {"$in": PAID_STATUSES}, "created_at": {"$gte": month_start}})
+        )
+        by_status = dict(zip(STATUSES, by_status))
+        return {
+            "total_bookings": sum(by_status.values()),
+            "pending_bookings": by_status[BookingStatus.PENDING.value],
+            "confirmed_bookings": by_status[BookingStatus.CONFIRMED.value],
+            "completed_bookings": by_status[BookingStatus.COMPLETED.value],
+            "cancelled_bookings": by_status[BookingStatus.CANCELLED.value],
+            "revenue_total": revenue_total,
+            "revenue_this_month": revenue_this_month,
+            "new_bookings_this_week": new_this_week
+        }
+
+
+# Singleton instance
+dashboard_stats = DashboardStatsService()
@@ -24,6 +24,11 @@ class EmailService:
         self.from_name = settings.MAIL_FROM_NAME
         self.use_ssl = settings.MAIL_USE_SSL
 
+    @property
+    def enabled(self) -> bool:
+        """Whether SMTP credentials are configured."""
+        return bool(self.host and self.username and self.password)
+
     def _create_message(
         self,
         to_email: str,
@@ -401,6 +406,86 @@ Zeal Catalyst Team
             plain_content=plain_text
         )
 
+    async def send_session_reminder_email(
+        self,
+        to_email: str,
+        recipient_name: str,
+        other_party_name: str,
+        subject_name: str,
+        scheduled_at: datetime,
+        meeting_link: Optional[str] = None,
+        is_for_tutor: bool = False
+    ) -> bool:
+        """Send upcoming session reminder email."""
+        formatted_date = scheduled_at.strftime("%B %d, %Y")
+        formatted_time = scheduled_at.strftime("%I:%M %p")
+        role = "student" if is_for_tutor else "tutor"
+
+        meeting_section = ""
+        if meeting_link:
+            meeting_section = f"""
+                    <tr>
+                        <td style="color: #6b7280; font-size: 14px; padding: 4px 0;">Meeting Link:</td>
+                        <td style="color: #6366f1; font-size: 14px; font-weight: 600; text-align: right;">
+                            <a href="{meeting_link}" style="color: #6366f1;">Join Meeting</a>
+                        </td>
+                    </tr>
+            """
+
+        content = f"""
+            <h2 style="color: #1f2937; margin: 0 0 20px; font-size: 24px;">Session Reminder</h2>
+            <p style="color: #4b5563; font-size: 16px; line-height: 1.6; margin: 0 0 24px;">
+                Hi {recipient_name},
+            </p>
+            <p style="color: #4b5563; font-size: 16px; line-height: 1.6; margin: 0 0 24px;">
+                This is a reminder of your upcoming {subject_name} session with {role} {other_party_name}.
+            </p>
+            <div style="background-color: #f3f4f6; border-radius: 12px; padding: 20px; margin: 0 0 24px;">
+                <table style="width: 100%;">
+                    <tr>
+                        <td style="color: #6b7280; font-size: 14px; padding: 4px 0;">Subject:</td>
+                        <td style="color: #1f2937; font-size: 14px; font-weight: 600; text-align: right;">{subject_name}</td>
+                    </tr>
+                    <tr>
+                        <td style="color: #6b7280; font-size: 14px; padding: 4px 0;">Date:</td>
+                        <td style="color: #1f2937; font-size: 14px; font-weight: 600; text-align: right;">{formatted_date}</td>
+                    </tr>
+                    <tr>
+                        <td style="color: #6b7280; font-size: 14px; padding: 4px 0;">Time:</td>
+                        <td style="color: #1f2937; font-size: 14px; font-weight: 600; text-align: right;">{formatted_time}</td>
+                    </tr>
+                    {meeting_section}
+                </table>
+            </div>
+            <div style="text-align: center;">
+                <a href="{settings.FRONTEND_URL}/{'tutor' if is_for_tutor else 'student'}/dashboard"
+                   style="display: inline-block; background: linear-gradient(135deg, #6366f1 0%, #8b5cf6 100%); color: #ffffff; text-decoration: none; padding: 14px 32px; border-radius: 8px; font-weight: 600; font-size: 16px;">
+                    View Session
+                </a>
+            </div>
+        """
+
+        plain_text = f"""
+Hi {recipient_name},
+
+This is a reminder of your upcoming {subject_name} session with {role} {other_party_name}.
+
+Subject: {subject_name}
+Date: {formatted_date}
+Time: {formatted_time}
+{f"Meeting Link: {meeting_link}" if meeting_link else ""}
+
+Best regards,
+Zeal Catalyst Team
+"""
+
+        return await self.send_email(
+            to_email=to_email,
+            subject="Zeal Catalyst - Session Reminder",
+            html_content=self._base_template(content),
+            plain_content=plain_text
+        )
+
     async def send_tutor_verified_email(
         self,
         to_email: str,
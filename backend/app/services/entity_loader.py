@@ -0,0 +1,97 @@
+"""
+Entity Loader - Request-scoped batching and caching of document lookups
+
+Every `load(id)` issued in the same event-loop tick is coalesced into one
+`{"_id": {"$in": [...]}}` query, and results (including misses) are memoized
+for the rest of the request. Routes that render a page of rows should call
+`load_many` with all ids up front, then read individual rows with `load`,
+which is served from the cache.
+"""
+
+import asyncio
+from typing import Dict, Generic, Iterable, List, Optional, Set, Type, TypeVar
+from bson import ObjectId
+from beanie import Document
+from app.models.user import User
+from app.models.tutor import TutorProfile
+from app.models.booking import Booking
+
+T = TypeVar("T", bound=Document)
+
+
+class EntityLoader(Generic[T]):
+    """DataLoader-style batched `get` for a single Beanie model."""
+
+    def __init__(self, model: Type[T]):
+        self.model = model
+        self._cache: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._dispatching: Set[asyncio.Task] = set()  # Keep in-flight batches referenced until done
+
+    def load(self, entity_id: Optional[str]) -> "asyncio.Future[Optional[T]]":
+        """Future resolving to the document with this id, or None if missing/invalid."""
+        key = str(entity_id) if entity_id else ""
+        future = self._cache.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+
+        if not ObjectId.is_valid(key):
+            future.set_result(None)
+            return future
+
+        if not self._queue:
+            loop.call_soon(self._schedule_dispatch)
+        self._queue.append(key)
+        return future
+
+    async def load_many(self, entity_ids: Iterable[Optional[str]]) -> List[Optional[T]]:
+        """Load several documents with a single query, preserving input order."""
+        return list(await asyncio.gather(*(self.load(entity_id) for entity_id in entity_ids)))
+
+    def prime(self, document: T) -> None:
+        """Seed the cache with a document that was already fetched."""
+        key = str(document.id)
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(document)
+            self._cache[key] = future
+
+    def _schedule_dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._dispatch(keys))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, keys: List[str]) -> None:
+        try:
+            documents = await self.model.find(
+                {"_id": {"$in": [ObjectId(key) for key in keys]}}
+            ).to_list()
+        except Exception as e:
+            for key in keys:
+                if not self._cache[key].done():
+                    self._cache[key].set_exception(e)
+            return
+
+        by_id = {str(doc.id): doc for doc in documents}
+        for key in keys:
+            if not self._cache[key].done():
+                self._cache[key].set_result(by_id.get(key))
+
+
+class RequestLoaders:
+    """The set of loaders shared by one request."""
+
+    def __init__(self):
+        self.users: EntityLoader[User] = EntityLoader(User)
+        self.tutors: EntityLoader[TutorProfile] = EntityLoader(TutorProfile)
+        self.bookings: EntityLoader[Booking] = EntityLoader(Booking)
+
+
+def get_loaders() -> RequestLoaders:
+    """FastAPI dependency: a fresh set of loaders per request."""
+    return RequestLoaders()
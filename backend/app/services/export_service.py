@@ -0,0 +1,164 @@
+"""
+Export Service - Streaming CSV/NDJSON exports of admin data
+
+Rows are read from a Motor cursor in batches of EXPORT_BATCH_SIZE. Each
+batch is enriched with one `$in` lookup per related collection, encoded and
+yielded, optionally through an incremental gzip compressor. Memory use is
+bounded by one batch regardless of how many rows are exported.
+"""
+
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from bson import ObjectId
+from beanie import Document
+from app.core.config import settings
+from app.models.booking import Booking
+from app.models.payment import Payment
+from app.models.tutor import TutorProfile
+from app.models.user import User
+from app.models.withdrawal import Withdrawal
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+
+@dataclass
+class ExportSpec:
+    """What to read for one export and how to shape each row."""
+    model: type
+    columns: List[str]
+    filter_field: Optional[str] = "status"  # Field matched by the `status` filter, if any
+    enrich: Optional[Callable[[List[dict]], Awaitable[None]]] = None
+
+
+async def _names_by_id(model: type[Document], ids: set, name_field: str = "full_name") -> Dict[str, str]:
+    object_ids = [ObjectId(i) for i in ids if i and ObjectId.is_valid(i)]
+    if not object_ids:
+        return {}
+    cursor = model.get_motor_collection().find({"_id": {"$in": object_ids}}, projection={name_field: 1})
+    return {str(doc["_id"]): doc.get(name_field) or "" async for doc in cursor}
+
+
+async def _enrich_payments(rows: List[dict]) -> None:
+    students = await _names_by_id(User, {r.get("student_id") for r in rows})
+    tutors = await _names_by_id(TutorProfile, {r.get("tutor_id") for r in rows})
+    for row in rows:
+        row["student_name"] = students.get(row.get("student_id"), "")
+        row["tutor_name"] = tutors.get(row.get("tutor_id"), "")
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "bookings": ExportSpec(Booking, [
+        "id", "student_id", "student_name", "student_email", "tutor_id", "tutor_name", "tutor_email",
+        "subject", "session_type", "scheduled_at", "duration_minutes", "price", "currency",
+        "status", "payment_status", "created_at", "completed_at"
+    ]),
+    "payments": ExportSpec(Payment, [
+        "id", "booking_id", "student_id", "student_name", "tutor_id", "tutor_name",
+        "session_amount", "currency", "admission_fee", "commission_fee", "total_platform_fee",
+        "tutor_earnings", "status", "is_first_booking", "razorpay_order_id", "razorpay_payment_id",
+        "created_at", "completed_at", "refunded_at"
+    ], enrich=_enrich_payments),
+    "users": ExportSpec(User, [
+        "id", "email", "full_name", "role", "phone", "is_active", "is_verified",
+        "auth_provider", "created_at"
+    ], filter_field="role"),
+    "withdrawals": ExportSpec(Withdrawal, [
+        "id", "tutor_id", "tutor_name", "tutor_email", "amount", "currency", "payment_method",
+        "status", "transaction_id", "created_at", "processed_at"
+    ]),
+}
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+async def iter_export_rows(
+    kind: str,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> AsyncIterator[List[dict]]:
+    """Yield export rows in batches, oldest first."""
+    spec = EXPORTS[kind]
+    query: dict = {}
+    if status and spec.filter_field:
+        query[spec.filter_field] = status
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+
+    # Only fields that are exported (never e.g. password hashes)
+    projection = {column: 1 for column in spec.columns if column != "id"}
+
+    batch_size = settings.EXPORT_BATCH_SIZE
+    cursor = spec.model.get_motor_collection().find(query, projection=projection).sort("_id", 1).batch_size(batch_size)
+
+    batch: List[dict] = []
+    async for doc in cursor:
+        doc["id"] = str(doc.pop("_id"))
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            if spec.enrich:
+                await spec.enrich(batch)
+            yield batch
+            batch = []
+    if batch:
+        if spec.enrich:
+            await spec.enrich(batch)
+        yield batch
+
+
+async def stream_export(
+    kind: str,
+    fmt: str = CSV,
+    gzip: bool = False,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> AsyncIterator[bytes]:
+    """Encoded export body, one chunk per batch."""
+    columns = EXPORTS[kind].columns
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31 writes a gzip container
+
+    def emit(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == CSV:
+        writer.writerow(columns)
+        yield emit(buffer.getvalue())
+
+    async for batch in iter_export_rows(kind, status=status, start=start, end=end):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            values = [_cell(row.get(column)) for column in columns]
+            if fmt == CSV:
+                writer.writerow(["" if v is None else v for v in values])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values))) + "\n")
+        chunk = emit(buffer.getvalue())
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.flush()
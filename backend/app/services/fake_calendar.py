@@ -0,0 +1,97 @@
+"""
+Fake Calendar Service - In-memory stand-in for GoogleMeetService
+
+Selected with CALENDAR_BACKEND=fake. Implements the same methods the app
+calls on `google_meet_service`, with optional artificial latency so the
+calendar worker and Meet link pool can be exercised without Google APIs.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+
+class FakeCalendarService:
+    """Thread-safe in-memory calendar producing fake Meet links."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {"create": 0, "update": 0, "cancel": 0}
+        self._lock = threading.Lock()
+
+    def _simulate_latency(self) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def warm_up(self) -> bool:
+        return True
+
+    def create_meet_event(
+        self,
+        title: str,
+        description: str,
+        start_time: datetime,
+        duration_minutes: int = 60,
+        attendees: list = None,
+        tutor_email: str = None,
+        student_email: str = None,
+        event_id: Optional[str] = None,
+        raise_errors: bool = False,
+        send_updates: str = 'all'
+    ) -> Optional[Dict[str, Any]]:
+        self._simulate_latency()
+        end_time = start_time + timedelta(minutes=duration_minutes)
+        with self._lock:
+            self.calls["create"] += 1
+            event_id = event_id or uuid.uuid4().hex
+            # Same client-chosen ID returns the existing event, like a 409 + get
+            event = self.events.setdefault(event_id, {
+                'event_id': event_id,
+                'meet_link': f"https://meet.google.com/fake-{event_id[:10]}",
+                'html_link': None,
+                'summary': title,
+                'description': description,
+                'attendees': [email for email in (tutor_email, student_email) if email] + (attendees or []),
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat(),
+                'status': 'created'
+            })
+            return {key: event[key] for key in ('event_id', 'meet_link', 'html_link', 'start_time', 'end_time', 'status')}
+
+    def update_meet_event(
+        self,
+        event_id: str,
+        title: str,
+        description: str,
+        start_time: datetime,
+        duration_minutes: int = 60,
+        tutor_email: str = None,
+        student_email: str = None,
+        raise_errors: bool = False
+    ) -> bool:
+        self._simulate_latency()
+        with self._lock:
+            self.calls["update"] += 1
+            event = self.events.get(event_id)
+            if not event:
+                if raise_errors:
+                    raise KeyError(f"Unknown event {event_id}")
+                return False
+            event.update({
+                'summary': title,
+                'description': description,
+                'attendees': [email for email in (tutor_email, student_email) if email],
+                'start_time': start_time.isoformat(),
+                'end_time': (start_time + timedelta(minutes=duration_minutes)).isoformat()
+            })
+            return True
+
+    def cancel_event(self, event_id: str, raise_errors: bool = False) -> bool:
+        self._simulate_latency()
+        with self._lock:
+            self.calls["cancel"] += 1
+            self.events.pop(event_id, None)
+            return bool(event_id)
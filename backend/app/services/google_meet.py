@@ -13,6 +13,7 @@ Setup Requirements:
 """
 
 import os
+import threading
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import uuid
@@ -39,27 +40,42 @@ class GoogleMeetService:
     def __init__(self):
         self.service = None
         self._initialized = False
+        self._init_lock = threading.Lock()
 
-    def _ensure_initialized(self):
+    def _ensure_initialized(self, interactive: bool = True):
         """Lazy initialization - only initialize when first needed"""
         if self._initialized:
             return
-        self._initialized = True
-        self._initialize_service()
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._initialized = self._initialize_service(interactive)
 
-    def _initialize_service(self):
-        """Initialize the Google Calendar service with OAuth credentials"""
+    def warm_up(self) -> bool:
+        """
+        Build the Calendar service ahead of the first request. Returns True if
+        available. Never opens the browser authorization flow; without a stored
+        token that is left to the first request that needs the service.
+        """
+        self._ensure_initialized(interactive=False)
+        return self.service is not None
+
+    def _initialize_service(self, interactive: bool = True) -> bool:
+        """
+        Initialize the Google Calendar service with OAuth credentials.
+        Returns False if authorization is needed but `interactive` is off.
+        """
         print(f"[GoogleMeet] Initializing service...")
         print(f"[GoogleMeet] TOKEN_FILE path: {TOKEN_FILE}")
         print(f"[GoogleMeet] CLIENT_SECRET_FILE: {settings.GOOGLE_CLIENT_SECRET_FILE}")
 
         if not settings.GOOGLE_CLIENT_SECRET_FILE:
             print("[GoogleMeet] Warning: GOOGLE_CLIENT_SECRET_FILE not configured. Meet links will not be generated.")
-            return
+            return True
 
         if not os.path.exists(settings.GOOGLE_CLIENT_SECRET_FILE):
             print(f"[GoogleMeet] Warning: Client secret file not found at {settings.GOOGLE_CLIENT_SECRET_FILE}")
-            return
+            return True
 
         try:
             creds = None
@@ -82,6 +98,9 @@ class GoogleMeetService:
                     with open(TOKEN_FILE, 'w') as token:
                         token.write(creds.to_json())
                     print("Token refreshed and saved successfully")
+                elif not interactive:
+                    print("[GoogleMeet] No stored token; authorization deferred to the first Meet request")
+                    return False
                 else:
                     # Need to authorize - this opens a browser
                     print("\n" + "="*60)
@@ -105,6 +124,7 @@ class GoogleMeetService:
         except Exception as e:
             print(f"Failed to initialize Google Calendar service: {e}")
             self.service = None
+        return True
 
     def create_meet_event(
         self,
@@ -114,7 +134,10 @@ class GoogleMeetService:
         duration_minutes: int = 60,
         attendees: list = None,
         tutor_email: str = None,
-        student_email: str = None
+        student_email: str = None,
+        event_id: Optional[str] = None,
+        raise_errors: bool = False,
+        send_updates: str = 'all'
     ) -> Optional[Dict[str, Any]]:
         """
         Create a Google Calendar event with Google Meet link
@@ -127,6 +150,9 @@ class GoogleMeetService:
             attendees: List of attendee email addresses
             tutor_email: Tutor's email address
             student_email: Student's email address
+            event_id: Client-chosen event ID (base32hex) so retries cannot create duplicates
+            raise_errors: Raise API errors instead of returning the fallback response
+            send_updates: Guest notifications ('all' or 'none')
 
         Returns:
             Dictionary with event details including Meet link, or None if failed
@@ -177,13 +203,25 @@ class GoogleMeetService:
                 },
             }
 
+            if event_id:
+                event['id'] = event_id
+
             # Create the event with conference data
-            created_event = self.service.events().insert(
-                calendarId='primary',
-                body=event,
-                conferenceDataVersion=1,
-                sendUpdates='all'
-            ).execute()
+            try:
+                created_event = self.service.events().insert(
+                    calendarId='primary',
+                    body=event,
+                    conferenceDataVersion=1,
+                    sendUpdates=send_updates
+                ).execute()
+            except HttpError as e:
+                # A retry of an insert that already succeeded - reuse the existing event
+                if not event_id or e.resp.status != 409:
+                    raise
+                created_event = self.service.events().get(
+                    calendarId='primary',
+                    eventId=event_id
+                ).execute()
 
             # Extract Meet link from conference data
             meet_link = None
@@ -207,9 +245,13 @@ class GoogleMeetService:
 
         except HttpError as e:
             print(f"Google Calendar API error: {e}")
+            if raise_errors:
+                raise
             return self._generate_fallback_response(title, start_time, duration_minutes)
         except Exception as e:
             print(f"Error creating Meet event: {e}")
+            if raise_errors:
+                raise
             return self._generate_fallback_response(title, start_time, duration_minutes)
 
     def _generate_fallback_response(
@@ -229,7 +271,47 @@ class GoogleMeetService:
             'status': 'pending_meet_link'
         }
 
-    def cancel_event(self, event_id: str) -> bool:
+    def update_meet_event(
+        self,
+        event_id: str,
+        title: str,
+        description: str,
+        start_time: datetime,
+        duration_minutes: int = 60,
+        tutor_email: str = None,
+        student_email: str = None,
+        raise_errors: bool = False
+    ) -> bool:
+        """
+        Move an existing event (e.g. a pre-provisioned one) to the session's
+        time and invite the attendees. The Meet link is kept.
+        """
+        self._ensure_initialized()
+        if not self.service or not event_id:
+            return False
+
+        try:
+            end_time = start_time + timedelta(minutes=duration_minutes)
+            self.service.events().patch(
+                calendarId='primary',
+                eventId=event_id,
+                body={
+                    'summary': title,
+                    'description': description,
+                    'start': {'dateTime': start_time.isoformat(), 'timeZone': 'UTC'},
+                    'end': {'dateTime': end_time.isoformat(), 'timeZone': 'UTC'},
+                    'attendees': [{'email': email} for email in (tutor_email, student_email) if email],
+                },
+                sendUpdates='all'
+            ).execute()
+            return True
+        except Exception as e:
+            print(f"Error updating event: {e}")
+            if raise_errors:
+                raise
+            return False
+
+    def cancel_event(self, event_id: str, raise_errors: bool = False) -> bool:
         """Cancel/delete a calendar event"""
         self._ensure_initialized()
         if not self.service or not event_id:
@@ -242,10 +324,24 @@ class GoogleMeetService:
                 sendUpdates='all'
             ).execute()
             return True
+        except HttpError as e:
+            # Already deleted
+            if e.resp.status in (404, 410):
+                return True
+            print(f"Error cancelling event: {e}")
+            if raise_errors:
+                raise
+            return False
         except Exception as e:
             print(f"Error cancelling event: {e}")
+            if raise_errors:
+                raise
             return False
 
 
-# Singleton instance
-google_meet_service = GoogleMeetService()
+# Singleton instance (CALENDAR_BACKEND=fake swaps in an in-memory calendar for tests/load tests)
+if settings.CALENDAR_BACKEND == "fake":
+    from app.services.fake_calendar import FakeCalendarService
+    google_meet_service = FakeCalendarService()
+else:
+    google_meet_service = GoogleMeetService()
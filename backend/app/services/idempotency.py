@@ -0,0 +1,188 @@
+"""
+Idempotency Service - Idempotency-Key handling for create endpoints
+
+The first request with a key inserts an in-flight record (the unique index
+is the lock) and runs the handler; its response is stored on the record.
+Replays with the same key get the stored response without re-running the
+handler. A duplicate that arrives while the first request is still running
+waits briefly for its response instead of executing a second time. Records
+expire through a TTL index after IDEMPOTENCY_TTL_HOURS.
+
+Whoever holds the lock (the first request, or one that took over an
+expired lock) is recorded as its owner token. Storing the response and
+releasing the key are conditional on that token, so a handler that outlives
+IDEMPOTENCY_LOCK_SECONDS cannot overwrite or delete its successor's record.
+"""
+
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Union
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.models.idempotency_key import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+# Poll interval while waiting for a concurrent duplicate to finish
+WAIT_POLL_SECONDS = 0.1
+
+
+def request_fingerprint(body: Any) -> str:
+    """Stable hash of a request body (pydantic model or plain data)."""
+    data = jsonable_encoder(body)
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class IdempotencyService:
+    """Runs a handler at most once per (scope, user, Idempotency-Key)."""
+
+    @staticmethod
+    async def run(
+        scope: str,
+        user_id: str,
+        key: Optional[str],
+        body: Any,
+        handler: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Return `await handler()`, or the stored response of an earlier request
+        with the same key. Without a key the handler simply runs. Results for
+        which `cache_if` returns False (e.g. a transient gateway failure) are
+        not stored, so a retry runs the handler again.
+        """
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        record_key = f"{scope}:{user_id}:{key}"
+        fingerprint = request_fingerprint(body)
+        owner = await IdempotencyService._acquire(record_key, fingerprint)
+        if owner is None:
+            replay = await IdempotencyService._replay(record_key, fingerprint)
+            if isinstance(replay, JSONResponse):
+                return replay
+            owner = replay
+
+        return await IdempotencyService._execute(record_key, owner, handler, cache_if)
+
+    @staticmethod
+    async def _acquire(record_key: str, fingerprint: str) -> Optional[str]:
+        """Insert the in-flight record; returns its owner token, or None if the key already exists."""
+        now = datetime.utcnow()
+        owner = uuid.uuid4().hex
+        try:
+            await IdempotencyKey(
+                key=record_key,
+                request_hash=fingerprint,
+                locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                owner=owner,
+                expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+            ).insert()
+            return owner
+        except DuplicateKeyError:
+            return None
+
+    @staticmethod
+    async def _replay(record_key: str, fingerprint: str) -> Union[JSONResponse, str]:
+        """
+        Stored response for an existing key, waiting for an in-flight request
+        if needed. Returns this request's owner token instead if it acquired
+        the key or took over an expired lock.
+        """
+        collection = IdempotencyKey.get_motor_collection()
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            doc = await collection.find_one({"key": record_key})
+            if doc is None:
+                # The first request failed and released the key; retry as the owner
+                owner = await IdempotencyService._acquire(record_key, fingerprint)
+                if owner is not None:
+                    return owner
+                # Another duplicate re-acquired it first; wait for that one instead
+            else:
+                if doc["request_hash"] != fingerprint:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Idempotency-Key was already used with a different request"
+                    )
+                if doc["completed"]:
+                    return JSONResponse(
+                        status_code=doc["status_code"],
+                        content=doc["response"],
+                        headers={"Idempotent-Replayed": "true"}
+                    )
+
+                now = datetime.utcnow()
+                if doc.get("locked_until") and doc["locked_until"] < now:
+                    # The original request died mid-flight (or is too slow); take over its lock
+                    owner = uuid.uuid4().hex
+                    taken = await collection.find_one_and_update(
+                        {"_id": doc["_id"], "completed": False, "locked_until": doc["locked_until"]},
+                        {"$set": {
+                            "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                            "owner": owner
+                        }}
+                    )
+                    if taken:
+                        return owner
+
+            if asyncio.get_running_loop().time() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+
+    @staticmethod
+    async def _execute(
+        record_key: str,
+        owner: str,
+        handler: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]]
+    ) -> Any:
+        """Run the handler while holding the key and store its outcome."""
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await IdempotencyService._release(record_key, owner)
+                raise
+            # Client errors are deterministic for the same request, so replay them too
+            await IdempotencyService._store(record_key, owner, e.status_code, {"detail": e.detail})
+            raise
+        except BaseException:
+            # Unexpected failure: release the key so a retry can run the handler again
+            await IdempotencyService._release(record_key, owner)
+            raise
+
+        if cache_if is not None and not cache_if(result):
+            await IdempotencyService._release(record_key, owner)
+        else:
+            await IdempotencyService._store(record_key, owner, 200, jsonable_encoder(result))
+        return result
+
+    @staticmethod
+    async def _store(record_key: str, owner: str, status_code: int, response: Any) -> None:
+        result = await IdempotencyKey.get_motor_collection().update_one(
+            {"key": record_key, "owner": owner},
+            {"$set": {"completed": True, "status_code": status_code, "response": response},
+             "$unset": {"locked_until": ""}}
+        )
+        if not result.matched_count:
+            print(f"[Idempotency] Lock on {record_key} was taken over; response not stored")
+
+    @staticmethod
+    async def _release(record_key: str, owner: str) -> None:
+        await IdempotencyKey.get_motor_collection().delete_one({"key": record_key, "owner": owner})
+
+
+# Singleton instance
+idempotency_service = IdempotencyService()
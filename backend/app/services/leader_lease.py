@@ -0,0 +1,67 @@
+"""
+Leader Lease - Ensures a background job runs on exactly one worker
+
+Every uvicorn worker runs the same background loops. Jobs that must not
+run concurrently (schedulers, sweepers) hold a named lease in MongoDB
+that the holder renews each tick. If the holder dies the lease expires
+and another worker takes over.
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from app.models.worker_lease import WorkerLease
+
+# Unique per process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    """Named MongoDB lease acquired with a single conditional upsert."""
+
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.is_leader = False
+
+    async def acquire(self) -> bool:
+        """Acquire or renew the lease. Returns True if this process holds it."""
+        now = datetime.utcnow()
+        try:
+            await WorkerLease.get_motor_collection().update_one(
+                {
+                    "name": self.name,
+                    "$or": [
+                        {"holder": WORKER_ID},
+                        {"expires_at": {"$lt": now}}
+                    ]
+                },
+                {
+                    "$set": {
+                        "holder": WORKER_ID,
+                        "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                    },
+                    "$setOnInsert": {"acquired_at": now}
+                },
+                upsert=True
+            )
+            acquired = True
+        except DuplicateKeyError:
+            # Lease exists and is held by a live worker
+            acquired = False
+
+        if acquired != self.is_leader:
+            print(f"[Lease] {WORKER_ID} {'acquired' if acquired else 'lost'} lease '{self.name}'")
+        self.is_leader = acquired
+        return acquired
+
+    async def release(self) -> None:
+        """Give up the lease so another worker can take over immediately."""
+        if not self.is_leader:
+            return
+        await WorkerLease.get_motor_collection().delete_one(
+            {"name": self.name, "holder": WORKER_ID}
+        )
+        self.is_leader = False
@@ -0,0 +1,163 @@
+"""
+Meeting Link Pool - Keeps ready-to-use Meet events for instant confirmations
+
+Creating a Meet-enabled calendar event is a slow external call. This worker
+creates placeholder events in batches ahead of time: it refills right away
+when the pool drops below MEET_POOL_LOW_WATERMARK and tops it up to
+MEET_POOL_SIZE during MEET_POOL_QUIET_HOURS. confirm_booking claims one
+atomically (and releases it if a concurrent confirm won) and the outbox
+relay later moves it to the session's time and invites the attendees. When the pool is empty the booking falls back to
+creating a fresh event. Provisioning runs on the lease holder only.
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.models.meeting_link import PooledMeetingLink, MeetingLinkStatus
+from app.services.background import PeriodicWorker
+from app.services.google_meet import google_meet_service
+
+# Placeholder events sit this far in the future until claimed
+PLACEHOLDER_OFFSET = timedelta(days=30)
+PLACEHOLDER_TITLE = "Zeal Catalyst Session (reserved)"
+
+# Rolling windows for metrics
+REFILL_RATE_WINDOW_SECONDS = 3600
+CLAIM_LATENCY_SAMPLES = 500
+
+
+class MeetingLinkPool(PeriodicWorker):
+    """Background provisioner and atomic claimer for pooled Meet links."""
+
+    name = "MeetPool"
+
+    def __init__(self):
+        super().__init__(interval=settings.MEET_POOL_REFILL_INTERVAL_SECONDS, lease_name="meeting_link_pool")
+        self.depth = 0
+        self.created_total = 0
+        self.claims_total = 0
+        self.claim_misses = 0
+        self._created_at: deque = deque()  # monotonic timestamps of created events
+        self._claim_latencies: deque = deque(maxlen=CLAIM_LATENCY_SAMPLES)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.MEET_POOL_SIZE > 0
+
+    async def run_once(self) -> bool:
+        """Create one batch of placeholder events if the pool needs it."""
+        self.depth = await PooledMeetingLink.find(
+            PooledMeetingLink.status == MeetingLinkStatus.AVAILABLE
+        ).count()
+
+        target = settings.MEET_POOL_SIZE
+        if not self._needs_refill():
+            return False
+
+        to_create = min(settings.MEET_POOL_BATCH_SIZE, target - self.depth)
+        created = 0
+        for _ in range(to_create):
+            result = await asyncio.to_thread(
+                google_meet_service.create_meet_event,
+                title=PLACEHOLDER_TITLE,
+                description="Reserved for an upcoming tutoring session.",
+                start_time=datetime.utcnow() + PLACEHOLDER_OFFSET,
+                send_updates='none',
+                raise_errors=True
+            )
+            if not result or not result.get("event_id") or not result.get("meet_link"):
+                # Calendar integration not configured
+                break
+
+            await PooledMeetingLink(
+                event_id=result["event_id"],
+                meet_link=result["meet_link"]
+            ).insert()
+            created += 1
+            self._created_at.append(time.monotonic())
+
+        self.created_total += created
+        self.depth += created
+        if created:
+            print(f"[MeetPool] Provisioned {created} links (depth: {self.depth}/{target})")
+        return created == to_create and self._needs_refill()
+
+    def _needs_refill(self) -> bool:
+        """Below the low watermark always; below target size only in quiet hours."""
+        if self.depth >= settings.MEET_POOL_SIZE:
+            return False
+        if self.depth < settings.MEET_POOL_LOW_WATERMARK:
+            return True
+        return datetime.utcnow().hour in settings.MEET_POOL_QUIET_HOURS
+
+    async def claim(self, booking_id: str) -> Optional[PooledMeetingLink]:
+        """Atomically take the oldest available link for a booking. None if the pool is empty."""
+        if not self.enabled:
+            return None
+
+        started = time.perf_counter()
+        doc = await PooledMeetingLink.get_motor_collection().find_one_and_update(
+            {"status": MeetingLinkStatus.AVAILABLE.value},
+            {"$set": {
+                "status": MeetingLinkStatus.CLAIMED.value,
+                "booking_id": booking_id,
+                "claimed_at": datetime.utcnow()
+            }},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        self._claim_latencies.append((time.perf_counter() - started) * 1000)
+
+        if not doc:
+            self.claim_misses += 1
+            return None
+
+        self.claims_total += 1
+        self.depth = max(0, self.depth - 1)
+        if self.depth < settings.MEET_POOL_LOW_WATERMARK:
+            self.wake()
+        return PooledMeetingLink.model_validate(doc)
+
+    async def release(self, link: PooledMeetingLink) -> bool:
+        """Return a claimed link the booking did not end up using. False if it was not held."""
+        result = await PooledMeetingLink.get_motor_collection().update_one(
+            {"_id": link.id, "status": MeetingLinkStatus.CLAIMED.value, "booking_id": link.booking_id},
+            {"$set": {"status": MeetingLinkStatus.AVAILABLE.value, "booking_id": None, "claimed_at": None}}
+        )
+        if not result.modified_count:
+            return False
+        self.claims_total -= 1
+        self.depth += 1
+        return True
+
+    async def get_stats(self) -> dict:
+        """Pool depth, refill rate and claim latency for monitoring (metrics are per process)."""
+        self.depth = await PooledMeetingLink.find(
+            PooledMeetingLink.status == MeetingLinkStatus.AVAILABLE
+        ).count()
+        cutoff = time.monotonic() - REFILL_RATE_WINDOW_SECONDS
+        while self._created_at and self._created_at[0] < cutoff:
+            self._created_at.popleft()
+
+        latencies = sorted(self._claim_latencies)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else None
+        return {
+            "enabled": self.enabled,
+            "depth": self.depth,
+            "target_size": settings.MEET_POOL_SIZE,
+            "low_watermark": settings.MEET_POOL_LOW_WATERMARK,
+            "created_total": self.created_total,
+            "refill_rate_per_hour": len(self._created_at),
+            "claims_total": self.claims_total,
+            "claim_misses": self.claim_misses,
+            "claim_latency_ms_avg": round(sum(latencies) / len(latencies), 2) if latencies else None,
+            "claim_latency_ms_p95": round(p95, 2) if p95 is not None else None
+        }
+
+
+# Singleton instance
+meeting_link_pool = MeetingLinkPool()
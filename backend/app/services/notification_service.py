@@ -1,13 +1,23 @@
 """
 Notification Service - Handles creating and sending notifications
+
+Unread badge counts come from maintained per-user counters (see
+unread_counter) plus unread announcements; for users connected to this
+worker the last count pushed over WebSocket is mirrored in memory.
 """
 
 from typing import Optional, List
 from datetime import datetime
+from bson import ObjectId
+from app.core.config import settings
 from app.models.notification import Notification, NotificationType
 from app.models.user import User
+from app.models.booking import Booking
+from app.models.tutor import TutorProfile
 from app.services.websocket_manager import manager, NotificationPayload
 from app.services.email_service import email_service
+from app.services.announcement_service import announcement_service
+from app.services.unread_counter import unread_counters
 
 
 class NotificationService:
@@ -54,17 +64,25 @@ class NotificationService:
         )
 
         await notification.insert()
+        await unread_counters.add(user_id, 1)
 
-        # Send via WebSocket if user is online
+        # Send via WebSocket if user is online (NEW_NOTIFICATION bumps the badge)
         if send_realtime:
             await NotificationService.send_notification_realtime(notification)
+        elif manager.is_user_online(user_id):
+            await NotificationService.send_unread_count(user_id)
 
         return notification
 
     @staticmethod
     async def send_notification_realtime(notification: Notification) -> None:
         """Send a notification via WebSocket to the user."""
-        notification_data = {
+        payload = NotificationPayload.new_notification(NotificationService.to_realtime_dict(notification))
+        await manager.send_personal_message(payload, notification.user_id)
+
+    @staticmethod
+    def to_realtime_dict(notification: Notification) -> dict:
+        return {
             "id": str(notification.id),
             "type": notification.type.value,
             "title": notification.title,
@@ -78,22 +96,39 @@ class NotificationService:
             "created_at": notification.created_at.isoformat()
         }
 
-        payload = NotificationPayload.new_notification(notification_data)
-        await manager.send_personal_message(payload, notification.user_id)
+    @staticmethod
+    async def get_user_role(user_id: str) -> Optional[str]:
+        """Role of a user (decides which announcements they see)."""
+        if not ObjectId.is_valid(user_id):
+            return None
+        doc = await User.get_motor_collection().find_one({"_id": ObjectId(user_id)}, projection={"role": 1})
+        return doc.get("role") if doc else None
 
     @staticmethod
-    async def get_unread_count(user_id: str) -> int:
-        """Get the count of unread notifications for a user."""
-        return await Notification.find(
-            Notification.user_id == user_id,
-            Notification.is_read == False
-        ).count()
+    async def get_unread_count(user_id: str, role: Optional[str] = None, cached: bool = True) -> int:
+        """
+        Get the count of unread notifications (including announcements) for a
+        user. Online users are answered from the in-memory mirror unless
+        `cached` is False.
+        """
+        if cached:
+            mirrored = manager.get_unread_count(user_id)
+            if mirrored is not None:
+                return mirrored
+        if role is None:
+            role = await NotificationService.get_user_role(user_id)
+        unread = await unread_counters.get(user_id)
+        return unread + await announcement_service.unread_count(user_id, role)
 
     @staticmethod
-    async def send_unread_count(user_id: str) -> None:
-        """Send the current unread count to a user via WebSocket."""
-        count = await NotificationService.get_unread_count(user_id)
-        payload = NotificationPayload.unread_count(count)
+    async def send_unread_count(user_id: str, role: Optional[str] = None, receipts_changed: bool = False) -> None:
+        """
+        Send the current unread count to a user via WebSocket (this also
+        refreshes the mirror). Pass `receipts_changed` after changing the
+        user's announcement receipts so every worker drops its copy.
+        """
+        count = await NotificationService.get_unread_count(user_id, role, cached=False)
+        payload = NotificationPayload.unread_count(count, receipts_changed)
         await manager.send_personal_message(payload, user_id)
 
     # ==================== Notification Creators ====================
@@ -105,7 +140,8 @@ class NotificationService:
         student_id: str,
         subject: str,
         booking_id: str,
-        scheduled_at: datetime
+        scheduled_at: datetime,
+        send_email: bool = True
     ) -> Notification:
         """Notify tutor of a new booking request."""
         formatted_time = scheduled_at.strftime("%B %d, %Y at %I:%M %p")
@@ -120,6 +156,9 @@ class NotificationService:
             actor_name=student_name
         )
 
+        if not send_email:
+            return notification
+
         # Send email notification
         try:
             tutor = await User.get(tutor_user_id)
@@ -138,6 +177,34 @@ class NotificationService:
 
         return notification
 
+    @staticmethod
+    async def notify_bookings_paid(booking_ids: List[str]) -> None:
+        """Notify tutors of newly paid bookings (from /verify or the payment webhook)."""
+        if not booking_ids:
+            return
+        bookings = await Booking.find({"_id": {"$in": [ObjectId(b) for b in booking_ids]}}).to_list()
+        # Bookings reference the tutor profile; notifications go to its user
+        tutor_users = {
+            str(tutor.id): tutor.user_id
+            for tutor in await TutorProfile.find(
+                {"_id": {"$in": list({ObjectId(b.tutor_id) for b in bookings if ObjectId.is_valid(b.tutor_id)})}}
+            ).to_list()
+        }
+        for booking in bookings:
+            if booking.tutor_id not in tutor_users:
+                continue
+            try:
+                await NotificationService.notify_new_booking(
+                    tutor_user_id=tutor_users[booking.tutor_id],
+                    student_name=booking.student_name or "A student",
+                    student_id=booking.student_id,
+                    subject=booking.subject,
+                    booking_id=str(booking.id),
+                    scheduled_at=booking.scheduled_at
+                )
+            except Exception as e:
+                print(f"[Notification] Failed to notify tutor of paid booking {booking.id}: {e}")
+
     @staticmethod
     async def notify_booking_confirmed(
         student_user_id: str,
@@ -327,16 +394,36 @@ class NotificationService:
         message: str,
         link: Optional[str] = None
     ) -> List[Notification]:
-        """Send a system notification to multiple users."""
+        """
+        Send a system notification to a specific list of users. Rows are
+        written with insert_many in NOTIFICATION_INSERT_CHUNK_SIZE chunks and
+        each chunk is pushed with one backplane publish. For everyone (or a
+        whole role) use announcement_service.publish instead.
+        """
         notifications = []
-        for user_id in user_ids:
-            notification = await NotificationService.notify_system(
-                user_id=user_id,
-                title=title,
-                message=message,
-                link=link
-            )
-            notifications.append(notification)
+        chunk_size = settings.NOTIFICATION_INSERT_CHUNK_SIZE
+        for i in range(0, len(user_ids), chunk_size):
+            now = datetime.utcnow()
+            chunk = [
+                Notification(
+                    id=ObjectId(),  # Assigned up front so the realtime payload can carry it
+                    user_id=user_id,
+                    type=NotificationType.SYSTEM,
+                    title=title,
+                    message=message,
+                    link=link,
+                    created_at=now
+                )
+                for user_id in user_ids[i:i + chunk_size]
+            ]
+            await Notification.insert_many(chunk)
+            await unread_counters.add_for_users(n.user_id for n in chunk)
+            await manager.send_many([
+                (n.user_id, NotificationPayload.new_notification(NotificationService.to_realtime_dict(n)))
+                for n in chunk
+            ])
+            notifications.extend(chunk)
+        print(f"[Notifications] Broadcast '{title}' to {len(notifications)} users")
         return notifications
 
 
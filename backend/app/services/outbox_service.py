@@ -0,0 +1,307 @@
+"""
+Outbox Relay - Processes side effects recorded on bookings
+
+Request handlers append `OutboxEvent`s to the booking in the same write as
+the state change, so a booking can never exist without its pending side
+effects. This relay claims bookings with due events, runs the registered
+handler for each event and removes it on success. Failures are retried with
+exponential backoff and dead-lettered after OUTBOX_MAX_ATTEMPTS.
+
+Delivery is at-least-once: handlers must be safe to run more than once.
+Up to OUTBOX_CONCURRENCY bookings are processed in parallel; blocking
+third-party SDK calls (Google Calendar) run in worker threads behind their
+own concurrency limit so they never stall the event loop.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.models.booking import Booking, BookingEventType, BookingStatus, OutboxEvent
+from app.models.notification import Notification, NotificationType
+from app.models.user import User
+from app.services.background import PeriodicWorker
+from app.services.email_service import email_service
+from app.services.google_meet import google_meet_service
+from app.services.notification_service import notification_service
+from app.services.payment_service import payment_service
+from app.services.websocket_manager import manager, NotificationPayload
+
+OutboxHandler = Callable[[Booking, dict], Awaitable[None]]
+
+# Retry backoff: 5s, 10s, 20s ... capped at one hour
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 3600
+
+
+class OutboxRelay(PeriodicWorker):
+    """Background worker that drains booking outbox events."""
+
+    name = "Outbox"
+
+    def __init__(self):
+        super().__init__(interval=settings.OUTBOX_POLL_INTERVAL_SECONDS)
+        self._handlers: Dict[BookingEventType, OutboxHandler] = {}
+
+    def handler(self, event_type: BookingEventType):
+        """Decorator registering the handler for an event type."""
+        def decorator(func: OutboxHandler) -> OutboxHandler:
+            self._handlers[event_type] = func
+            return func
+        return decorator
+
+    async def run_once(self) -> bool:
+        """Process up to OUTBOX_BATCH_SIZE bookings with due events."""
+        processed = 0
+        while processed < settings.OUTBOX_BATCH_SIZE:
+            claimed = []
+            while len(claimed) < settings.OUTBOX_CONCURRENCY:
+                booking = await self._claim_next()
+                if not booking:
+                    break
+                claimed.append(booking)
+
+            if claimed:
+                await asyncio.gather(*(self.process_booking(b) for b in claimed))
+                processed += len(claimed)
+            if len(claimed) < settings.OUTBOX_CONCURRENCY:
+                return False
+        return True
+
+    async def _claim_next(self) -> Optional[Booking]:
+        """Lease the next booking with due events so only one relay processes it."""
+        now = datetime.utcnow()
+        doc = await Booking.get_motor_collection().find_one_and_update(
+            {
+                "outbox.next_attempt_at": {"$lte": now},
+                "$or": [
+                    {"outbox_locked_until": None},
+                    {"outbox_locked_until": {"$lte": now}}
+                ]
+            },
+            {"$set": {"outbox_locked_until": now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)}},
+            return_document=ReturnDocument.AFTER
+        )
+        return Booking.model_validate(doc) if doc else None
+
+    async def process_booking(self, booking: Booking) -> None:
+        """Run every due event on a claimed booking, then release the lease."""
+        collection = Booking.get_motor_collection()
+        now = datetime.utcnow()
+
+        for event in booking.outbox:
+            if event.next_attempt_at is None or event.next_attempt_at > now:
+                continue
+
+            handler = self._handlers.get(event.type)
+            try:
+                if handler is None:
+                    raise LookupError(f"No outbox handler registered for {event.type.value}")
+                await handler(booking, event.payload)
+            except Exception as e:
+                await self._record_failure(booking, event, e)
+            else:
+                await collection.update_one(
+                    {"_id": booking.id},
+                    {"$pull": {"outbox": {"event_id": event.event_id}}}
+                )
+
+        await collection.update_one(
+            {"_id": booking.id},
+            {"$set": {"outbox_locked_until": None}}
+        )
+
+    async def _record_failure(self, booking: Booking, event: OutboxEvent, error: Exception) -> None:
+        """Schedule a retry with backoff, or dead-letter the event."""
+        attempts = event.attempts + 1
+        if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            next_attempt_at = None
+            print(f"[Outbox] Giving up on {event.type.value} for booking {booking.id} after {attempts} attempts: {error}")
+        else:
+            delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+            next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            print(f"[Outbox] {event.type.value} for booking {booking.id} failed (attempt {attempts}), retrying in {delay}s: {error}")
+
+        await Booking.get_motor_collection().update_one(
+            {"_id": booking.id},
+            {"$set": {
+                "outbox.$[e].attempts": attempts,
+                "outbox.$[e].next_attempt_at": next_attempt_at,
+                "outbox.$[e].last_error": str(error)[:500]
+            }},
+            array_filters=[{"e.event_id": event.event_id}]
+        )
+
+
+# Singleton instance
+outbox_relay = OutboxRelay()
+
+
+# ==================== Event Handlers ====================
+
+@outbox_relay.handler(BookingEventType.CREATE_PAYMENT)
+async def handle_create_payment(booking: Booking, payload: dict) -> None:
+    """Create the payment record with fee breakdown (skipped if it already exists)."""
+    if await payment_service.get_payment_by_booking(str(booking.id)):
+        return
+
+    try:
+        payment = await payment_service.create_payment(
+            booking_id=str(booking.id),
+            student_id=booking.student_id,
+            tutor_id=booking.tutor_id,
+            session_amount=booking.price,
+            currency=booking.currency
+        )
+    except DuplicateKeyError:
+        return  # Created concurrently by the order route or another relay pass
+    print(f"[Payment] Created payment {payment.id} - Commission: {payment.commission_fee}, Admission: {payment.admission_fee}")
+
+
+@outbox_relay.handler(BookingEventType.NOTIFY_NEW_BOOKING)
+async def handle_notify_new_booking(booking: Booking, payload: dict) -> None:
+    """Create the tutor's in-app notification (skipped if already delivered)."""
+    tutor_user_id = payload["tutor_user_id"]
+    existing = await Notification.find_one(
+        Notification.user_id == tutor_user_id,
+        Notification.type == NotificationType.BOOKING_NEW,
+        Notification.related_id == str(booking.id)
+    )
+    if existing:
+        return
+
+    await notification_service.notify_new_booking(
+        tutor_user_id=tutor_user_id,
+        student_name=booking.student_name,
+        student_id=booking.student_id,
+        subject=booking.subject,
+        booking_id=str(booking.id),
+        scheduled_at=booking.scheduled_at,
+        send_email=False
+    )
+
+
+@outbox_relay.handler(BookingEventType.EMAIL_NEW_BOOKING)
+async def handle_email_new_booking(booking: Booking, payload: dict) -> None:
+    """Email the tutor about the new booking request."""
+    # Email not configured - nothing to retry
+    if not email_service.enabled:
+        return
+
+    to_email = booking.tutor_email
+    recipient_name = booking.tutor_name
+    if not to_email:
+        tutor_user = await User.get(payload["tutor_user_id"])
+        if not tutor_user:
+            return
+        to_email, recipient_name = tutor_user.email, tutor_user.full_name
+
+    sent = await email_service.send_booking_notification(
+        to_email=to_email,
+        recipient_name=recipient_name or "",
+        other_party_name=booking.student_name or "",
+        subject_name=booking.subject,
+        scheduled_at=booking.scheduled_at,
+        is_new_booking=True,
+        is_for_tutor=True
+    )
+    if not sent:
+        raise RuntimeError(f"Failed to send new booking email to {to_email}")
+
+
+# ==================== Calendar Handlers ====================
+
+# Limits concurrent Google Calendar API calls across all outbox work
+_calendar_slots = asyncio.Semaphore(settings.CALENDAR_MAX_CONCURRENCY)
+
+
+async def push_booking_update(booking: Booking, tutor_user_id: Optional[str]) -> None:
+    """Send the booking's meeting details to both parties over WebSocket."""
+    payload = NotificationPayload.booking_updated({
+        "booking_id": str(booking.id),
+        "status": booking.status.value,
+        "meeting_link": booking.meeting_link,
+        "google_event_id": booking.google_event_id
+    })
+    await manager.send_personal_message(payload, booking.student_id)
+    if tutor_user_id:
+        await manager.send_personal_message(payload, tutor_user_id)
+
+
+@outbox_relay.handler(BookingEventType.CREATE_MEETING)
+async def handle_create_meeting(booking: Booking, payload: dict) -> None:
+    """Create the Meet event off-loop and patch the link onto the booking."""
+    if booking.google_event_id:
+        return
+
+    session_type_str = "1-on-1" if booking.session_type.value == "private" else "Group"
+    async with _calendar_slots:
+        meet_result = await asyncio.to_thread(
+            google_meet_service.create_meet_event,
+            title=f"{booking.subject} Tutoring Session - {session_type_str}",
+            description=f"Tutoring session with {booking.tutor_name}\nStudent: {booking.student_name}\nSubject: {booking.subject}\n\nNotes: {booking.notes or 'None'}",
+            start_time=booking.scheduled_at,
+            duration_minutes=booking.duration_minutes,
+            tutor_email=booking.tutor_email,
+            student_email=booking.student_email,
+            event_id=payload.get("calendar_event_id"),
+            raise_errors=True
+        )
+
+    # Calendar integration not configured - tutor adds the link manually
+    if not meet_result or not meet_result.get("event_id"):
+        return
+
+    # Only patch bookings that are still confirmed; a cancellation may have raced us
+    result = await Booking.get_motor_collection().update_one(
+        {"_id": booking.id, "status": BookingStatus.CONFIRMED.value},
+        {"$set": {
+            "meeting_link": meet_result.get("meet_link"),
+            "google_event_id": meet_result.get("event_id"),
+            "updated_at": datetime.utcnow()
+        }}
+    )
+    if result.matched_count == 0:
+        async with _calendar_slots:
+            await asyncio.to_thread(google_meet_service.cancel_event, meet_result["event_id"], True)
+        return
+
+    booking.meeting_link = meet_result.get("meet_link")
+    booking.google_event_id = meet_result.get("event_id")
+    print(f"[Calendar] Meet link ready for booking {booking.id}")
+    await push_booking_update(booking, payload.get("tutor_user_id"))
+
+
+@outbox_relay.handler(BookingEventType.UPDATE_MEETING)
+async def handle_update_meeting(booking: Booking, payload: dict) -> None:
+    """Move a pooled placeholder event to the session's time and invite both parties."""
+    event_id = payload.get("google_event_id")
+    if not event_id or booking.status != BookingStatus.CONFIRMED:
+        return
+
+    session_type_str = "1-on-1" if booking.session_type.value == "private" else "Group"
+    async with _calendar_slots:
+        await asyncio.to_thread(
+            google_meet_service.update_meet_event,
+            event_id,
+            title=f"{booking.subject} Tutoring Session - {session_type_str}",
+            description=f"Tutoring session with {booking.tutor_name}\nStudent: {booking.student_name}\nSubject: {booking.subject}\n\nNotes: {booking.notes or 'None'}",
+            start_time=booking.scheduled_at,
+            duration_minutes=booking.duration_minutes,
+            tutor_email=booking.tutor_email,
+            student_email=booking.student_email,
+            raise_errors=True
+        )
+
+
+@outbox_relay.handler(BookingEventType.CANCEL_MEETING)
+async def handle_cancel_meeting(booking: Booking, payload: dict) -> None:
+    """Delete the Google Calendar event for a cancelled booking."""
+    event_id = payload.get("google_event_id")
+    if not event_id:
+        return
+
+    async with _calendar_slots:
+        await asyncio.to_thread(google_meet_service.cancel_event, event_id, True)
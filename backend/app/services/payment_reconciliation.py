@@ -0,0 +1,209 @@
+"""
+Payment Reconciliation - Bulk comparison of Razorpay payments with our records
+
+Finds payments Razorpay captured (or refunded) that we still have as
+pending or failed, and the reverse. The provider's payment list for a
+window is paged in 100-item pages, RAZORPAY_RECONCILE_PAGE_CONCURRENCY at a
+time, and reduced in memory to one entry per order. Orders are then joined
+against Payment documents RAZORPAY_RECONCILE_BATCH_SIZE at a time with one
+`$in` on razorpay_order_id. Corrections reuse the conditional bulk
+transitions in payment_service, and everything found goes into a
+discrepancy report. Runs periodically on the lease holder over the last
+RAZORPAY_RECONCILE_LOOKBACK_HOURS, or on demand from the admin API.
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.models.payment import Payment, PaymentStatus
+from app.services.background import PeriodicWorker
+from app.services.payment_service import payment_service
+from app.services.razorpay_service import razorpay_service
+
+PROVIDER_PAGE_SIZE = 100
+REPORT_SAMPLE_LIMIT = 100
+
+# When an order has several payment attempts, the most advanced one decides
+PROVIDER_STATUS_RANK = {"failed": 0, "created": 1, "authorized": 2, "captured": 3, "refunded": 4}
+
+# Discrepancy types
+MISSING_LOCALLY = "missing_locally"  # Provider order we have no payment for
+CAPTURED_NOT_COMPLETED = "captured_not_completed"  # Corrected: completed
+REFUNDED_NOT_REFUNDED = "refunded_not_refunded"  # Corrected when completed locally: refunded
+FAILED_STILL_PENDING = "failed_still_pending"  # Corrected: failed
+COMPLETED_WITHOUT_CAPTURE = "completed_without_capture"  # Report only
+AMOUNT_MISMATCH = "amount_mismatch"  # Report only
+
+
+class PaymentReconciler(PeriodicWorker):
+    """Leader-only periodic reconciliation against the Razorpay payments list."""
+
+    name = "PaymentReconciler"
+
+    def __init__(self):
+        super().__init__(
+            interval=settings.RAZORPAY_RECONCILE_INTERVAL_SECONDS or 3600.0,
+            lease_name="razorpay_reconcile"
+        )
+        self.last_report: Optional[dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RAZORPAY_RECONCILE_INTERVAL_SECONDS > 0 and bool(settings.RAZORPAY_KEY_ID)
+
+    async def run_once(self) -> bool:
+        end = datetime.utcnow()
+        start = end - timedelta(hours=settings.RAZORPAY_RECONCILE_LOOKBACK_HOURS)
+        await self.reconcile(start, end, apply=True)
+        return False
+
+    async def reconcile(self, start: datetime, end: datetime, apply: bool = True) -> dict:
+        """
+        Compare provider payments created in [start, end] with ours. With
+        `apply`, safe corrections are written; otherwise this is a dry run.
+        Returns the discrepancy report.
+        """
+        started = datetime.utcnow()
+        orders = await self._fetch_provider_orders(start, end)
+
+        counts: Counter = Counter()
+        corrected: Counter = Counter()
+        samples: List[dict] = []
+        order_ids = list(orders)
+        for i in range(0, len(order_ids), settings.RAZORPAY_RECONCILE_BATCH_SIZE):
+            chunk = {order_id: orders[order_id] for order_id in order_ids[i:i + settings.RAZORPAY_RECONCILE_BATCH_SIZE]}
+            await self._reconcile_chunk(chunk, apply, counts, corrected, samples)
+
+        report = {
+            "start": start,
+            "end": end,
+            "applied": apply,
+            "provider_orders": len(orders),
+            "discrepancies": dict(counts),
+            "corrected": dict(corrected),
+            "samples": samples,
+            "started_at": started,
+            "duration_seconds": round((datetime.utcnow() - started).total_seconds(), 2)
+        }
+        self.last_report = report
+        print(f"[PaymentReconciler] Checked {len(orders)} orders: {dict(counts) or 'no discrepancies'}")
+        return report
+
+    async def _fetch_provider_orders(self, start: datetime, end: datetime) -> Dict[str, dict]:
+        """All provider payments in the window, reduced to the most advanced attempt per order."""
+        orders: Dict[str, dict] = {}
+        skip = 0
+        while True:
+            pages = await asyncio.gather(*[
+                razorpay_service.list_payments(start, end, skip=skip + n * PROVIDER_PAGE_SIZE, count=PROVIDER_PAGE_SIZE)
+                for n in range(settings.RAZORPAY_RECONCILE_PAGE_CONCURRENCY)
+            ])
+            for page in pages:
+                for item in page:
+                    order_id = item.get("order_id")
+                    if not order_id:
+                        continue
+                    current = orders.get(order_id)
+                    if current is None or PROVIDER_STATUS_RANK.get(item["status"], 0) > PROVIDER_STATUS_RANK.get(current["status"], 0):
+                        orders[order_id] = {
+                            "id": item["id"],
+                            "status": item["status"],
+                            "amount": item.get("amount"),
+                            "currency": item.get("currency")
+                        }
+            if any(len(page) < PROVIDER_PAGE_SIZE for page in pages):
+                return orders
+            skip += len(pages) * PROVIDER_PAGE_SIZE
+
+    async def _reconcile_chunk(
+        self,
+        orders: Dict[str, dict],
+        apply: bool,
+        counts: Counter,
+        corrected: Counter,
+        samples: List[dict]
+    ) -> None:
+        local = {
+            doc["razorpay_order_id"]: doc
+            async for doc in Payment.get_motor_collection().find(
+                {"razorpay_order_id": {"$in": list(orders)}},
+                projection={"razorpay_order_id": 1, "status": 1, "session_amount": 1, "currency": 1}
+            )
+        }
+
+        to_complete: Dict = {}
+        to_fail: List = []
+        to_refund: Dict = {}
+
+        def report(kind: str, order_id: str, provider: dict, payment: Optional[dict]) -> None:
+            counts[kind] += 1
+            if len(samples) < REPORT_SAMPLE_LIMIT:
+                samples.append({
+                    "type": kind,
+                    "razorpay_order_id": order_id,
+                    "razorpay_payment_id": provider["id"],
+                    "provider_status": provider["status"],
+                    "payment_id": str(payment["_id"]) if payment else None,
+                    "local_status": payment["status"] if payment else None
+                })
+
+        for order_id, provider in orders.items():
+            payment = local.get(order_id)
+            if payment is None:
+                if provider["status"] in ("captured", "refunded"):
+                    report(MISSING_LOCALLY, order_id, provider, None)
+                continue
+
+            status = payment["status"]
+            unsettled = status in (PaymentStatus.PENDING.value, PaymentStatus.FAILED.value)
+            if provider["status"] == "captured" and unsettled:
+                report(CAPTURED_NOT_COMPLETED, order_id, provider, payment)
+                to_complete[payment["_id"]] = {"razorpay_payment_id": provider["id"]}
+            elif provider["status"] == "refunded" and status != PaymentStatus.REFUNDED.value:
+                report(REFUNDED_NOT_REFUNDED, order_id, provider, payment)
+                if status == PaymentStatus.COMPLETED.value:
+                    to_refund[payment["_id"]] = {}
+            elif provider["status"] == "failed":
+                if status == PaymentStatus.PENDING.value:
+                    report(FAILED_STILL_PENDING, order_id, provider, payment)
+                    to_fail.append(payment["_id"])
+                elif status == PaymentStatus.COMPLETED.value:
+                    report(COMPLETED_WITHOUT_CAPTURE, order_id, provider, payment)
+
+            if provider["status"] in ("captured", "refunded") and (
+                provider["amount"] != round(payment["session_amount"] * 100)
+                or provider["currency"] != payment["currency"]
+            ):
+                report(AMOUNT_MISMATCH, order_id, provider, payment)
+
+        if not apply:
+            return
+
+        completed = await payment_service.transition_payments(
+            to_complete, [PaymentStatus.PENDING, PaymentStatus.FAILED], PaymentStatus.COMPLETED, "completed_at"
+        )
+        await payment_service.record_completed(completed)
+
+        refunds = await payment_service.transition_payments(
+            to_refund, [PaymentStatus.COMPLETED], PaymentStatus.REFUNDED, "refunded_at"
+        )
+        await payment_service.record_refunded(refunds)
+
+        if to_fail:
+            result = await Payment.get_motor_collection().update_many(
+                {"_id": {"$in": to_fail}, "status": PaymentStatus.PENDING.value},
+                {"$set": {"status": PaymentStatus.FAILED.value}}
+            )
+            corrected[FAILED_STILL_PENDING] += result.modified_count
+
+        await payment_service.set_booking_payment_status(
+            [(p.booking_id, "paid") for p in completed] + [(p.booking_id, "refunded") for p in refunds]
+        )
+        corrected[CAPTURED_NOT_COMPLETED] += len(completed)
+        corrected[REFUNDED_NOT_REFUNDED] += len(refunds)
+
+
+# Singleton instance
+payment_reconciler = PaymentReconciler()
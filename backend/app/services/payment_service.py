@@ -1,9 +1,18 @@
 from datetime import datetime, timedelta
-from typing import Optional
-from app.models.payment import Payment, PaymentStatus, StudentTutorRelation, RevenueStats
+from typing import AsyncIterator, Optional, List, Dict, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.models.payment import Payment, PaymentStatus, PlatformRevenue, StudentTutorRelation, RevenueStats
 from app.models.booking import Booking
+from app.models.tutor import TutorProfile
+from app.services.revenue_rollup import revenue_rollup
+from app.services.tutor_ledger import tutor_ledger
 
 
+# Sortable columns of the tutor earnings report
+TUTOR_EARNINGS_SORT_FIELDS = ("total_earnings", "pending_earnings", "platform_fees_paid", "total_sessions")
+
 # Platform fee percentages
 COMMISSION_RATE = 0.05  # 5% commission on every session
 ADMISSION_RATE = 0.10   # 10% admission fee for new students
@@ -13,13 +22,34 @@ class PaymentService:
     """Service for handling payments and fee calculations"""
 
     @staticmethod
-    async def is_first_booking(student_id: str, tutor_id: str) -> bool:
-        """Check if this is the student's first booking with this tutor"""
-        relation = await StudentTutorRelation.find_one(
-            StudentTutorRelation.student_id == student_id,
-            StudentTutorRelation.tutor_id == tutor_id
-        )
-        return relation is None
+    async def record_booking_relation(student_id: str, tutor_id: str, booking_id: str, session_amount: float) -> bool:
+        """
+        Count a booking on the student-tutor relation with a single upsert.
+        Returns True if it is the student's first booking with this tutor.
+        Idempotent per booking: a retried or duplicated create is not counted
+        again and gets the same answer.
+        """
+        now = datetime.utcnow()
+        update = {
+            "$inc": {"total_bookings": 1, "total_spent": session_amount},
+            "$set": {"updated_at": now},
+            "$addToSet": {"booking_ids": booking_id},
+            "$setOnInsert": {"first_booking_id": booking_id, "first_booking_date": now, "created_at": now}
+        }
+        pair = {"student_id": student_id, "tutor_id": tutor_id}
+        query = {**pair, "booking_ids": {"$ne": booking_id}}
+        collection = StudentTutorRelation.get_motor_collection()
+        try:
+            before = await collection.find_one_and_update(query, update, upsert=True, return_document=ReturnDocument.BEFORE)
+            if before is None:
+                return True  # Inserted the relation
+        except DuplicateKeyError:
+            # The relation exists: inserted concurrently, or this booking was already counted
+            before = await collection.find_one_and_update(query, update, return_document=ReturnDocument.BEFORE)
+            if before is None:
+                relation = await collection.find_one(pair, projection={"first_booking_id": 1})
+                return relation is not None and relation["first_booking_id"] == booking_id
+        return before["first_booking_id"] == booking_id
 
     @staticmethod
     def calculate_fees(session_amount: float, is_first_booking: bool) -> dict:
@@ -47,8 +77,8 @@ class PaymentService:
         currency: str = "USD"
     ) -> Payment:
         """Create a payment record for a booking"""
-        # Check if first booking
-        is_first = await PaymentService.is_first_booking(student_id, tutor_id)
+        # Counting the booking on the relation also decides the admission fee
+        is_first = await PaymentService.record_booking_relation(student_id, tutor_id, booking_id, session_amount)
 
         # Calculate fees
         fees = PaymentService.calculate_fees(session_amount, is_first)
@@ -69,117 +99,325 @@ class PaymentService:
         )
         await payment.insert()
 
-        # If first booking, create/update student-tutor relation
-        if is_first:
-            relation = StudentTutorRelation(
-                student_id=student_id,
-                tutor_id=tutor_id,
-                first_booking_id=booking_id,
-                first_booking_date=datetime.utcnow(),
-                total_bookings=1,
-                total_spent=session_amount
-            )
-            await relation.insert()
-        else:
-            # Update existing relation
-            relation = await StudentTutorRelation.find_one(
-                StudentTutorRelation.student_id == student_id,
-                StudentTutorRelation.tutor_id == tutor_id
+        return payment
+
+    @staticmethod
+    async def complete_payment(
+        payment_id: str,
+        razorpay_payment_id: Optional[str] = None,
+        razorpay_signature: Optional[str] = None
+    ) -> Optional[Payment]:
+        """
+        Mark payment as completed and add it to the revenue rollup (once).
+        Returns the payment if this call completed it, None if it already was.
+        """
+        updates = {}
+        if razorpay_payment_id:
+            updates["razorpay_payment_id"] = razorpay_payment_id
+        if razorpay_signature:
+            updates["razorpay_signature"] = razorpay_signature
+
+        collection = Payment.get_motor_collection()
+        doc = await collection.find_one_and_update(
+            {
+                "_id": ObjectId(payment_id),
+                "status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.FAILED.value]}
+            },
+            {"$set": {**updates, **PaymentService._effects_pending(PaymentStatus.COMPLETED),
+                      "status": PaymentStatus.COMPLETED.value, "completed_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            payment = Payment.model_validate(doc)
+            await PaymentService.record_completed([payment])
+            return payment
+
+        # Already completed (or refunded): only attach gateway details
+        if updates:
+            await collection.update_one({"_id": ObjectId(payment_id)}, {"$set": updates})
+        return None
+
+    @staticmethod
+    async def transition_payments(
+        updates: Dict[ObjectId, dict],
+        from_statuses: List[PaymentStatus],
+        to_status: PaymentStatus,
+        timestamp_field: str
+    ) -> List[Payment]:
+        """
+        Move many payments to `to_status` with one bulk_write, each only if it is
+        still in one of `from_statuses`. `updates` maps payment _id to extra
+        fields to set. Returns the payments this call actually changed.
+        """
+        if not updates:
+            return []
+        collection = Payment.get_motor_collection()
+        # Mongo stores milliseconds; truncate so the value can be matched back exactly
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+        await collection.bulk_write([
+            UpdateOne(
+                {"_id": payment_id, "status": {"$in": [s.value for s in from_statuses]}},
+                {"$set": {**extra, **PaymentService._effects_pending(to_status), "status": to_status.value, timestamp_field: now}}
             )
-            if relation:
-                relation.total_bookings += 1
-                relation.total_spent += session_amount
-                relation.updated_at = datetime.utcnow()
-                await relation.save()
+            for payment_id, extra in updates.items()
+        ], ordered=False)
 
-        return payment
+        changed = await collection.find(
+            {"_id": {"$in": list(updates)}, "status": to_status.value, timestamp_field: now}
+        ).to_list(None)
+        return [Payment.model_validate(doc) for doc in changed]
 
     @staticmethod
-    async def complete_payment(payment_id: str) -> Optional[Payment]:
-        """Mark payment as completed"""
-        payment = await Payment.get(payment_id)
-        if payment:
-            payment.status = PaymentStatus.COMPLETED
-            payment.completed_at = datetime.utcnow()
-            await payment.save()
+    async def complete_payments_for_bookings(booking_ids: List[str]) -> int:
+        """Mark the pending payments of many bookings as completed in one update"""
+        if not booking_ids:
+            return 0
+        pending = await Payment.get_motor_collection().find(
+            {"booking_id": {"$in": booking_ids}, "status": PaymentStatus.PENDING.value},
+            projection={"_id": 1}
+        ).to_list(None)
+
+        completed = await PaymentService.transition_payments(
+            {doc["_id"]: {} for doc in pending},
+            [PaymentStatus.PENDING], PaymentStatus.COMPLETED, "completed_at"
+        )
+        await PaymentService.record_completed(completed)
+        return len(completed)
+
+    @staticmethod
+    async def refund_payment(payment_id: str) -> Optional[Payment]:
+        """Mark a completed payment as refunded and remove it from the revenue rollup (once)"""
+        doc = await Payment.get_motor_collection().find_one_and_update(
+            {"_id": ObjectId(payment_id), "status": PaymentStatus.COMPLETED.value},
+            {"$set": {**PaymentService._effects_pending(PaymentStatus.REFUNDED),
+                      "status": PaymentStatus.REFUNDED.value, "refunded_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            return await Payment.get(payment_id)
+        payment = Payment.model_validate(doc)
+        await PaymentService.record_refunded([payment])
         return payment
 
+    @staticmethod
+    def _effects_pending(status: PaymentStatus) -> dict:
+        """Fields marking a status change whose effects are not applied yet"""
+        return {"effects_pending": status.value, "effects_pending_at": datetime.utcnow()}
+
+    @staticmethod
+    async def _clear_effects_pending(payments: List[Payment], status: PaymentStatus) -> None:
+        if payments:
+            await Payment.get_motor_collection().update_many(
+                {"_id": {"$in": [p.id for p in payments]}, "effects_pending": status.value},
+                {"$unset": {"effects_pending": "", "effects_pending_at": ""}}
+            )
+
+    @staticmethod
+    async def record_completed(payments: List[Payment]) -> None:
+        """Apply newly completed payments to the revenue rollups and tutor balances"""
+        await revenue_rollup.record_completed(payments)
+        await tutor_ledger.credit_payments(payments)
+        await PaymentService._clear_effects_pending(payments, PaymentStatus.COMPLETED)
+
+    @staticmethod
+    async def record_refunded(payments: List[Payment]) -> None:
+        """Remove newly refunded payments from the revenue rollups and tutor balances"""
+        await revenue_rollup.record_refunded(payments)
+        await tutor_ledger.debit_refunds(payments)
+        await PaymentService._clear_effects_pending(payments, PaymentStatus.REFUNDED)
+
+    @staticmethod
+    async def set_booking_payment_status(changes: List[Tuple[str, str]]) -> None:
+        """Set Booking.payment_status for (booking_id, status) pairs in one bulk_write"""
+        now = datetime.utcnow()
+        requests = [
+            UpdateOne({"_id": ObjectId(booking_id)}, {"$set": {"payment_status": status, "updated_at": now}})
+            for booking_id, status in changes if ObjectId.is_valid(booking_id)
+        ]
+        if requests:
+            await Booking.get_motor_collection().bulk_write(requests, ordered=False)
+
     @staticmethod
     async def get_payment_by_booking(booking_id: str) -> Optional[Payment]:
         """Get payment for a specific booking"""
         return await Payment.find_one(Payment.booking_id == booking_id)
 
     @staticmethod
-    async def get_revenue_stats() -> RevenueStats:
-        """Get platform revenue statistics for admin dashboard"""
+    async def get_revenue_stats(currency: Optional[str] = None) -> List[RevenueStats]:
+        """
+        Platform revenue statistics for the admin dashboard from the daily
+        rollups, one entry per currency (or only `currency`), highest total
+        revenue first. Amounts in different currencies are never added up.
+        """
         now = datetime.utcnow()
         start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         start_of_week = now - timedelta(days=now.weekday())
         start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
+        match: dict = {"currency": currency} if currency else {}
+
+        totals = {
+            row["_id"]: row
+            async for row in PlatformRevenue.get_motor_collection().aggregate([
+                {"$match": match},
+                {"$group": {
+                    "_id": "$currency",
+                    "total_revenue": {"$sum": "$total_platform_revenue"},
+                    "total_admission_fees": {"$sum": "$total_admission_fees"},
+                    "total_commission_fees": {"$sum": "$total_commission_fees"},
+                    "total_tutor_payouts": {"$sum": "$total_tutor_payouts"},
+                    "total_payments": {"$sum": "$total_bookings"},
+                    "total_new_students": {"$sum": "$new_student_bookings"}
+                }}
+            ])
+        }
 
-        # Get all completed payments
-        all_payments = await Payment.find(
-            Payment.status == PaymentStatus.COMPLETED
+        # At most ~31 daily rows per currency
+        recent_rows = await PlatformRevenue.find(
+            {**match, "date": {"$gte": min(start_of_month, start_of_week)}}
         ).to_list()
 
-        # Calculate totals
-        total_revenue = sum(p.total_platform_fee for p in all_payments)
-        total_admission_fees = sum(p.admission_fee for p in all_payments)
-        total_commission_fees = sum(p.commission_fee for p in all_payments)
-        total_tutor_payouts = sum(p.tutor_earnings for p in all_payments)
-        total_new_students = len([p for p in all_payments if p.is_first_booking])
-
-        # Monthly stats
-        monthly_payments = [p for p in all_payments if p.created_at >= start_of_month]
-        monthly_revenue = sum(p.total_platform_fee for p in monthly_payments)
-        monthly_admission_fees = sum(p.admission_fee for p in monthly_payments)
-        monthly_commission_fees = sum(p.commission_fee for p in monthly_payments)
-
-        # Weekly stats
-        weekly_payments = [p for p in all_payments if p.created_at >= start_of_week]
-        weekly_revenue = sum(p.total_platform_fee for p in weekly_payments)
-
-        return RevenueStats(
-            total_revenue=round(total_revenue, 2),
-            total_admission_fees=round(total_admission_fees, 2),
-            total_commission_fees=round(total_commission_fees, 2),
-            total_tutor_payouts=round(total_tutor_payouts, 2),
-            total_payments=len(all_payments),
-            total_new_students=total_new_students,
-            monthly_revenue=round(monthly_revenue, 2),
-            monthly_admission_fees=round(monthly_admission_fees, 2),
-            monthly_commission_fees=round(monthly_commission_fees, 2),
-            monthly_bookings=len(monthly_payments),
-            weekly_revenue=round(weekly_revenue, 2),
-            weekly_bookings=len(weekly_payments)
-        )
+        stats = []
+        for code in totals or [currency or "INR"]:
+            total = totals.get(code, {})
+            monthly = [r for r in recent_rows if r.currency == code and r.date >= start_of_month]
+            weekly = [r for r in recent_rows if r.currency == code and r.date >= start_of_week]
+            stats.append(RevenueStats(
+                currency=code,
+                total_revenue=round(total.get("total_revenue", 0), 2),
+                total_admission_fees=round(total.get("total_admission_fees", 0), 2),
+                total_commission_fees=round(total.get("total_commission_fees", 0), 2),
+                total_tutor_payouts=round(total.get("total_tutor_payouts", 0), 2),
+                total_payments=total.get("total_payments", 0),
+                total_new_students=total.get("total_new_students", 0),
+                monthly_revenue=round(sum(r.total_platform_revenue for r in monthly), 2),
+                monthly_admission_fees=round(sum(r.total_admission_fees for r in monthly), 2),
+                monthly_commission_fees=round(sum(r.total_commission_fees for r in monthly), 2),
+                monthly_bookings=sum(r.total_bookings for r in monthly),
+                weekly_revenue=round(sum(r.total_platform_revenue for r in weekly), 2),
+                weekly_bookings=sum(r.total_bookings for r in weekly)
+            ))
+        stats.sort(key=lambda item: item.total_revenue, reverse=True)
+        return stats
 
     @staticmethod
     async def get_tutor_earnings(tutor_id: str) -> dict:
         """Get earnings breakdown for a specific tutor"""
-        payments = await Payment.find(
-            Payment.tutor_id == tutor_id,
-            Payment.status == PaymentStatus.COMPLETED
-        ).to_list()
+        earnings = await PaymentService.get_tutor_earnings_bulk([tutor_id])
+        return earnings[tutor_id]
 
-        total_sessions = len(payments)
-        total_earnings = sum(p.tutor_earnings for p in payments)
-        platform_fees_paid = sum(p.total_platform_fee for p in payments)
+    @staticmethod
+    async def get_tutor_earnings_bulk(tutor_ids: List[str]) -> Dict[str, dict]:
+        """Earnings breakdown for many tutors with one aggregation, keyed by tutor_id"""
+        earnings = {
+            tutor_id: {
+                "tutor_id": tutor_id,
+                "total_sessions": 0,
+                "total_earnings": 0.0,
+                "platform_fees_paid": 0.0,
+                "pending_earnings": 0.0
+            }
+            for tutor_id in tutor_ids
+        }
+        if not tutor_ids:
+            return earnings
 
-        # Get pending payments
-        pending_payments = await Payment.find(
-            Payment.tutor_id == tutor_id,
-            Payment.status == PaymentStatus.PENDING
-        ).to_list()
-        pending_earnings = sum(p.tutor_earnings for p in pending_payments)
+        rows = await Payment.get_motor_collection().aggregate([
+            {"$match": {
+                "tutor_id": {"$in": tutor_ids},
+                "status": {"$in": [PaymentStatus.COMPLETED.value, PaymentStatus.PENDING.value]}
+            }},
+            {"$group": {
+                "_id": {"tutor_id": "$tutor_id", "status": "$status"},
+                "count": {"$sum": 1},
+                "tutor_earnings": {"$sum": "$tutor_earnings"},
+                "platform_fee": {"$sum": "$total_platform_fee"}
+            }}
+        ]).to_list(None)
 
-        return {
-            "tutor_id": tutor_id,
-            "total_sessions": total_sessions,
-            "total_earnings": round(total_earnings, 2),
-            "platform_fees_paid": round(platform_fees_paid, 2),
-            "pending_earnings": round(pending_earnings, 2)
-        }
+        for row in rows:
+            entry = earnings[row["_id"]["tutor_id"]]
+            if row["_id"]["status"] == PaymentStatus.COMPLETED.value:
+                entry["total_sessions"] = row["count"]
+                entry["total_earnings"] = round(row["tutor_earnings"], 2)
+                entry["platform_fees_paid"] = round(row["platform_fee"], 2)
+            else:
+                entry["pending_earnings"] = round(row["tutor_earnings"], 2)
+        return earnings
+
+    @staticmethod
+    def _tutor_earnings_pipeline(sort_by: str = "total_earnings", descending: bool = True) -> List[dict]:
+        """Earnings of every tutor (zeros for tutors without payments), sorted"""
+        completed = {"$eq": ["$status", PaymentStatus.COMPLETED.value]}
+        pending = {"$eq": ["$status", PaymentStatus.PENDING.value]}
+        totals = ("total_sessions", "total_earnings", "platform_fees_paid", "pending_earnings")
+        return [
+            {"$match": {"status": {"$in": [PaymentStatus.COMPLETED.value, PaymentStatus.PENDING.value]}}},
+            {"$group": {
+                "_id": "$tutor_id",
+                "total_sessions": {"$sum": {"$cond": [completed, 1, 0]}},
+                "total_earnings": {"$sum": {"$cond": [completed, "$tutor_earnings", 0]}},
+                "platform_fees_paid": {"$sum": {"$cond": [completed, "$total_platform_fee", 0]}},
+                "pending_earnings": {"$sum": {"$cond": [pending, "$tutor_earnings", 0]}}
+            }},
+            # Include tutors who have no payments yet
+            {"$unionWith": {
+                "coll": TutorProfile.get_motor_collection().name,
+                "pipeline": [{"$project": {"_id": {"$toString": "$_id"}}}]
+            }},
+            {"$group": {"_id": "$_id", **{field: {"$sum": f"${field}"} for field in totals}}},
+            {"$sort": {sort_by: -1 if descending else 1, "_id": 1}}
+        ]
+
+    @staticmethod
+    def _tutor_profile_join() -> List[dict]:
+        """Stages that attach tutor name and email and shape the output rows"""
+        return [
+            {"$addFields": {"tutor_oid": {"$convert": {"input": "$_id", "to": "objectId", "onError": None}}}},
+            {"$lookup": {
+                "from": TutorProfile.get_motor_collection().name,
+                "localField": "tutor_oid",
+                "foreignField": "_id",
+                "as": "profile"
+            }},
+            {"$project": {
+                "_id": 0,
+                "tutor_id": "$_id",
+                "tutor_name": {"$ifNull": [{"$first": "$profile.full_name"}, "Unknown"]},
+                "email": {"$ifNull": [{"$first": "$profile.email"}, ""]},
+                "total_sessions": 1,
+                "total_earnings": {"$round": ["$total_earnings", 2]},
+                "platform_fees_paid": {"$round": ["$platform_fees_paid", 2]},
+                "pending_earnings": {"$round": ["$pending_earnings", 2]}
+            }}
+        ]
+
+    @staticmethod
+    async def get_tutor_earnings_report(
+        skip: int = 0,
+        limit: int = 50,
+        sort_by: str = "total_earnings",
+        descending: bool = True
+    ) -> List[dict]:
+        """One page of per-tutor earnings from a single aggregation"""
+        pipeline = (
+            PaymentService._tutor_earnings_pipeline(sort_by, descending)
+            + [{"$skip": skip}, {"$limit": limit}]
+            + PaymentService._tutor_profile_join()
+        )
+        return await Payment.get_motor_collection().aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    @staticmethod
+    async def stream_tutor_earnings(
+        sort_by: str = "total_earnings",
+        descending: bool = True
+    ) -> AsyncIterator[dict]:
+        """Yield earnings rows for every tutor without holding them all in memory"""
+        pipeline = PaymentService._tutor_earnings_pipeline(sort_by, descending) + PaymentService._tutor_profile_join()
+        cursor = Payment.get_motor_collection().aggregate(pipeline, allowDiskUse=True, batchSize=500)
+        async for row in cursor:
+            yield row
 
     @staticmethod
     async def get_all_payments(
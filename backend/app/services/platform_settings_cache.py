@@ -0,0 +1,67 @@
+"""
+Platform Settings Cache - Process-wide copy of PlatformSettings
+
+Settings are read on hot paths (tutor stats, withdrawal requests) but change
+rarely. Each worker keeps the document in memory and polls only its
+`version` field every PLATFORM_SETTINGS_POLL_SECONDS, reloading when another
+worker has written. Version polling is used rather than a change stream so
+it also works against a standalone MongoDB.
+"""
+
+from datetime import datetime
+from typing import Optional
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.models.platform_settings import PlatformSettings, SINGLETON_KEY
+from app.services.background import PeriodicWorker
+
+
+class PlatformSettingsCache(PeriodicWorker):
+    """Cached platform settings with cross-worker invalidation."""
+
+    name = "PlatformSettings"
+
+    def __init__(self):
+        super().__init__(interval=settings.PLATFORM_SETTINGS_POLL_SECONDS)
+        self._settings: Optional[PlatformSettings] = None
+
+    async def run_once(self) -> bool:
+        """Reload if the stored version differs from the cached one."""
+        if self._settings is None:
+            await self.reload()
+            return False
+
+        doc = await PlatformSettings.get_motor_collection().find_one(
+            {"singleton": SINGLETON_KEY}, projection={"version": 1}
+        )
+        if not doc or doc.get("version", 0) != self._settings.version:
+            await self.reload()
+        return False
+
+    async def reload(self) -> PlatformSettings:
+        self._settings = await PlatformSettings.get_or_create()
+        return self._settings
+
+    async def get(self) -> PlatformSettings:
+        """Current settings, from memory after the first load."""
+        if self._settings is None:
+            return await self.reload()
+        return self._settings
+
+    async def update(self, changes: dict, updated_by: Optional[str] = None) -> PlatformSettings:
+        """Write changes and bump the version; this worker sees them at once, others within one poll."""
+        await PlatformSettings.get_or_create()
+        doc = await PlatformSettings.get_motor_collection().find_one_and_update(
+            {"singleton": SINGLETON_KEY},
+            {
+                "$set": {**changes, "updated_at": datetime.utcnow(), "updated_by": updated_by},
+                "$inc": {"version": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        self._settings = PlatformSettings.model_validate(doc)
+        return self._settings
+
+
+# Singleton instance
+platform_settings_cache = PlatformSettingsCache()
@@ -1,26 +1,148 @@
 """
 Razorpay Payment Integration Service
+
+Talks to the Razorpay REST API through one pooled `httpx.AsyncClient`
+(created on first use, closed at shutdown) so checkout calls never block the
+event loop. Every call has a timeout; idempotent calls are retried with
+exponential backoff and full jitter on timeouts, connection errors, 429 and
+5xx. Calls that create money movements are only retried when the request
+never reached the server. Per-operation latency and error counts are kept in
+memory for monitoring. Point RAZORPAY_API_URL at `razorpay_stub.py` to run
+offline.
 """
 
-import razorpay
+import asyncio
 import hmac
 import hashlib
-from typing import Optional, Dict, Any
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List
+import httpx
 from app.core.config import settings
-from app.models.payment import Payment, PaymentStatus
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Status codes worth retrying for idempotent calls
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Latency samples kept per operation
+LATENCY_SAMPLES = 500
+
+
+class RazorpayError(Exception):
+    """Razorpay call failed (after retries)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class RazorpayService:
     """Service for handling Razorpay payments"""
 
     def __init__(self):
-        self.client = razorpay.Client(
-            auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-        )
         self.key_id = settings.RAZORPAY_KEY_ID
+        self._client: Optional[httpx.AsyncClient] = None
+        self._metrics: Dict[str, dict] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=settings.RAZORPAY_API_URL,
+                auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+                timeout=httpx.Timeout(
+                    settings.RAZORPAY_TIMEOUT_SECONDS,
+                    connect=settings.RAZORPAY_CONNECT_TIMEOUT_SECONDS
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.RAZORPAY_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.RAZORPAY_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close pooled connections (called at shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        json: Optional[dict] = None,
+        idempotent: bool = False,
+        params: Optional[dict] = None
+    ) -> Dict[str, Any]:
+        """Send one API call with retries; returns the JSON body or raises RazorpayError."""
+        max_attempts = 1 + settings.RAZORPAY_MAX_RETRIES
+        for attempt in range(1, max_attempts + 1):
+            started = time.perf_counter()
+            retryable = False
+            try:
+                response = await self.client.request(method, path, json=json, params=params)
+                self._record(operation, started, ok=response.status_code < 400, retry=attempt > 1)
+                if response.status_code < 400:
+                    return response.json()
+                retryable = idempotent and response.status_code in RETRYABLE_STATUS
+                error = RazorpayError(self._error_message(response), response.status_code)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached Razorpay, so any call is safe to repeat
+                self._record(operation, started, ok=False, retry=attempt > 1)
+                retryable = True
+                error = RazorpayError(f"{type(e).__name__}: {e}")
+            except httpx.HTTPError as e:
+                self._record(operation, started, ok=False, retry=attempt > 1)
+                retryable = idempotent
+                error = RazorpayError(f"{type(e).__name__}: {e}")
+
+            if not retryable or attempt == max_attempts:
+                raise error
+            # Full jitter: sleep a random time up to the exponential backoff
+            backoff = settings.RAZORPAY_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+            await asyncio.sleep(random.uniform(0, backoff))
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        try:
+            return response.json()["error"]["description"]
+        except Exception:
+            return f"HTTP {response.status_code}"
 
-    def create_order(
+    def _record(self, operation: str, started: float, ok: bool, retry: bool) -> None:
+        metrics = self._metrics.setdefault(operation, {
+            "calls": 0, "errors": 0, "retries": 0, "latencies": deque(maxlen=LATENCY_SAMPLES)
+        })
+        metrics["calls"] += 1
+        metrics["errors"] += 0 if ok else 1
+        metrics["retries"] += 1 if retry else 0
+        metrics["latencies"].append((time.perf_counter() - started) * 1000)
+
+    def get_metrics(self) -> Dict[str, dict]:
+        """Per-operation call counts and latency percentiles in ms (this process only)"""
+        result = {}
+        for operation, metrics in self._metrics.items():
+            latencies = sorted(metrics["latencies"])
+
+            def percentile(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+            result[operation] = {
+                "calls": metrics["calls"],
+                "errors": metrics["errors"],
+                "retries": metrics["retries"],
+                "latency_ms_p50": percentile(0.50),
+                "latency_ms_p95": percentile(0.95),
+                "latency_ms_max": round(latencies[-1], 2) if latencies else None
+            }
+        return result
+
+    async def create_order(
         self,
         amount: float,
         currency: str = "INR",
@@ -50,7 +172,7 @@ class RazorpayService:
         }
 
         try:
-            order = self.client.order.create(data=order_data)
+            order = await self._request("create_order", "POST", "/orders", json=order_data)
             return {
                 "success": True,
                 "order_id": order["id"],
@@ -58,7 +180,7 @@ class RazorpayService:
                 "currency": order["currency"],
                 "key_id": self.key_id
             }
-        except Exception as e:
+        except RazorpayError as e:
             print(f"[Razorpay] Failed to create order: {e}")
             return {
                 "success": False,
@@ -97,25 +219,51 @@ class RazorpayService:
             print(f"[Razorpay] Signature verification failed: {e}")
             return False
 
-    def fetch_payment(self, payment_id: str) -> Optional[Dict[str, Any]]:
+    def verify_webhook_signature(self, body: bytes, signature: str) -> bool:
+        """Verify the X-Razorpay-Signature header against the raw webhook body"""
+        if not settings.RAZORPAY_WEBHOOK_SECRET or not signature:
+            return False
+        expected = hmac.new(settings.RAZORPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    async def fetch_payment(self, payment_id: str) -> Optional[Dict[str, Any]]:
         """Fetch payment details from Razorpay"""
         try:
-            payment = self.client.payment.fetch(payment_id)
-            return payment
-        except Exception as e:
+            return await self._request("fetch_payment", "GET", f"/payments/{payment_id}", idempotent=True)
+        except RazorpayError as e:
             print(f"[Razorpay] Failed to fetch payment: {e}")
             return None
 
-    def capture_payment(self, payment_id: str, amount: int) -> Optional[Dict[str, Any]]:
+    async def list_payments(self, start: datetime, end: datetime, skip: int = 0, count: int = 100) -> List[Dict[str, Any]]:
+        """
+        One page of payments created in [start, end], newest first (Razorpay
+        caps `count` at 100). Raises RazorpayError so callers never mistake a
+        failed page for an empty one.
+        """
+        page = await self._request(
+            "list_payments", "GET", "/payments",
+            params={
+                "from": int(start.replace(tzinfo=timezone.utc).timestamp()),
+                "to": int(end.replace(tzinfo=timezone.utc).timestamp()),
+                "skip": skip,
+                "count": min(count, 100)
+            },
+            idempotent=True
+        )
+        return page.get("items", [])
+
+    async def capture_payment(self, payment_id: str, amount: int, currency: str = "INR") -> Optional[Dict[str, Any]]:
         """Capture an authorized payment"""
         try:
-            payment = self.client.payment.capture(payment_id, amount)
-            return payment
-        except Exception as e:
+            return await self._request(
+                "capture_payment", "POST", f"/payments/{payment_id}/capture",
+                json={"amount": amount, "currency": currency}
+            )
+        except RazorpayError as e:
             print(f"[Razorpay] Failed to capture payment: {e}")
             return None
 
-    def refund_payment(
+    async def refund_payment(
         self,
         payment_id: str,
         amount: Optional[int] = None
@@ -132,9 +280,8 @@ class RazorpayService:
             if amount:
                 refund_data["amount"] = amount
 
-            refund = self.client.payment.refund(payment_id, refund_data)
-            return refund
-        except Exception as e:
+            return await self._request("refund_payment", "POST", f"/payments/{payment_id}/refund", json=refund_data)
+        except RazorpayError as e:
             print(f"[Razorpay] Failed to refund payment: {e}")
             return None
 
@@ -0,0 +1,156 @@
+"""
+Reminder Scheduler - Sends session reminders at configured offsets
+
+Only the worker holding the `reminder_scheduler` lease runs it. Each tick it
+extends a rolling window (REMINDER_WINDOW_MINUTES ahead) by range-scanning
+confirmed bookings on the (status, scheduled_at) index, and pushes one heap
+entry per (booking, offset) into an in-memory min-heap keyed by fire time.
+Due entries are popped and sent through the notification and email paths.
+
+Before sending, the offset is added to `Booking.reminders_sent` with a
+conditional update, so a reminder is never sent twice even across leader
+changes. The loaded window is re-read every REMINDER_RESCAN_SECONDS to pick
+up bookings confirmed after it was first loaded.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.models.tutor import TutorProfile
+from app.services.background import PeriodicWorker
+from app.services.email_service import email_service
+from app.services.notification_service import notification_service
+
+
+class ReminderScheduler(PeriodicWorker):
+    """Leader-only heap scheduler for booking reminders."""
+
+    name = "Reminders"
+
+    def __init__(self):
+        super().__init__(interval=settings.REMINDER_TICK_SECONDS, lease_name="reminder_scheduler")
+        self._heap: List[Tuple[datetime, str, int]] = []  # (fire_at, booking_id, offset_minutes)
+        self._scheduled: Set[Tuple[str, int]] = set()
+        self._loaded_until: Optional[datetime] = None
+        self._last_rescan: Optional[datetime] = None
+
+    def on_leadership_lost(self) -> None:
+        self._heap.clear()
+        self._scheduled.clear()
+        self._loaded_until = None
+        self._last_rescan = None
+
+    async def run_once(self) -> bool:
+        now = datetime.utcnow()
+        horizon = now + timedelta(minutes=settings.REMINDER_WINDOW_MINUTES)
+
+        rescan_due = (
+            self._last_rescan is None
+            or (now - self._last_rescan).total_seconds() >= settings.REMINDER_RESCAN_SECONDS
+        )
+        if self._loaded_until is None or rescan_due:
+            await self._load_window(now - timedelta(minutes=settings.REMINDER_GRACE_MINUTES), horizon)
+            self._last_rescan = now
+        elif self._loaded_until < horizon:
+            await self._load_window(self._loaded_until, horizon)
+        self._loaded_until = horizon
+
+        await self._fire_due(now)
+        return False
+
+    async def _load_window(self, start: datetime, end: datetime) -> None:
+        """Push reminders firing in (start, end] onto the heap."""
+        collection = Booking.get_motor_collection()
+        for offset in settings.REMINDER_OFFSETS_MINUTES:
+            delta = timedelta(minutes=offset)
+            cursor = collection.find(
+                {
+                    "status": BookingStatus.CONFIRMED.value,
+                    "scheduled_at": {"$gt": start + delta, "$lte": end + delta},
+                    "reminders_sent": {"$ne": offset}
+                },
+                projection={"scheduled_at": 1}
+            )
+            async for doc in cursor:
+                key = (str(doc["_id"]), offset)
+                if key in self._scheduled:
+                    continue
+                self._scheduled.add(key)
+                heapq.heappush(self._heap, (doc["scheduled_at"] - delta, key[0], offset))
+
+    async def _fire_due(self, now: datetime) -> None:
+        while self._heap and self._heap[0][0] <= now:
+            _, booking_id, offset = heapq.heappop(self._heap)
+            self._scheduled.discard((booking_id, offset))
+            try:
+                await self._send_reminder(booking_id, offset)
+            except Exception as e:
+                print(f"[Reminders] Failed to send {offset}m reminder for booking {booking_id}: {e}")
+
+    async def _send_reminder(self, booking_id: str, offset: int) -> None:
+        # Record the sent marker first; skip if cancelled or already sent
+        doc = await Booking.get_motor_collection().find_one_and_update(
+            {
+                "_id": ObjectId(booking_id),
+                "status": BookingStatus.CONFIRMED.value,
+                "reminders_sent": {"$ne": offset}
+            },
+            {"$addToSet": {"reminders_sent": offset}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            return
+        booking = Booking.model_validate(doc)
+
+        try:
+            await notification_service.notify_booking_reminder(
+                user_id=booking.student_id,
+                subject=booking.subject,
+                booking_id=booking_id,
+                scheduled_at=booking.scheduled_at,
+                other_party_name=booking.tutor_name or "your tutor",
+                is_student=True
+            )
+            tutor = await TutorProfile.get(booking.tutor_id)
+            if tutor:
+                await notification_service.notify_booking_reminder(
+                    user_id=tutor.user_id,
+                    subject=booking.subject,
+                    booking_id=booking_id,
+                    scheduled_at=booking.scheduled_at,
+                    other_party_name=booking.student_name or "your student",
+                    is_student=False
+                )
+        except Exception as e:
+            print(f"[Reminders] Failed to create reminder notification: {e}")
+
+        if booking.student_email:
+            await email_service.send_session_reminder_email(
+                to_email=booking.student_email,
+                recipient_name=booking.student_name or "",
+                other_party_name=booking.tutor_name or "",
+                subject_name=booking.subject,
+                scheduled_at=booking.scheduled_at,
+                meeting_link=booking.meeting_link,
+                is_for_tutor=False
+            )
+        if booking.tutor_email:
+            await email_service.send_session_reminder_email(
+                to_email=booking.tutor_email,
+                recipient_name=booking.tutor_name or "",
+                other_party_name=booking.student_name or "",
+                subject_name=booking.subject,
+                scheduled_at=booking.scheduled_at,
+                meeting_link=booking.meeting_link,
+                is_for_tutor=True
+            )
+
+        print(f"[Reminders] Sent {offset}m reminder for booking {booking_id}")
+
+
+# Singleton instance
+reminder_scheduler = ReminderScheduler()
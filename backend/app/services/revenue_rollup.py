@@ -0,0 +1,318 @@
+"""
+Revenue Rollup - Daily per-currency PlatformRevenue maintenance
+
+Payments are bucketed by the UTC day they completed. Completing a payment
+adds its amounts to that day's row, refunding subtracts them again and
+records the refund, all with `$inc` upserts so concurrent updates never
+lose writes. `rebuild` recomputes rows from the payments collection for
+backfills or after a manual data fix; it runs alongside live updates by
+only overwriting rows whose `revision` did not move while it computed them.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.models.payment import Payment, PaymentStatus, PlatformRevenue
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+
+# Column name in the time series -> rollup field
+SERIES_FIELDS = {
+    "revenue": "total_platform_revenue",
+    "commission_fees": "total_commission_fees",
+    "admission_fees": "total_admission_fees",
+    "session_fees": "total_session_fees",
+    "bookings": "total_bookings",
+}
+
+# Passes over rows that a live update changed while they were being rebuilt
+REBUILD_ATTEMPTS = 5
+
+AMOUNT_FIELDS = {
+    "total_session_fees": "session_amount",
+    "total_admission_fees": "admission_fee",
+    "total_commission_fees": "commission_fee",
+    "total_platform_revenue": "total_platform_fee",
+    "total_tutor_payouts": "tutor_earnings",
+}
+
+
+def day_of(value: datetime) -> datetime:
+    """Midnight UTC of the day containing `value`."""
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """Start of the day, ISO week (Monday) or month containing `value`."""
+    day = day_of(value)
+    if granularity == WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(value: datetime, granularity: str) -> datetime:
+    if granularity == WEEK:
+        return value + timedelta(days=7)
+    if granularity == MONTH:
+        return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+    return value + timedelta(days=1)
+
+
+def _payment_increments(payment: Payment, sign: int) -> Dict[str, float]:
+    inc = {field: sign * getattr(payment, source) for field, source in AMOUNT_FIELDS.items()}
+    inc["total_bookings"] = sign
+    inc["new_student_bookings"] = sign if payment.is_first_booking else 0
+    if sign < 0:
+        inc["total_refunds"] = payment.session_amount
+        inc["refunded_bookings"] = 1
+    return inc
+
+
+class RevenueRollupService:
+    """Keeps PlatformRevenue rows in step with payment state changes."""
+
+    @staticmethod
+    async def record_completed(payments: Iterable[Payment]) -> None:
+        """Add newly completed payments to their day's rollup."""
+        await RevenueRollupService._apply(payments, sign=1)
+
+    @staticmethod
+    async def record_refunded(payments: Iterable[Payment]) -> None:
+        """Remove refunded payments from their completion day's rollup."""
+        await RevenueRollupService._apply(payments, sign=-1)
+
+    @staticmethod
+    async def _apply(payments: Iterable[Payment], sign: int) -> None:
+        buckets: Dict[Tuple[datetime, str], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for payment in payments:
+            key = (day_of(payment.completed_at or payment.created_at), payment.currency)
+            for field, amount in _payment_increments(payment, sign).items():
+                buckets[key][field] += amount
+
+        if not buckets:
+            return
+
+        now = datetime.utcnow()
+        await PlatformRevenue.get_motor_collection().bulk_write([
+            UpdateOne(
+                {"date": date, "currency": currency},
+                {
+                    "$inc": {**inc, "revision": 1},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            )
+            for (date, currency), inc in buckets.items()
+        ], ordered=False)
+
+    @staticmethod
+    async def get_rows(
+        currency: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[PlatformRevenue]:
+        """Rollup rows for a currency with start <= date < end, oldest first."""
+        query: dict = {"currency": currency}
+        if start or end:
+            query["date"] = {}
+            if start:
+                query["date"]["$gte"] = day_of(start)
+            if end:
+                query["date"]["$lt"] = end
+        return await PlatformRevenue.find(query).sort("date").to_list()
+
+    @staticmethod
+    async def get_timeseries(
+        currency: str,
+        start: datetime,
+        end: datetime,
+        granularity: str = DAY,
+        from_payments: bool = False
+    ) -> dict:
+        """
+        Column-oriented series over [start, end) bucketed by day, week or month,
+        with empty buckets filled with zeros. Reads the daily rollups; with
+        `from_payments` it aggregates the payments collection directly instead.
+        """
+        if from_payments:
+            sums = await RevenueRollupService._sum_payments(currency, start, end, granularity)
+        else:
+            sums = await RevenueRollupService._sum_rollups(currency, start, end, granularity)
+
+        series: Dict[str, list] = {"buckets": [], **{column: [] for column in SERIES_FIELDS}}
+        bucket = bucket_start(start, granularity)
+        while bucket < end:
+            values = sums.get(bucket, {})
+            series["buckets"].append(bucket)
+            for column in SERIES_FIELDS:
+                amount = values.get(column, 0)
+                series[column].append(int(amount) if column == "bookings" else round(amount, 2))
+            bucket = next_bucket(bucket, granularity)
+
+        return {"currency": currency, "granularity": granularity, **series}
+
+    @staticmethod
+    async def _sum_rollups(currency: str, start: datetime, end: datetime, granularity: str) -> Dict[datetime, Dict[str, float]]:
+        cursor = PlatformRevenue.get_motor_collection().find(
+            {"currency": currency, "date": {"$gte": day_of(start), "$lt": end}},
+            projection={"_id": 0, "date": 1, **{field: 1 for field in SERIES_FIELDS.values()}}
+        )
+        sums: Dict[datetime, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        async for row in cursor:
+            bucket = sums[bucket_start(row["date"], granularity)]
+            for column, field in SERIES_FIELDS.items():
+                bucket[column] += row.get(field, 0)
+        return sums
+
+    @staticmethod
+    async def _sum_payments(currency: str, start: datetime, end: datetime, granularity: str) -> Dict[datetime, Dict[str, float]]:
+        rows = await Payment.get_motor_collection().aggregate([
+            {"$match": {
+                "currency": currency,
+                "status": PaymentStatus.COMPLETED.value,
+                "completed_at": {"$gte": day_of(start), "$lt": end}
+            }},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$completed_at", "unit": granularity, "startOfWeek": "monday"}},
+                "revenue": {"$sum": "$total_platform_fee"},
+                "commission_fees": {"$sum": "$commission_fee"},
+                "admission_fees": {"$sum": "$admission_fee"},
+                "session_fees": {"$sum": "$session_amount"},
+                "bookings": {"$sum": 1}
+            }}
+        ]).to_list(None)
+        return {row["_id"]: row for row in rows}
+
+    @staticmethod
+    async def rebuild(start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """
+        Recompute rollups for the days in [start, end) from the payments
+        collection; both bounds are optional. Rows are overwritten only if no
+        live update touched them since they were read; those are recomputed
+        and retried. Returns the number of daily rows written.
+        """
+        date_filter: dict = {}
+        if start:
+            date_filter["$gte"] = day_of(start)
+        if end:
+            date_filter["$lt"] = day_of(end)
+
+        written, conflicts = await RevenueRollupService._rebuild_rows({"date": date_filter} if date_filter else {}, date_filter)
+        for _ in range(REBUILD_ATTEMPTS):
+            if not conflicts:
+                break
+            retried = conflicts
+            conflicts = set()
+            for date, currency in retried:
+                count, failed = await RevenueRollupService._rebuild_rows(
+                    {"date": date, "currency": currency},
+                    {"$gte": date, "$lt": date + timedelta(days=1)},
+                    currency
+                )
+                written += count
+                conflicts |= failed
+
+        if conflicts:
+            print(f"[RevenueRollup] {len(conflicts)} rows kept changing during the rebuild; run it again")
+        print(f"[RevenueRollup] Rebuilt {written} daily rows")
+        return written
+
+    @staticmethod
+    async def _rebuild_rows(
+        row_filter: dict,
+        date_filter: dict,
+        currency: Optional[str] = None
+    ) -> Tuple[int, set]:
+        """Recompute the rows matching `row_filter`; returns (rows written, conflicting keys)."""
+        collection = PlatformRevenue.get_motor_collection()
+
+        # Revisions are read before the payments, so any later $inc shows up as a conflict
+        snapshot = {
+            (doc["date"], doc["currency"]): doc.get("revision", 0)
+            async for doc in collection.find(row_filter, projection={"date": 1, "currency": 1, "revision": 1})
+        }
+        expected = await RevenueRollupService._aggregate_days(date_filter, currency)
+
+        now = datetime.utcnow()
+        written = 0
+        conflicts = set()
+        for (date, currency_code), values in expected.items():
+            key = {"date": date, "currency": currency_code}
+            if (date, currency_code) in snapshot:
+                result = await collection.update_one(
+                    {**key, "revision": snapshot[(date, currency_code)]},
+                    {"$set": {**values, "updated_at": now}, "$inc": {"revision": 1}}
+                )
+                done = result.matched_count == 1
+            else:
+                try:
+                    result = await collection.update_one(
+                        key,
+                        {"$setOnInsert": {**values, "revision": 1, "created_at": now, "updated_at": now}},
+                        upsert=True
+                    )
+                    done = result.upserted_id is not None
+                except DuplicateKeyError:
+                    done = False
+            if done:
+                written += 1
+            else:
+                conflicts.add((date, currency_code))
+
+        # Days that no longer have payments
+        for (date, currency_code), revision in snapshot.items():
+            if (date, currency_code) not in expected:
+                result = await collection.delete_one({"date": date, "currency": currency_code, "revision": revision})
+                if result.deleted_count == 0:
+                    conflicts.add((date, currency_code))
+
+        return written, conflicts
+
+    @staticmethod
+    async def _aggregate_days(date_filter: dict, currency: Optional[str] = None) -> Dict[Tuple[datetime, str], dict]:
+        """Daily rollup values computed from payments, keyed by (date, currency)."""
+        match: dict = {
+            "status": {"$in": [PaymentStatus.COMPLETED.value, PaymentStatus.REFUNDED.value]},
+            "completed_at": {"$ne": None, **date_filter}
+        }
+        if currency:
+            match["currency"] = currency
+        completed = {"$eq": ["$status", PaymentStatus.COMPLETED.value]}
+        refunded = {"$eq": ["$status", PaymentStatus.REFUNDED.value]}
+
+        group: dict = {
+            "_id": {
+                "date": {"$dateFromParts": {
+                    "year": {"$year": "$completed_at"},
+                    "month": {"$month": "$completed_at"},
+                    "day": {"$dayOfMonth": "$completed_at"}
+                }},
+                "currency": "$currency"
+            },
+            "total_bookings": {"$sum": {"$cond": [completed, 1, 0]}},
+            "new_student_bookings": {"$sum": {"$cond": [{"$and": [completed, "$is_first_booking"]}, 1, 0]}},
+            "total_refunds": {"$sum": {"$cond": [refunded, "$session_amount", 0]}},
+            "refunded_bookings": {"$sum": {"$cond": [refunded, 1, 0]}},
+        }
+        for field, source in AMOUNT_FIELDS.items():
+            group[field] = {"$sum": {"$cond": [completed, f"${source}", 0]}}
+
+        rows = await Payment.get_motor_collection().aggregate([
+            {"$match": match},
+            {"$group": group}
+        ]).to_list(None)
+        return {
+            (row["_id"]["date"], row["_id"]["currency"]): {field: row[field] for field in group if field != "_id"}
+            for row in rows
+        }
+
+
+# Singleton instance
+revenue_rollup = RevenueRollupService()
@@ -0,0 +1,120 @@
+"""
+Session Sweeper - Completes confirmed bookings whose session has ended
+
+Runs on the lease holder only. Each tick range-scans the (status,
+scheduled_at) index for confirmed sessions that have started, keeps those
+whose `scheduled_at + duration_minutes` has passed, and completes them in
+chunks of SWEEPER_CHUNK_SIZE with a single update_many.
+
+Every completion (here or by an admin) goes through `complete_bookings`,
+which flips the status and sets `completion_applied: False`. The sweeper
+then applies the downstream effects for such bookings: pending payments
+via one conditional update_many (safe to repeat, so done first), then each
+booking is fenced by its own conditional flip to `completion_applied: True`
+and tutor lesson counters are bumped in one bulk_write for only the
+bookings this tick flipped. A crash or retry can therefore never count a
+lesson twice.
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import List
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.models.tutor import TutorProfile
+from app.services.background import PeriodicWorker
+from app.services.payment_service import payment_service
+
+
+async def complete_bookings(booking_ids: List[ObjectId], from_statuses: List[BookingStatus]) -> int:
+    """
+    Mark bookings completed if still in one of `from_statuses`; returns how
+    many changed. Lesson counts and payments follow from the sweeper.
+    """
+    if not booking_ids:
+        return 0
+    now = datetime.utcnow()
+    result = await Booking.get_motor_collection().update_many(
+        {"_id": {"$in": booking_ids}, "status": {"$in": [s.value for s in from_statuses]}},
+        {"$set": {
+            "status": BookingStatus.COMPLETED.value,
+            "completed_at": now,
+            "updated_at": now,
+            "completion_applied": False
+        }}
+    )
+    if result.modified_count:
+        session_sweeper.wake()
+    return result.modified_count
+
+
+class SessionSweeper(PeriodicWorker):
+    """Leader-only bulk transition of elapsed sessions to completed."""
+
+    name = "SessionSweeper"
+
+    def __init__(self):
+        super().__init__(interval=settings.SWEEPER_INTERVAL_SECONDS, lease_name="session_sweeper")
+
+    async def run_once(self) -> bool:
+        """Complete one chunk of elapsed sessions. Returns True if more may remain."""
+        # Completions left unapplied (admin completions, or a crash mid-tick) first
+        more_to_apply = await self._apply_completions()
+
+        now = datetime.utcnow()
+        candidates = await Booking.get_motor_collection().find(
+            {
+                "status": BookingStatus.CONFIRMED.value,
+                "scheduled_at": {"$lte": now},
+                "$expr": {
+                    "$lte": [
+                        {"$add": ["$scheduled_at", {"$multiply": ["$duration_minutes", 60 * 1000]}]},
+                        now
+                    ]
+                }
+            },
+            projection={"_id": 1}
+        ).sort("scheduled_at", 1).limit(settings.SWEEPER_CHUNK_SIZE).to_list(None)
+
+        if not candidates:
+            return more_to_apply
+
+        completed = await complete_bookings([doc["_id"] for doc in candidates], [BookingStatus.CONFIRMED])
+        print(f"[SessionSweeper] Completed {completed} elapsed sessions")
+        more_to_apply = await self._apply_completions()
+        return more_to_apply or len(candidates) == settings.SWEEPER_CHUNK_SIZE
+
+    async def _apply_completions(self) -> bool:
+        """Apply tutor counters and payments for one chunk of completed bookings. True if more remain."""
+        collection = Booking.get_motor_collection()
+        pending = await collection.find(
+            {"completion_applied": False, "status": BookingStatus.COMPLETED.value},
+            projection={"tutor_id": 1}
+        ).limit(settings.SWEEPER_CHUNK_SIZE).to_list(None)
+        if not pending:
+            return False
+
+        # Payments first: completing them is conditional, so a resumed chunk cannot double-apply
+        await payment_service.complete_payments_for_bookings([str(doc["_id"]) for doc in pending])
+
+        # Claim each booking before counting it, so only one pass ever counts a lesson
+        flips = await asyncio.gather(*[
+            collection.update_one({"_id": doc["_id"], "completion_applied": False}, {"$set": {"completion_applied": True}})
+            for doc in pending
+        ])
+        lessons_by_tutor = Counter(doc["tutor_id"] for doc, flip in zip(pending, flips) if flip.modified_count)
+        tutor_updates = [
+            UpdateOne({"_id": ObjectId(tutor_id)}, {"$inc": {"total_lessons": count}})
+            for tutor_id, count in lessons_by_tutor.items()
+            if ObjectId.is_valid(tutor_id)
+        ]
+        if tutor_updates:
+            await TutorProfile.get_motor_collection().bulk_write(tutor_updates, ordered=False)
+        return len(pending) == settings.SWEEPER_CHUNK_SIZE
+
+
+# Singleton instance
+session_sweeper = SessionSweeper()
@@ -0,0 +1,251 @@
+"""
+Tutor Ledger - Atomic per-tutor balance bookkeeping
+
+Completed payments credit `available`, refunds debit it, and withdrawals
+move their amount between buckets as they change state. Reservations are a
+single conditional update (`available >= amount`), so concurrent withdrawal
+requests can never overdraw a balance. `reconcile` recomputes balances from
+payments and withdrawals to detect and repair drift.
+
+Updates never create a row: a tutor's row is first built (insert-only) from
+payments and withdrawals, so earnings from before the ledger existed are
+kept. The build counts payments by their applied effects, not their status:
+a payment still marked `effects_pending` has not been through its own $inc
+yet, so leaving it out means every concurrent first credit or debit is
+counted exactly once, whichever of them inserts the row.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.models.payment import Payment, PaymentStatus
+from app.models.tutor import TutorProfile
+from app.models.tutor_balance import TutorBalance
+from app.models.withdrawal import Withdrawal, WithdrawalStatus
+
+AVAILABLE = "available"
+RESERVED = "pending_withdrawals"
+WITHDRAWN = "withdrawn_amount"
+
+# Ledger bucket holding a withdrawal's amount in each state
+WITHDRAWAL_BUCKETS = {
+    WithdrawalStatus.PENDING: RESERVED,
+    WithdrawalStatus.APPROVED: RESERVED,
+    WithdrawalStatus.COMPLETED: WITHDRAWN,
+    WithdrawalStatus.REJECTED: AVAILABLE,
+}
+
+# Balances within this much of the recomputed value are not reported as drift
+DRIFT_TOLERANCE = 0.01
+
+
+def _empty_balance() -> dict:
+    return {"currency": "INR", "total_earnings": 0.0, AVAILABLE: 0.0, RESERVED: 0.0, WITHDRAWN: 0.0}
+
+
+class TutorLedgerService:
+    """Reads and atomic updates of TutorBalance documents."""
+
+    @staticmethod
+    async def credit_payments(payments: Iterable[Payment]) -> None:
+        """Add completed payments' tutor earnings to their tutors' balances."""
+        await TutorLedgerService._apply_payments(payments, sign=1)
+
+    @staticmethod
+    async def debit_refunds(payments: Iterable[Payment]) -> None:
+        """Remove refunded payments' tutor earnings from their tutors' balances."""
+        await TutorLedgerService._apply_payments(payments, sign=-1)
+
+    @staticmethod
+    async def _apply_payments(payments: Iterable[Payment], sign: int) -> None:
+        payments = list(payments)
+        amounts: Dict[str, float] = defaultdict(float)
+        for payment in payments:
+            amounts[payment.tutor_id] += sign * payment.tutor_earnings
+        if not amounts:
+            return
+
+        # Built from the state before these payments changed, then moved by the $inc
+        await TutorLedgerService._ensure_rows(list(amounts))
+
+        now = datetime.utcnow()
+        await TutorBalance.get_motor_collection().bulk_write([
+            UpdateOne(
+                {"tutor_id": tutor_id},
+                {"$inc": {"total_earnings": amount, AVAILABLE: amount}, "$set": {"updated_at": now}}
+            )
+            for tutor_id, amount in amounts.items()
+        ], ordered=False)
+
+    @staticmethod
+    async def _ensure_rows(tutor_ids: List[str]) -> None:
+        """
+        Insert missing balance rows computed from payments and withdrawals.
+        Existing rows are never touched; callers $inc only after this, so a
+        row lost to a concurrent insert already exists for their update.
+        """
+        existing = {
+            doc["tutor_id"]
+            async for doc in TutorBalance.get_motor_collection().find(
+                {"tutor_id": {"$in": tutor_ids}}, projection={"tutor_id": 1}
+            )
+        }
+        missing = [tutor_id for tutor_id in tutor_ids if tutor_id not in existing]
+        if not missing:
+            return
+
+        expected = await TutorLedgerService._expected(missing)
+        now = datetime.utcnow()
+        try:
+            await TutorBalance.get_motor_collection().bulk_write([
+                UpdateOne({"tutor_id": tutor_id}, {"$setOnInsert": {**values, "updated_at": now}}, upsert=True)
+                for tutor_id, values in expected.items()
+            ], ordered=False)
+        except BulkWriteError:
+            pass  # Concurrently inserted; that row already holds the built balance
+
+    @staticmethod
+    async def get_balance(tutor_id: str) -> TutorBalance:
+        """Current balance; built from source collections the first time it is read."""
+        balance = await TutorBalance.find_one(TutorBalance.tutor_id == tutor_id)
+        if balance:
+            return balance
+        await TutorLedgerService._ensure_rows([tutor_id])
+        return await TutorBalance.find_one(TutorBalance.tutor_id == tutor_id) or TutorBalance(tutor_id=tutor_id)
+
+    @staticmethod
+    async def move(tutor_id: str, amount: float, source: str, target: str) -> Optional[TutorBalance]:
+        """
+        Move `amount` between buckets. Taking from `available` only succeeds if
+        enough is available. Returns the updated balance, or None if refused.
+        """
+        if source == target or amount == 0:
+            return await TutorLedgerService.get_balance(tutor_id)
+
+        await TutorLedgerService._ensure_rows([tutor_id])
+        query: dict = {"tutor_id": tutor_id}
+        if source == AVAILABLE:
+            query[AVAILABLE] = {"$gte": amount}
+
+        doc = await TutorBalance.get_motor_collection().find_one_and_update(
+            query,
+            {
+                "$inc": {source: -amount, target: amount},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        return TutorBalance.model_validate(doc) if doc else None
+
+    @staticmethod
+    async def reserve(tutor_id: str, amount: float) -> Optional[TutorBalance]:
+        """Reserve funds for a new withdrawal request. None if the balance is insufficient."""
+        return await TutorLedgerService.move(tutor_id, amount, AVAILABLE, RESERVED)
+
+    @staticmethod
+    async def _expected(tutor_ids: Optional[List[str]]) -> Dict[str, dict]:
+        """
+        Balances recomputed from payments and withdrawals (all tutors if
+        tutor_ids is None), as of the payment effects applied so far.
+        """
+        payment_match: dict = {"$or": [
+            # Completed and credited
+            {"status": PaymentStatus.COMPLETED.value, "effects_pending": {"$ne": PaymentStatus.COMPLETED.value}},
+            # Refunded but not debited yet
+            {"status": PaymentStatus.REFUNDED.value, "effects_pending": PaymentStatus.REFUNDED.value},
+        ]}
+        profile_query: dict = {}
+        if tutor_ids is not None:
+            payment_match["tutor_id"] = {"$in": tutor_ids}
+            profile_query["_id"] = {"$in": [ObjectId(t) for t in tutor_ids if ObjectId.is_valid(t)]}
+
+        # Withdrawals are stored against the tutor's user id
+        profiles = await TutorProfile.get_motor_collection().find(
+            profile_query, projection={"user_id": 1}
+        ).to_list(None)
+        tutor_by_user = {p["user_id"]: str(p["_id"]) for p in profiles}
+
+        expected: Dict[str, dict] = {
+            tutor_id: _empty_balance()
+            for tutor_id in (tutor_ids if tutor_ids is not None else tutor_by_user.values())
+        }
+
+        payment_rows = await Payment.get_motor_collection().aggregate([
+            {"$match": payment_match},
+            {"$group": {"_id": "$tutor_id", "earnings": {"$sum": "$tutor_earnings"}, "currency": {"$last": "$currency"}}}
+        ]).to_list(None)
+        for row in payment_rows:
+            values = expected.setdefault(row["_id"], _empty_balance())
+            values["total_earnings"] = row["earnings"]
+            values["currency"] = row["currency"]
+
+        withdrawal_rows = await Withdrawal.get_motor_collection().aggregate([
+            {"$match": {"tutor_id": {"$in": list(tutor_by_user)}}},
+            {"$group": {"_id": {"user_id": "$tutor_id", "status": "$status"}, "amount": {"$sum": "$amount"}}}
+        ]).to_list(None)
+        for row in withdrawal_rows:
+            bucket = WITHDRAWAL_BUCKETS.get(WithdrawalStatus(row["_id"]["status"]))
+            if bucket and bucket != AVAILABLE:
+                expected.setdefault(tutor_by_user[row["_id"]["user_id"]], _empty_balance())[bucket] += row["amount"]
+
+        for values in expected.values():
+            values[AVAILABLE] = values["total_earnings"] - values[RESERVED] - values[WITHDRAWN]
+        return expected
+
+    @staticmethod
+    async def reconcile(tutor_ids: Optional[List[str]] = None, repair: bool = False) -> List[dict]:
+        """
+        Recompute balances from payments and withdrawals. Returns the tutors
+        whose stored balance differs; with `repair` the stored values are
+        overwritten, but only where the row was not updated since it was read
+        (a concurrent $inc would otherwise be lost; run again to catch those).
+        """
+        expected = await TutorLedgerService._expected(tutor_ids)
+
+        stored = {
+            doc["tutor_id"]: doc
+            async for doc in TutorBalance.get_motor_collection().find({"tutor_id": {"$in": list(expected)}})
+        }
+
+        drift = []
+        for tutor_id, values in expected.items():
+            current = stored.get(tutor_id)
+            if current is None or any(
+                abs(current.get(field, 0) - values[field]) > DRIFT_TOLERANCE
+                for field in ("total_earnings", AVAILABLE, RESERVED, WITHDRAWN)
+            ):
+                drift.append({"tutor_id": tutor_id, "stored": current and {
+                    field: current.get(field, 0) for field in ("total_earnings", AVAILABLE, RESERVED, WITHDRAWN)
+                }, "expected": values})
+
+        if repair and drift:
+            now = datetime.utcnow()
+            operations = []
+            for item in drift:
+                current = stored.get(item["tutor_id"])
+                if current is None:
+                    operations.append(UpdateOne(
+                        {"tutor_id": item["tutor_id"]},
+                        {"$setOnInsert": {**item["expected"], "updated_at": now}},
+                        upsert=True
+                    ))
+                else:
+                    operations.append(UpdateOne(
+                        {"tutor_id": item["tutor_id"], "updated_at": current.get("updated_at")},
+                        {"$set": {**item["expected"], "updated_at": now}}
+                    ))
+            try:
+                result = await TutorBalance.get_motor_collection().bulk_write(operations, ordered=False)
+                repaired = result.modified_count + result.upserted_count
+            except BulkWriteError as e:
+                repaired = e.details.get("nModified", 0) + e.details.get("nUpserted", 0)
+            print(f"[TutorLedger] Repaired {repaired} of {len(drift)} drifted balances")
+
+        return drift
+
+
+# Singleton instance
+tutor_ledger = TutorLedgerService()
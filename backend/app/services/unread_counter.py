@@ -0,0 +1,126 @@
+"""
+Unread Counters - Maintained per-user unread notification counts
+
+Each user's unread notification count is a Counter document named
+"notifications:unread:<user_id>". Creating a notification `$inc`s it by one;
+marking read or deleting an unread notification `$inc`s it down, only when
+the conditional write actually changed an unread row. The first read of a
+missing counter seeds it from an exact count; increments never create one.
+
+Drift (a crash between the write and the `$inc`, rows removed outside the
+API) is corrected by a leader-only repair job that recounts every user in
+one aggregation every UNREAD_REPAIR_INTERVAL_SECONDS. Counters touched in
+the last REPAIR_MIN_AGE_SECONDS are skipped so the job never races a
+write whose `$inc` is still in flight.
+"""
+
+from collections import Counter as Tally
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.models.counter import Counter
+from app.models.notification import Notification
+from app.services.background import PeriodicWorker
+from app.services.counter_service import counter_service
+
+UNREAD_PREFIX = "notifications:unread:"
+
+REPAIR_MIN_AGE_SECONDS = 60
+
+
+def counter_name(user_id: str) -> str:
+    return f"{UNREAD_PREFIX}{user_id}"
+
+
+class UnreadCounterService:
+    """Read and adjust per-user unread notification counters."""
+
+    @staticmethod
+    async def get(user_id: str) -> int:
+        async def recount() -> int:
+            return await Notification.find(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            ).count()
+
+        return max(0, await counter_service.get(counter_name(user_id), recount))
+
+    @staticmethod
+    async def add(user_id: str, delta: int) -> Optional[int]:
+        """Adjust a user's counter; returns the new value, or None if it is not seeded yet."""
+        if not delta:
+            return None
+        value = await counter_service.increment(counter_name(user_id), delta, upsert=False)
+        return max(0, value) if value is not None else None
+
+    @staticmethod
+    async def add_for_users(user_ids: Iterable[str]) -> None:
+        """One new unread notification for each listed user (repeats count twice)."""
+        tally = Tally(user_ids)
+        await counter_service.increment_many(
+            {counter_name(user_id): delta for user_id, delta in tally.items()},
+            upsert=False
+        )
+
+
+class UnreadCounterRepair(PeriodicWorker):
+    """Leader-only periodic recount of every stored unread counter."""
+
+    name = "UnreadCounterRepair"
+
+    def __init__(self):
+        super().__init__(
+            interval=settings.UNREAD_REPAIR_INTERVAL_SECONDS or 3600.0,
+            lease_name="unread_counter_repair"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return settings.UNREAD_REPAIR_INTERVAL_SECONDS > 0
+
+    async def run_once(self) -> bool:
+        await self.repair()
+        return False
+
+    async def repair(self) -> int:
+        """Overwrite counters that disagree with the notifications; returns how many were fixed."""
+        started = datetime.utcnow()
+        settled_before = started - timedelta(seconds=REPAIR_MIN_AGE_SECONDS)
+
+        stored: Dict[str, int] = {
+            doc["name"][len(UNREAD_PREFIX):]: doc["value"]
+            async for doc in Counter.get_motor_collection().find(
+                {"name": {"$regex": f"^{UNREAD_PREFIX}"}, "updated_at": {"$lt": settled_before}},
+                projection={"name": 1, "value": 1}
+            )
+        }
+        if not stored:
+            return 0
+
+        actual: Dict[str, int] = {
+            row["_id"]: row["count"]
+            async for row in Notification.get_motor_collection().aggregate([
+                {"$match": {"is_read": False}},
+                {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+            ])
+        }
+
+        # Users without a counter are seeded exactly on their first read
+        operations = [
+            UpdateOne(
+                {"name": counter_name(user_id), "updated_at": {"$lt": settled_before}},
+                {"$set": {"value": actual.get(user_id, 0), "updated_at": started}}
+            )
+            for user_id, value in stored.items()
+            if value != actual.get(user_id, 0)
+        ]
+        if operations:
+            await Counter.get_motor_collection().bulk_write(operations, ordered=False)
+        print(f"[UnreadCounterRepair] Checked {len(stored)} counters, fixed {len(operations)}")
+        return len(operations)
+
+
+# Singleton instances
+unread_counters = UnreadCounterService()
+unread_counter_repair = UnreadCounterRepair()
@@ -0,0 +1,236 @@
+"""
+Webhook Processor - Applies stored Razorpay webhook events in batches
+
+The webhook route only verifies the signature and inserts the raw event
+(unique on the gateway event id, so redeliveries are dropped). This
+leader-only worker then drains pending events WEBHOOK_BATCH_SIZE at a time:
+payments are looked up with one `$in` query per id type, state changes go
+through `payment_service.transition_payments` (conditional on the current
+status, so replays and races with `/payments/verify` are no-ops), and
+booking and event updates are each a single bulk_write.
+
+If a batch fails, its events are applied one at a time so only the
+failing event is charged an attempt. Payment events that match no local
+payment yet (the gateway can be faster than our own write) stay pending
+and are retried with backoff before being ignored.
+
+A status change marks the payment `effects_pending` until its rollup and
+ledger effects are applied. An event whose payment still has effects
+pending stays pending too; once the mark is EFFECTS_RESUME_AFTER_SECONDS
+old (a failed batch, a crashed /verify) the processor takes it over and
+applies the booking status, rollup/ledger effects and tutor notification
+itself, so a failure between the transition and its effects loses nothing.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from app.core.config import settings
+from app.models.payment import Payment, PaymentStatus
+from app.models.webhook_event import WebhookEvent, WebhookEventStatus
+from app.services.background import PeriodicWorker
+from app.services.notification_service import notification_service
+from app.services.payment_service import payment_service
+
+CAPTURED_EVENTS = {"payment.captured", "order.paid"}
+FAILED_EVENTS = {"payment.failed"}
+REFUND_EVENTS = {"refund.processed"}
+PAYMENT_EVENTS = CAPTURED_EVENTS | FAILED_EVENTS | REFUND_EVENTS
+
+# Backoff between attempts of a failed or not yet matched event
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 900
+
+# Effects left pending this long are assumed abandoned and taken over
+EFFECTS_RESUME_AFTER_SECONDS = 60
+
+
+def _entity(payload: dict, name: str) -> dict:
+    return (payload.get(name) or {}).get("entity") or {}
+
+
+class WebhookProcessor(PeriodicWorker):
+    """Leader-only batch application of pending webhook events."""
+
+    name = "WebhookProcessor"
+
+    def __init__(self):
+        super().__init__(interval=settings.WEBHOOK_POLL_INTERVAL_SECONDS, lease_name="razorpay_webhooks")
+
+    async def run_once(self) -> bool:
+        """Apply one batch of due events. Returns True if more may remain."""
+        now = datetime.utcnow()
+        events = await WebhookEvent.get_motor_collection().find(
+            {"status": WebhookEventStatus.PENDING.value, "next_attempt_at": {"$not": {"$gt": now}}}
+        ).sort("received_at", 1).limit(settings.WEBHOOK_BATCH_SIZE).to_list(None)
+        if not events:
+            return False
+
+        failed: Dict[ObjectId, Exception] = {}
+        try:
+            handled = await self._apply(events)
+        except Exception:
+            # Isolate the bad event; transitions are conditional and unfinished
+            # effects stay marked, so re-applying is safe
+            handled = set()
+            for event in events:
+                try:
+                    handled |= await self._apply([event])
+                except Exception as e:
+                    failed[event["_id"]] = e
+
+        await WebhookEvent.get_motor_collection().bulk_write(
+            [self._outcome(event, handled, failed, now) for event in events],
+            ordered=False
+        )
+
+        print(f"[WebhookProcessor] Applied {len(handled)} of {len(events)} events ({len(failed)} failed)")
+        return len(events) == settings.WEBHOOK_BATCH_SIZE
+
+    @staticmethod
+    def _outcome(event: dict, handled: Set[ObjectId], failed: Dict[ObjectId, Exception], now: datetime) -> UpdateOne:
+        """Status update for one event after a batch."""
+        attempts = event.get("attempts", 0) + 1
+        if event["_id"] in handled:
+            changes = {"status": WebhookEventStatus.PROCESSED.value, "processed_at": now}
+        elif event["event"] not in PAYMENT_EVENTS:
+            changes = {"status": WebhookEventStatus.IGNORED.value, "processed_at": now}
+        elif attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            # Failing, or still no matching payment; payment reconciliation covers the rest
+            status = WebhookEventStatus.FAILED if event["_id"] in failed else WebhookEventStatus.IGNORED
+            changes = {"status": status.value, "processed_at": now}
+        else:
+            delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+            changes = {"next_attempt_at": now + timedelta(seconds=delay)}
+        if event["_id"] in failed:
+            print(f"[WebhookProcessor] Event {event['event_id']} failed (attempt {attempts}): {failed[event['_id']]}")
+            changes["last_error"] = str(failed[event["_id"]])[:500]
+        return UpdateOne({"_id": event["_id"]}, {"$set": changes, "$inc": {"attempts": 1}})
+
+    async def _apply(self, events: List[dict]) -> Set[ObjectId]:
+        """
+        Apply a batch of events. Returns the ids of events that matched a
+        payment whose effects are all applied.
+        """
+        captured: Dict[str, str] = {}  # order id -> gateway payment id
+        failed: Set[str] = set()  # order ids
+        refunded: Set[str] = set()  # gateway payment ids
+        for event in events:
+            payload = event.get("payload") or {}
+            payment = _entity(payload, "payment")
+            if event["event"] in CAPTURED_EVENTS:
+                order_id = payment.get("order_id") or _entity(payload, "order").get("id")
+                if order_id:
+                    captured[order_id] = payment.get("id")
+            elif event["event"] in FAILED_EVENTS and payment.get("order_id"):
+                failed.add(payment["order_id"])
+            elif event["event"] in REFUND_EVENTS:
+                payment_id = _entity(payload, "refund").get("payment_id") or payment.get("id")
+                if payment_id:
+                    refunded.add(payment_id)
+
+        collection = Payment.get_motor_collection()
+        projection = {
+            "razorpay_order_id": 1, "razorpay_payment_id": 1, "booking_id": 1,
+            "effects_pending": 1, "effects_pending_at": 1
+        }
+        by_order = {
+            doc["razorpay_order_id"]: doc
+            async for doc in collection.find({"razorpay_order_id": {"$in": list(captured.keys() | failed)}}, projection)
+        } if captured or failed else {}
+
+        completed = await payment_service.transition_payments(
+            {
+                by_order[order_id]["_id"]: {"razorpay_payment_id": gateway_id} if gateway_id else {}
+                for order_id, gateway_id in captured.items() if order_id in by_order
+            },
+            [PaymentStatus.PENDING, PaymentStatus.FAILED], PaymentStatus.COMPLETED, "completed_at"
+        )
+
+        # A capture in the same batch wins over an earlier failed attempt
+        failed_orders = [order_id for order_id in failed if order_id in by_order and order_id not in captured]
+        if failed_orders:
+            await collection.update_many(
+                {"razorpay_order_id": {"$in": failed_orders}, "status": PaymentStatus.PENDING.value},
+                {"$set": {"status": PaymentStatus.FAILED.value}}
+            )
+
+        # Looked up after completions so a capture and refund in one batch both apply
+        by_gateway_payment = {
+            doc["razorpay_payment_id"]: doc
+            async for doc in collection.find({"razorpay_payment_id": {"$in": list(refunded)}}, projection)
+        } if refunded else {}
+        refunds = await payment_service.transition_payments(
+            {doc["_id"]: {} for doc in by_gateway_payment.values()},
+            [PaymentStatus.COMPLETED], PaymentStatus.REFUNDED, "refunded_at"
+        )
+
+        # Effects an earlier transition left unapplied
+        changed = {p.id for p in completed + refunds}
+        unfinished = {
+            doc["_id"]: doc
+            for doc in list(by_order.values()) + list(by_gateway_payment.values())
+            if doc.get("effects_pending") and doc["_id"] not in changed
+        }
+        resumed, busy = await self._take_over_effects(list(unfinished.values()))
+        completed += [p for p in resumed if p.effects_pending == PaymentStatus.COMPLETED]
+        refunds += [p for p in resumed if p.effects_pending == PaymentStatus.REFUNDED]
+
+        # Rollups and ledger clear the mark, so everything up to them is retried;
+        # tutors are told once that has stuck
+        await payment_service.set_booking_payment_status(
+            [(p.booking_id, "paid") for p in completed] + [(p.booking_id, "refunded") for p in refunds]
+        )
+        await payment_service.record_completed(completed)
+        await payment_service.record_refunded(refunds)
+        try:
+            await notification_service.notify_bookings_paid([p.booking_id for p in completed])
+        except Exception as e:
+            print(f"[WebhookProcessor] Failed to notify tutors: {e}")
+
+        handled = set()
+        for event in events:
+            payload = event.get("payload") or {}
+            payment = _entity(payload, "payment")
+            if event["event"] in CAPTURED_EVENTS | FAILED_EVENTS:
+                doc = by_order.get(payment.get("order_id") or _entity(payload, "order").get("id"))
+            elif event["event"] in REFUND_EVENTS:
+                doc = by_gateway_payment.get(_entity(payload, "refund").get("payment_id") or payment.get("id"))
+            else:
+                continue
+            if doc is not None and doc["_id"] not in busy:
+                handled.add(event["_id"])
+        return handled
+
+    @staticmethod
+    async def _take_over_effects(docs: List[dict]) -> Tuple[List[Payment], Set[ObjectId]]:
+        """
+        Claim payments whose effects were left pending long enough to be
+        abandoned. Returns the claimed payments and the ids still owned elsewhere.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=EFFECTS_RESUME_AFTER_SECONDS)
+        claimed: List[Payment] = []
+        busy: Set[ObjectId] = set()
+        for doc in docs:
+            taken = None
+            if not doc.get("effects_pending_at") or doc["effects_pending_at"] <= cutoff:
+                taken = await Payment.get_motor_collection().find_one_and_update(
+                    {
+                        "_id": doc["_id"],
+                        "effects_pending": doc["effects_pending"],
+                        "effects_pending_at": doc.get("effects_pending_at")
+                    },
+                    {"$set": {"effects_pending_at": now}},
+                    return_document=ReturnDocument.AFTER
+                )
+            if taken:
+                claimed.append(Payment.model_validate(taken))
+            else:
+                busy.add(doc["_id"])
+        return claimed, busy
+
+
+# Singleton instance
+webhook_processor = WebhookProcessor()
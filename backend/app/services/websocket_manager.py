@@ -1,70 +1,198 @@
 """
 WebSocket Connection Manager for real-time notifications
+
+Sockets are held per worker process. Messages are published on the
+backplane (see ws_backplane.py) and every worker delivers them to its own
+sockets, so users connected to any worker receive them.
+
+Each socket has a bounded outbound queue drained by its own writer task.
+Delivery serializes a message once and only enqueues the shared string, so
+fan-out never waits on a slow client. A socket whose queue overflows or
+whose send exceeds WS_SEND_TIMEOUT_SECONDS is closed and evicted.
 """
 
 from fastapi import WebSocket
-from typing import Dict, List, Optional
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
 import json
 import asyncio
 from datetime import datetime
+from app.core.config import settings
+from app.services.ws_backplane import Backplane, create_backplane
+
+# Close code sent to evicted slow consumers (client should reconnect)
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+class ClientConnection:
+    """One accepted socket with its outbound queue and writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        on_failure: Callable[["ClientConnection", str], None],
+        role: Optional[str] = None
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.role = role
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._on_failure = on_failure
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, data: str) -> bool:
+        """Queue serialized JSON for sending; False if the queue is full."""
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def send(self, message: dict) -> bool:
+        """Queue a message for this socket only."""
+        return self.enqueue(json.dumps(message))
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                data = await self.queue.get()
+                # asyncio.timeout, unlike wait_for, never swallows a cancel that races a finished send
+                async with asyncio.timeout(settings.WS_SEND_TIMEOUT_SECONDS):
+                    await self.websocket.send_text(data)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._on_failure(self, "send timed out")
+        except Exception as e:
+            self._on_failure(self, f"send failed: {e}")
+
+    async def close(self, code: int = 1000) -> None:
+        """Stop the writer and close the socket (best effort)."""
+        self._writer.cancel()
+        try:
+            async with asyncio.timeout(settings.WS_SEND_TIMEOUT_SECONDS):
+                await self.websocket.close(code=code)
+        except Exception:
+            pass
 
 
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time notifications.
-    Maps user_id to their active WebSocket connections (supports multiple tabs/devices).
+    Maps user_id to their active connections (supports multiple tabs/devices).
+    Connection counts and online checks only cover this worker's sockets.
+
+    Users with a socket here also get an in-memory mirror of their unread
+    badge count, kept current from the UNREAD_COUNT, NEW_NOTIFICATION and
+    ALL_NOTIFICATIONS_READ messages delivered to them, so badge reads for
+    online users need no query. Their announcement receipts are mirrored
+    too (filled by announcement_service) and dropped when a message reports
+    that they changed, on whichever worker the change was made.
     """
 
-    def __init__(self):
-        # user_id -> list of WebSocket connections
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, backplane: Backplane):
+        # user_id -> connections of that user
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        # user_id -> unread badge count, for users connected to this worker
+        self.unread_counts: Dict[str, int] = {}
+        # user_id -> (announcement ids covered, receipts by announcement id), same users
+        self.announcement_receipts: Dict[str, Tuple[FrozenSet[str], Dict[str, dict]]] = {}
         # Lock for thread-safe operations
         self._lock = asyncio.Lock()
+        self.backplane = backplane
+        backplane.subscribe(self.deliver_local)
+        self.evicted_count = 0
+        self._closing: Set[asyncio.Task] = set()
 
-    async def connect(self, websocket: WebSocket, user_id: str) -> None:
-        """Accept a new WebSocket connection for a user."""
+    async def connect(self, websocket: WebSocket, user_id: str, role: Optional[str] = None) -> ClientConnection:
+        """Accept a new WebSocket connection for a user (role enables role broadcasts)."""
         await websocket.accept()
+        connection = ClientConnection(websocket, user_id, self._evict, role)
         async with self._lock:
-            if user_id not in self.active_connections:
-                self.active_connections[user_id] = []
-            self.active_connections[user_id].append(websocket)
+            self.active_connections.setdefault(user_id, []).append(connection)
         print(f"[WS] User {user_id} connected. Total connections: {len(self.active_connections[user_id])}")
+        return connection
 
     async def disconnect(self, websocket: WebSocket, user_id: str) -> None:
         """Remove a WebSocket connection for a user."""
         async with self._lock:
-            if user_id in self.active_connections:
-                if websocket in self.active_connections[user_id]:
-                    self.active_connections[user_id].remove(websocket)
+            connection = self._remove(websocket, user_id)
+        if connection:
+            await connection.close()
+        print(f"[WS] User {user_id} disconnected.")
+
+    def _remove(self, websocket: WebSocket, user_id: str) -> Optional[ClientConnection]:
+        connections = self.active_connections.get(user_id, [])
+        for connection in connections:
+            if connection.websocket is websocket:
+                connections.remove(connection)
                 # Clean up empty lists
-                if not self.active_connections[user_id]:
+                if not connections:
                     del self.active_connections[user_id]
-        print(f"[WS] User {user_id} disconnected.")
+                    self.unread_counts.pop(user_id, None)
+                    self.announcement_receipts.pop(user_id, None)
+                return connection
+        return None
+
+    def _evict(self, connection: ClientConnection, reason: str) -> None:
+        """Drop a slow or broken socket without blocking delivery to others."""
+        if self._remove(connection.websocket, connection.user_id) is None:
+            return
+        self.evicted_count += 1
+        print(f"[WS] Evicting connection of user {connection.user_id}: {reason}")
+        task = asyncio.create_task(connection.close(code=SLOW_CONSUMER_CLOSE_CODE))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
 
     async def send_personal_message(self, message: dict, user_id: str) -> None:
-        """Send a message to all connections of a specific user."""
-        if user_id in self.active_connections:
-            dead_connections = []
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"[WS] Error sending to user {user_id}: {e}")
-                    dead_connections.append(connection)
-
-            # Clean up dead connections
-            for dead in dead_connections:
-                await self.disconnect(dead, user_id)
+        """Send a message to all connections of a specific user, on any worker."""
+        await self.backplane.publish([user_id], message)
 
     async def send_to_users(self, message: dict, user_ids: List[str]) -> None:
-        """Send a message to multiple users."""
-        for user_id in user_ids:
-            await self.send_personal_message(message, user_id)
+        """Send a message to multiple users, on any worker."""
+        if user_ids:
+            await self.backplane.publish(list(user_ids), message)
+
+    async def send_many(self, messages: List[Tuple[str, dict]]) -> None:
+        """Send a different message to each of many users in one backplane publish."""
+        if messages:
+            await self.backplane.publish_many([([user_id], message) for user_id, message in messages])
+
+    async def broadcast(self, message: dict, role: Optional[str] = None) -> None:
+        """Broadcast a message to all connected users (optionally of one role), on every worker."""
+        await self.backplane.publish(None, message, role)
+
+    async def deliver_local(self, user_ids: Optional[List[str]], message: dict, role: Optional[str] = None) -> None:
+        """Backplane callback: queue for this worker's sockets of `user_ids` (None = all, filtered by role)."""
+        data = json.dumps(message)  # Serialized once, shared by every queue
+        targets = list(self.active_connections) if user_ids is None else user_ids
+        for user_id in targets:
+            delivered = False
+            for connection in list(self.active_connections.get(user_id, ())):
+                if role is not None and connection.role != role:
+                    continue
+                delivered = True
+                if not connection.enqueue(data):
+                    self._evict(connection, "send queue full")
+            if delivered and user_id in self.active_connections:
+                self._track_unread(user_id, message)
 
-    async def broadcast(self, message: dict) -> None:
-        """Broadcast a message to all connected users."""
-        for user_id in list(self.active_connections.keys()):
-            await self.send_personal_message(message, user_id)
+    def _track_unread(self, user_id: str, message: dict) -> None:
+        """Keep the unread mirror in step with what the user's sockets were sent."""
+        kind = message.get("type")
+        if kind == "UNREAD_COUNT":
+            self.unread_counts[user_id] = message["data"]["count"]
+            if message["data"].get("receipts_changed"):
+                self.announcement_receipts.pop(user_id, None)
+        elif kind == "ALL_NOTIFICATIONS_READ":
+            self.unread_counts[user_id] = 0
+            self.announcement_receipts.pop(user_id, None)
+        elif kind == "NEW_NOTIFICATION" and user_id in self.unread_counts:
+            self.unread_counts[user_id] += 1
+
+    def get_unread_count(self, user_id: str) -> Optional[int]:
+        """Mirrored unread count of a user connected to this worker, if known."""
+        return self.unread_counts.get(user_id)
 
     def is_user_online(self, user_id: str) -> bool:
         """Check if a user has any active connections."""
@@ -80,7 +208,7 @@ class ConnectionManager:
 
 
 # Singleton instance
-manager = ConnectionManager()
+manager = ConnectionManager(create_backplane())
 
 
 class NotificationPayload:
@@ -114,11 +242,23 @@ class NotificationPayload:
         }
 
     @staticmethod
-    def unread_count(count: int) -> dict:
-        """Create payload for unread count update."""
+    def unread_count(count: int, receipts_changed: bool = False) -> dict:
+        """Create payload for unread count update (flagged when announcement receipts changed)."""
+        data = {"count": count}
+        if receipts_changed:
+            data["receipts_changed"] = True
         return {
             "type": "UNREAD_COUNT",
-            "data": {"count": count},
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    @staticmethod
+    def booking_updated(booking: dict) -> dict:
+        """Create payload when a booking changes in the background (e.g. Meet link ready)."""
+        return {
+            "type": "BOOKING_UPDATED",
+            "data": booking,
             "timestamp": datetime.utcnow().isoformat()
         }
 
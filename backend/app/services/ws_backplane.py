@@ -0,0 +1,195 @@
+"""
+WebSocket Backplane - Cross-worker fan-out of user-addressed events
+
+Sockets live in one worker process, but notifications can be raised in any
+of them. Every outgoing WebSocket message is published on the backplane as
+(user_ids, message, role); each worker delivers it to the sockets it holds
+for those users. user_ids None addresses everyone, optionally only users
+with `role`.
+
+- InMemoryBackplane: single-process delivery, for development and tests.
+- MongoBackplane: events are appended to a capped collection that every
+  worker tails with an await cursor. Works on a standalone mongod (change
+  streams would need a replica set). The publishing worker delivers its
+  own events immediately and skips them when they come back on the tail.
+  A re-opened tail resumes after the last event seen in the collection's
+  insertion order, so neither timestamps nor publisher clocks matter.
+
+Select with WS_BACKPLANE ("mongo" or "memory").
+"""
+
+import abc
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from app.core.config import settings
+
+# Local delivery callback: (user_ids or None for everyone, message, role filter)
+DeliverFn = Callable[[Optional[List[str]], dict, Optional[str]], Awaitable[None]]
+
+# Wait before re-opening a tail that ended (empty collection, network error)
+TAIL_RETRY_SECONDS = 1.0
+
+
+class Backplane(abc.ABC):
+    """Publish/subscribe interface used by the ConnectionManager."""
+
+    name: str = "Backplane"
+
+    def __init__(self):
+        self._deliver: Optional[DeliverFn] = None
+
+    def subscribe(self, deliver: DeliverFn) -> None:
+        """Register the local delivery callback (one per process)."""
+        self._deliver = deliver
+
+    @abc.abstractmethod
+    async def publish(self, user_ids: Optional[List[str]], message: dict, role: Optional[str] = None) -> None:
+        """Deliver a message to the users' sockets on every worker."""
+
+    async def publish_many(self, items: List[Tuple[List[str], dict]]) -> None:
+        """Publish many (user_ids, message) pairs at once."""
+        for user_ids, message in items:
+            await self.publish(user_ids, message)
+
+    def start(self) -> None:
+        """Start receiving events from other workers."""
+
+    async def stop(self) -> None:
+        """Stop receiving events."""
+
+    async def _deliver_local(self, user_ids: Optional[List[str]], message: dict, role: Optional[str] = None) -> None:
+        if self._deliver is None:
+            return
+        try:
+            await self._deliver(user_ids, message, role)
+        except Exception as e:
+            print(f"[{self.name}] Local delivery failed: {e}")
+
+
+class InMemoryBackplane(Backplane):
+    """Delivers straight to this process's sockets."""
+
+    name = "InMemoryBackplane"
+
+    async def publish(self, user_ids: Optional[List[str]], message: dict, role: Optional[str] = None) -> None:
+        await self._deliver_local(user_ids, message, role)
+
+
+class MongoBackplane(Backplane):
+    """Fan-out through a tailed capped collection shared by all workers."""
+
+    name = "MongoBackplane"
+
+    def __init__(self):
+        super().__init__()
+        self.worker_id = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._collection = None
+
+    async def _get_collection(self):
+        if self._collection is None:
+            from app.core.database import client
+            db = client[settings.DATABASE_NAME]
+            try:
+                await db.create_collection(
+                    settings.WS_BACKPLANE_COLLECTION,
+                    capped=True,
+                    size=settings.WS_BACKPLANE_SIZE_MB * 1024 * 1024
+                )
+            except CollectionInvalid:
+                pass  # Already created by another worker
+            self._collection = db[settings.WS_BACKPLANE_COLLECTION]
+        return self._collection
+
+    async def publish(self, user_ids: Optional[List[str]], message: dict, role: Optional[str] = None) -> None:
+        await self._deliver_local(user_ids, message, role)
+        await self._insert([self._event(user_ids, message, role)])
+
+    async def publish_many(self, items: List[Tuple[List[str], dict]]) -> None:
+        for user_ids, message in items:
+            await self._deliver_local(user_ids, message)
+        await self._insert([self._event(user_ids, message) for user_ids, message in items])
+
+    def _event(self, user_ids: Optional[List[str]], message: dict, role: Optional[str] = None) -> dict:
+        return {
+            "origin": self.worker_id,
+            "user_ids": user_ids,
+            "role": role,
+            "message": message,
+            "created_at": datetime.utcnow()
+        }
+
+    async def _insert(self, events: List[dict]) -> None:
+        if not events:
+            return
+        try:
+            collection = await self._get_collection()
+            await collection.insert_many(events, ordered=True)
+        except Exception as e:
+            print(f"[{self.name}] Publish failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._tail())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _tail(self) -> None:
+        """Deliver other workers' events to local sockets, re-opening the cursor as needed."""
+        print(f"[{self.name}] Tailing {settings.WS_BACKPLANE_COLLECTION} as {self.worker_id[:8]}")
+        # Only events published after this worker started are relevant
+        last_id = await self._newest_id()
+        while True:
+            try:
+                collection = await self._get_collection()
+                # Replay the capped collection in insertion order up to the last event seen;
+                # if that event has already been overwritten, everything left is new
+                skipping = last_id is not None and await collection.find_one(
+                    {"_id": last_id}, projection={"_id": 1}
+                ) is not None
+                cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        if skipping:
+                            skipping = event["_id"] != last_id
+                            continue
+                        last_id = event["_id"]
+                        if event["origin"] != self.worker_id:
+                            await self._deliver_local(event["user_ids"], event["message"], event.get("role"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{self.name}] Tail failed: {e}")
+            await asyncio.sleep(TAIL_RETRY_SECONDS)
+
+    async def _newest_id(self):
+        """_id of the most recently inserted event, or None if there are none."""
+        while True:
+            try:
+                collection = await self._get_collection()
+                newest = await collection.find_one({}, projection={"_id": 1}, sort=[("$natural", -1)])
+                return newest["_id"] if newest else None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{self.name}] Tail failed: {e}")
+            await asyncio.sleep(TAIL_RETRY_SECONDS)
+
+
+def create_backplane() -> Backplane:
+    """Backplane selected by WS_BACKPLANE."""
+    if settings.WS_BACKPLANE == "memory":
+        return InMemoryBackplane()
+    return MongoBackplane()
@@ -0,0 +1,162 @@
+"""
+Local Razorpay API stub for offline development and load tests.
+
+Implements the endpoints used by RazorpayService with in-memory state:
+
+    POST /v1/orders
+    GET  /v1/payments                    (from, to, skip, count; newest first)
+    GET  /v1/payments/{payment_id}
+    POST /v1/payments/{payment_id}/capture
+    POST /v1/payments/{payment_id}/refund
+
+Run it and point the backend at it:
+
+    python razorpay_stub.py
+    RAZORPAY_API_URL=http://127.0.0.1:9010/v1 uvicorn app.main:app
+
+Environment knobs:
+    STUB_PORT            listen port (default 9010)
+    STUB_LATENCY_MS      added latency per request (default 0)
+    STUB_JITTER_MS       random extra latency up to this value (default 0)
+    STUB_FAILURE_RATE    fraction of requests answered with 503 (default 0)
+
+Synthetic data for reconciliation runs can be loaded in bulk with
+`POST /_stub/payments` (a JSON list of payment entities; `created_at` is a
+unix timestamp and defaults to now) and cleared with `DELETE /_stub/payments`.
+"""
+
+import asyncio
+import bisect
+import os
+import random
+import time
+import uuid
+import uvicorn
+from typing import List
+from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+JITTER_MS = float(os.getenv("STUB_JITTER_MS", "0"))
+FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+
+app = FastAPI(title="Razorpay Stub")
+orders: dict = {}
+payments: dict = {}
+sorted_payments = None  # List order cache (newest first), rebuilt after payments are added
+sorted_keys: list = []  # Negated created_at of sorted_payments, for bisect
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:14]}"
+
+
+@app.middleware("http")
+async def simulate_network(request: Request, call_next):
+    delay = LATENCY_MS + random.uniform(0, JITTER_MS)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        return JSONResponse(
+            status_code=503,
+            content={"error": {"code": "SERVER_ERROR", "description": "Injected stub failure"}}
+        )
+    return await call_next(request)
+
+
+@app.post("/v1/orders")
+async def create_order(body: dict):
+    order = {
+        "id": _new_id("order"),
+        "entity": "order",
+        "amount": body["amount"],
+        "currency": body.get("currency", "INR"),
+        "receipt": body.get("receipt"),
+        "notes": body.get("notes", {}),
+        "status": "created"
+    }
+    orders[order["id"]] = order
+    return order
+
+
+@app.get("/v1/payments")
+async def list_payments(
+    from_: int = Query(0, alias="from"),
+    to: int = Query(None),
+    skip: int = Query(0, ge=0),
+    count: int = Query(10, ge=1, le=100)
+):
+    global sorted_payments, sorted_keys
+    if sorted_payments is None:
+        sorted_payments = sorted(payments.values(), key=lambda p: p["created_at"], reverse=True)
+        sorted_keys = [-p["created_at"] for p in sorted_payments]
+    upper = to if to is not None else int(time.time())
+    first = bisect.bisect_left(sorted_keys, -upper)
+    last = bisect.bisect_right(sorted_keys, -from_)
+    page = sorted_payments[first + skip:min(last, first + skip + count)]
+    return {"entity": "collection", "count": len(page), "items": page}
+
+
+@app.post("/_stub/payments")
+async def load_payments(items: List[dict]):
+    """Bulk-load synthetic payments (stub only)"""
+    global sorted_payments
+    now = int(time.time())
+    for item in items:
+        payments[item["id"]] = {
+            "entity": "payment",
+            "currency": "INR",
+            "amount_refunded": 0,
+            "created_at": now,
+            **item
+        }
+    sorted_payments = None
+    return {"loaded": len(items), "total": len(payments)}
+
+
+@app.delete("/_stub/payments")
+async def clear_payments():
+    global sorted_payments
+    payments.clear()
+    sorted_payments = None
+    return {"total": 0}
+
+
+@app.get("/v1/payments/{payment_id}")
+async def fetch_payment(payment_id: str):
+    global sorted_payments
+    if payment_id not in payments:
+        # Unknown ids behave like an authorized payment, so any id can be fetched
+        payments[payment_id] = {
+            "id": payment_id,
+            "entity": "payment",
+            "amount": 100,
+            "currency": "INR",
+            "status": "authorized",
+            "amount_refunded": 0,
+            "created_at": int(time.time())
+        }
+        sorted_payments = None
+    return payments[payment_id]
+
+
+@app.post("/v1/payments/{payment_id}/capture")
+async def capture_payment(payment_id: str, body: dict):
+    payment = await fetch_payment(payment_id)
+    if payment["status"] != "authorized":
+        raise HTTPException(status_code=400, detail="Payment is not in authorized state")
+    payment.update(status="captured", amount=body["amount"], currency=body.get("currency", "INR"))
+    return payment
+
+
+@app.post("/v1/payments/{payment_id}/refund")
+async def refund_payment(payment_id: str, body: dict):
+    payment = await fetch_payment(payment_id)
+    amount = body.get("amount") or payment["amount"] - payment["amount_refunded"]
+    payment["amount_refunded"] += amount
+    payment["status"] = "refunded"
+    return {"id": _new_id("rfnd"), "entity": "refund", "payment_id": payment_id, "amount": amount, "status": "processed"}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_PORT", "9010")))
@@ -0,0 +1,38 @@
+"""
+Shared fixtures: an in-memory MongoDB (mongomock) initialized the same way
+as the app, via connect_to_mongo.
+"""
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.core import database
+from app.core.config import settings
+from app.services.announcement_service import announcement_service
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """The mock client connect_to_mongo will use; seed legacy data through it before `db`."""
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(database, "AsyncIOMotorClient", lambda url: client)
+    return client
+
+
+@pytest.fixture
+def raw_db(mongo):
+    """The application database, without going through Beanie."""
+    return mongo[settings.DATABASE_NAME]
+
+
+@pytest.fixture
+async def db(mongo, monkeypatch):
+    # Recent announcements are cached per process; never carry them between databases
+    monkeypatch.setattr(announcement_service, "_recent", None)
+    await database.connect_to_mongo()
+    yield mongo
+    await database.close_mongo_connection()
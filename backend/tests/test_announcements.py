@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from app.models.announcement import AnnouncementReceipt
+from app.models.user import UserRole
+from app.services.announcement_service import announcement_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def _titles(user_id: str, role: str, unread_only: bool = False) -> list:
+    return [(a.title, is_read) for a, is_read in await announcement_service.list_for_user(user_id, role, unread_only)]
+
+
+async def test_reads_are_recorded_once_per_user(db):
+    announcement = await announcement_service.publish("Maintenance", "Tonight at 10")
+    announcement_id = str(announcement.id)
+
+    first, second = await asyncio.gather(
+        announcement_service.mark_read("alice", announcement_id),
+        announcement_service.mark_read("alice", announcement_id)
+    )
+    # The receipt already has read_at, so the second upsert hits the unique index
+    assert sorted([first, second]) == [False, True]
+    assert await announcement_service.mark_read("alice", announcement_id) is False
+    assert await AnnouncementReceipt.find(AnnouncementReceipt.user_id == "alice").count() == 1
+
+    assert await _titles("alice", "student") == [("Maintenance", True)]
+    assert await _titles("bob", "student") == [("Maintenance", False)]  # No receipt: unread
+    assert await announcement_service.unread_count("alice", "student") == 0
+
+
+async def test_audience_hide_and_mark_all(db):
+    await announcement_service.publish("For everyone", "Hello")
+    tutors_only = await announcement_service.publish("For tutors", "Payouts", audience=UserRole.TUTOR)
+    newest = await announcement_service.publish("Also for everyone", "Hi")
+
+    assert await _titles("stu", "student") == [("Also for everyone", False), ("For everyone", False)]
+    assert await announcement_service.unread_count("tim", "tutor") == 3
+
+    # Hiding an unread announcement reports it, hiding it again does not
+    assert await announcement_service.hide("tim", str(tutors_only.id)) is True
+    assert await announcement_service.hide("tim", str(tutors_only.id)) is False
+    assert await announcement_service.mark_read("tim", str(newest.id)) is True
+    assert await announcement_service.hide("tim", str(newest.id)) is False  # Already read
+    assert await _titles("tim", "tutor") == [("For everyone", False)]
+
+    assert await announcement_service.mark_all_read("stu", "student") == 2
+    assert await announcement_service.mark_all_read("stu", "student") == 0
+    await announcement_service.hide_all("stu", "student", read_only=True)
+    assert await _titles("stu", "student") == []
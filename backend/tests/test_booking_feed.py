@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.main import app
+from app.models.booking import Booking
+from app.models.tutor import TutorProfile
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services.booking_feed import get_booking_feed, UPCOMING, PAST
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+async def _booking(student_id: str, tutor_id: str, hours: float) -> Booking:
+    booking = Booking(
+        student_id=student_id, tutor_id=tutor_id, subject="Maths",
+        scheduled_at=NOW + timedelta(hours=hours), price=500.0
+    )
+    await booking.insert()
+    return booking
+
+
+async def _pages(sources, window):
+    pages, cursor = [], None
+    while True:
+        page, cursor = await get_booking_feed(sources, window=window, cursor=cursor, limit=2, now=NOW)
+        pages.append([b.id for b in page])
+        if not cursor:
+            return pages
+
+
+async def test_feed_pages_merge_sources_without_gaps_or_repeats(db):
+    # Same-time sessions exercise the _id tie-break in the cursor
+    mine = [
+        await _booking("user-1", "tutor-x", 1),
+        await _booking("user-1", "tutor-x", 1),
+        await _booking("student-y", "user-1", 2),
+        await _booking("user-1", "tutor-x", 3),
+        await _booking("student-y", "user-1", 5),
+        await _booking("user-1", "user-1", 4),  # Matches both sources
+        await _booking("user-1", "tutor-x", -1),
+        await _booking("student-y", "user-1", -2),
+    ]
+    await _booking("someone-else", "tutor-x", 1)
+    sources = [("student_id", "user-1"), ("tutor_id", "user-1")]
+
+    upcoming = await _pages(sources, UPCOMING)
+    assert all(len(page) <= 2 for page in upcoming)
+    assert [b for page in upcoming for b in page] == [
+        b.id for b in sorted(mine[:6], key=lambda b: (b.scheduled_at, b.id))
+    ]
+
+    past = await _pages(sources, PAST)
+    assert [b for page in past for b in page] == [mine[6].id, mine[7].id]
+
+
+async def test_tutor_bookings_are_bounded(db):
+    user = User(email="tutor@example.com", full_name="Tutor", role=UserRole.TUTOR, hashed_password="x")
+    await user.insert()
+    tutor = TutorProfile(user_id=str(user.id))
+    await tutor.insert()
+    for hours in range(5):
+        await _booking("student-y", str(tutor.id), hours)
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/bookings/tutor/my-bookings", params={"limit": 3})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    scheduled = [b["scheduled_at"] for b in response.json()]
+    assert len(scheduled) == 3 and scheduled == sorted(scheduled, reverse=True)
+    assert scheduled[0].startswith((NOW + timedelta(hours=4)).isoformat())
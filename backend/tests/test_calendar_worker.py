@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models.booking import Booking, BookingEventType, BookingStatus, OutboxEvent
+from app.services import outbox_service as outbox_module
+from app.services.fake_calendar import FakeCalendarService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    calendar = FakeCalendarService()
+    monkeypatch.setattr(outbox_module, "google_meet_service", calendar)
+    return calendar
+
+
+@pytest.fixture
+def pushed(monkeypatch):
+    updates = []
+
+    async def push_booking_update(booking, tutor_user_id):
+        updates.append((booking.id, booking.meeting_link))
+
+    monkeypatch.setattr(outbox_module, "push_booking_update", push_booking_update)
+    return updates
+
+
+async def _booking(status: BookingStatus) -> Booking:
+    booking = Booking(
+        student_id="student", tutor_id="tutor", subject="Maths", status=status,
+        scheduled_at=datetime.utcnow() + timedelta(days=1), price=100.0,
+        tutor_email="tutor@example.com", student_email="student@example.com"
+    )
+    await booking.insert()
+    return booking
+
+
+async def test_create_meeting_patches_link_and_retries_onto_the_same_event(db, calendar, pushed):
+    booking = await _booking(BookingStatus.CONFIRMED)
+    payload = {"tutor_user_id": "tutor-user", "calendar_event_id": "evt-fixed"}
+
+    await outbox_module.handle_create_meeting(booking, payload)
+    # A retry after a lost response reuses the client-chosen event id
+    await outbox_module.handle_create_meeting(booking, payload)
+
+    stored = await Booking.get(booking.id)
+    assert stored.google_event_id == "evt-fixed" and stored.meeting_link.startswith("https://meet.google.com/")
+    assert list(calendar.events) == ["evt-fixed"]
+    assert calendar.events["evt-fixed"]["attendees"] == ["tutor@example.com", "student@example.com"]
+    assert pushed[0] == (booking.id, stored.meeting_link)
+
+
+async def test_create_meeting_for_a_booking_cancelled_meanwhile_deletes_the_event(db, calendar, pushed):
+    booking = await _booking(BookingStatus.CONFIRMED)
+    await Booking.get_motor_collection().update_one(
+        {"_id": booking.id}, {"$set": {"status": BookingStatus.CANCELLED.value}}
+    )
+
+    await outbox_module.handle_create_meeting(booking, {"calendar_event_id": "evt-late"})
+
+    stored = await Booking.get(booking.id)
+    assert stored.google_event_id is None and stored.meeting_link is None
+    assert calendar.events == {} and calendar.calls["cancel"] == 1
+    assert pushed == []
+
+
+async def test_relay_runs_calendar_events(db, calendar, pushed):
+    booking = await _booking(BookingStatus.CONFIRMED)
+    calendar.create_meet_event("Placeholder", "", booking.scheduled_at, event_id="evt-pool")
+    await Booking.get_motor_collection().update_one({"_id": booking.id}, {"$set": {"outbox": [
+        OutboxEvent(type=BookingEventType.UPDATE_MEETING, payload={"google_event_id": "evt-pool"}).to_document()
+    ]}})
+
+    await outbox_module.outbox_relay.run_once()
+
+    assert (await Booking.get(booking.id)).outbox == []
+    assert calendar.events["evt-pool"]["summary"] == "Maths Tutoring Session - 1-on-1"
+    assert calendar.events["evt-pool"]["attendees"] == ["tutor@example.com", "student@example.com"]
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.models.user import User, UserRole
+from app.services.dashboard_stats import DashboardStatsService
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed():
+    now = datetime.utcnow()
+    for i, role in enumerate([UserRole.STUDENT, UserRole.STUDENT, UserRole.TUTOR, UserRole.ADMIN]):
+        await User(
+            email=f"user{i}@example.com", full_name="User", hashed_password="x", role=role,
+            created_at=now - timedelta(days=30 if i == 0 else 1)
+        ).insert()
+    for status, price, age in [
+        (BookingStatus.PENDING, 100.0, 1),
+        (BookingStatus.CONFIRMED, 200.0, 0),  # Still this month on the 1st
+        (BookingStatus.COMPLETED, 300.0, 400),
+        (BookingStatus.CANCELLED, 400.0, 1),
+    ]:
+        await Booking(
+            student_id="s", tutor_id="t", subject="Maths", status=status, price=price,
+            scheduled_at=now, created_at=now - timedelta(days=age)
+        ).insert()
+
+
+async def test_counters_are_computed_in_the_database(db):
+    await _seed()
+
+    stats = await DashboardStatsService().get_stats()
+
+    assert stats == {
+        "total_users": 4, "total_students": 2, "total_tutors": 1, "new_users_this_week": 3,
+        "total_bookings": 4, "pending_bookings": 1, "confirmed_bookings": 1,
+        "completed_bookings": 1, "cancelled_bookings": 1, "new_bookings_this_week": 3,
+        "revenue_total": 500.0, "revenue_this_month": 200.0
+    }
+
+
+async def test_cache_shares_one_computation_and_serves_stale_while_refreshing(db, monkeypatch):
+    await _seed()
+    service = DashboardStatsService()
+    recompute = service._recompute
+    runs = []
+
+    async def counting_recompute():
+        runs.append(1)
+        return await recompute()
+
+    monkeypatch.setattr(service, "_recompute", counting_recompute)
+
+    first, second = await asyncio.gather(service.get_stats(), service.get_stats())
+    assert first == second and len(runs) == 1
+
+    await Booking(student_id="s", tutor_id="t", subject="Maths", price=1.0, scheduled_at=datetime.utcnow()).insert()
+    assert (await service.get_stats())["total_bookings"] == 4 and len(runs) == 1  # Within the TTL
+
+    # Past the TTL the stale value is returned at once and refreshed behind it
+    monkeypatch.setattr(settings, "DASHBOARD_STATS_TTL_SECONDS", 0)
+    assert (await service.get_stats())["total_bookings"] == 4
+    await service._refresh
+    assert len(runs) == 2 and service._value["total_bookings"] == 5
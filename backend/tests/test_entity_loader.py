@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from bson import ObjectId
+from app.main import app
+from app.models.booking import Booking
+from app.models.tutor import TutorProfile
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services.entity_loader import EntityLoader
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Count of find() calls per collection."""
+    counts = {}
+
+    def count(model):
+        collection = model.get_motor_collection()
+        find = collection.find
+
+        def counting_find(*args, **kwargs):
+            counts[model.__name__] = counts.get(model.__name__, 0) + 1
+            return find(*args, **kwargs)
+
+        monkeypatch.setattr(collection, "find", counting_find)
+
+    for model in (User, TutorProfile):
+        count(model)
+    return counts
+
+
+async def _user(name: str, role=UserRole.STUDENT) -> User:
+    user = User(email=f"{name}@example.com", full_name=name.title(), hashed_password="x", role=role)
+    await user.insert()
+    return user
+
+
+async def test_loads_in_one_tick_share_one_query(db, queries):
+    alice, bob = await _user("alice"), await _user("bob")
+    loader = EntityLoader(User)
+    missing = str(ObjectId())
+
+    first, second, again, gone, invalid = await asyncio.gather(
+        loader.load(str(alice.id)), loader.load(str(bob.id)), loader.load(str(alice.id)),
+        loader.load(missing), loader.load("not-an-id")
+    )
+
+    assert (first.full_name, second.full_name, again) == ("Alice", "Bob", first)
+    assert gone is None and invalid is None
+    assert queries == {"User": 1}
+
+    # Everything, misses included, is memoized for the rest of the request
+    assert [u and u.email for u in await loader.load_many([str(bob.id), missing])] == ["bob@example.com", None]
+    assert queries == {"User": 1}
+
+
+async def test_admin_bookings_page_batches_related_lookups(db, queries):
+    admin = await _user("admin", role=UserRole.ADMIN)
+    tutors = []
+    for i in range(3):
+        tutor_user = await _user(f"tutor{i}", role=UserRole.TUTOR)
+        tutor = TutorProfile(user_id=str(tutor_user.id))
+        await tutor.insert()
+        tutors.append(tutor)
+    students = [await _user(f"student{i}") for i in range(4)]
+    for i in range(12):
+        await Booking(
+            student_id=str(students[i % 4].id), tutor_id=str(tutors[i % 3].id), subject="Maths",
+            scheduled_at=datetime.utcnow() + timedelta(days=i), price=100.0
+        ).insert()
+
+    app.dependency_overrides[get_current_user] = lambda: admin
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/admin/bookings")
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert response.status_code == 200
+    rows = response.json()
+    assert len(rows) == 12 and all(r["student_name"].startswith("Student") for r in rows)
+    assert all(r["tutor_name"].startswith("Tutor") for r in rows)
+    # One query per collection for the whole page instead of three per booking
+    assert queries == {"User": 1, "TutorProfile": 1}
@@ -0,0 +1,76 @@
+import csv
+import gzip
+import io
+import json
+import httpx
+import pytest
+from app.core.config import settings
+from app.main import app
+from app.models.payment import Payment, PaymentStatus
+from app.models.tutor import TutorProfile
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services.export_service import NDJSON, stream_export
+
+pytestmark = pytest.mark.anyio
+
+
+async def _payments(count: int):
+    student = User(email="student@example.com", full_name="Stu", hashed_password="secret-hash", role=UserRole.STUDENT)
+    await student.insert()
+    tutor = TutorProfile(user_id="tutor-user", full_name="Tia")
+    await tutor.insert()
+    await Payment.insert_many([
+        Payment(
+            booking_id=f"booking-{i}", student_id=str(student.id), tutor_id=str(tutor.id), session_amount=100.0 + i,
+            status=PaymentStatus.COMPLETED if i % 2 else PaymentStatus.PENDING
+        )
+        for i in range(count)
+    ])
+
+
+async def test_csv_is_streamed_one_batch_at_a_time(db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    await _payments(5)
+    lookups = []
+    find = User.get_motor_collection().find
+
+    def counting_find(*args, **kwargs):
+        lookups.append(1)
+        return find(*args, **kwargs)
+
+    monkeypatch.setattr(User.get_motor_collection(), "find", counting_find)
+
+    chunks = [chunk async for chunk in stream_export("payments")]
+
+    assert len(chunks) == 4  # Header, then one chunk per batch of two
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["session_amount"] for row in rows] == ["100.0", "101.0", "102.0", "103.0", "104.0"]
+    assert {(row["student_name"], row["tutor_name"]) for row in rows} == {("Stu", "Tia")}
+    assert len(lookups) == 3  # One student-name lookup per batch
+
+
+async def test_gzipped_ndjson_filters_and_never_exports_hidden_fields(db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    await _payments(5)
+
+    body = b"".join([chunk async for chunk in stream_export("payments", fmt=NDJSON, gzip=True, status="completed")])
+    rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+    assert [row["session_amount"] for row in rows] == [101.0, 103.0]
+    assert rows[0]["status"] == "completed" and rows[0]["student_name"] == "Stu"
+
+    admin = User(email="admin@example.com", full_name="Admin", hashed_password="x", role=UserRole.ADMIN)
+    await admin.insert()
+    app.dependency_overrides[get_current_user] = lambda: admin
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/admin/export/users", params={"status": "student"})
+            missing = await client.get("/api/admin/export/sessions")
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/csv")
+    assert 'filename="users-' in response.headers["content-disposition"]
+    assert "secret-hash" not in response.text and "hashed_password" not in response.text
+    assert [row["email"] for row in csv.DictReader(io.StringIO(response.text))] == ["student@example.com"]
+    assert missing.status_code == 404
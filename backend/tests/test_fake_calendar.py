@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import pytest
+from app.services.fake_calendar import FakeCalendarService
+
+START = datetime(2030, 1, 1, 10, 0)
+
+
+def test_create_with_same_event_id_returns_existing_event():
+    calendar = FakeCalendarService()
+    first = calendar.create_meet_event("Maths", "", START, event_id="evt1", tutor_email="t@x.com")
+    second = calendar.create_meet_event("Other", "", START + timedelta(days=1), event_id="evt1")
+
+    assert first == second
+    assert first["meet_link"].startswith("https://meet.google.com/")
+    assert first["end_time"] == (START + timedelta(minutes=60)).isoformat()
+    assert calendar.calls["create"] == 2
+    assert len(calendar.events) == 1
+
+
+def test_update_and_cancel():
+    calendar = FakeCalendarService()
+    event_id = calendar.create_meet_event("Maths", "", START)["event_id"]
+
+    assert calendar.update_meet_event(event_id, "Physics", "", START, duration_minutes=30, student_email="s@x.com")
+    event = calendar.events[event_id]
+    assert event["summary"] == "Physics"
+    assert event["attendees"] == ["s@x.com"]
+    assert event["end_time"] == (START + timedelta(minutes=30)).isoformat()
+
+    assert calendar.cancel_event(event_id)
+    assert not calendar.update_meet_event(event_id, "Physics", "", START)
+    with pytest.raises(KeyError):
+        calendar.update_meet_event(event_id, "Physics", "", START, raise_errors=True)
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app.core.config import settings
+from app.models.idempotency_key import IdempotencyKey
+from app.services import idempotency as idempotency_module
+from app.services.idempotency import IdempotencyService, idempotency_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_replay_returns_stored_response(db):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return {"id": "order-1"}
+
+    first = await idempotency_service.run("orders", "user-1", "key-1", {"amount": 1}, handler)
+    replay = await idempotency_service.run("orders", "user-1", "key-1", {"amount": 1}, handler)
+
+    assert first == {"id": "order-1"} and len(calls) == 1
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    with pytest.raises(HTTPException) as error:
+        await idempotency_service.run("orders", "user-1", "key-1", {"amount": 2}, handler)
+    assert error.value.status_code == 422
+
+
+async def test_stale_owner_cannot_release_its_successors_key(db):
+    release_first = asyncio.Event()
+
+    async def slow_failing_handler():
+        await release_first.wait()
+        raise RuntimeError("gateway timed out")
+
+    async def handler():
+        return {"id": "order-2"}
+
+    first = asyncio.create_task(idempotency_service.run("orders", "user-1", "key-2", {}, slow_failing_handler))
+    await asyncio.sleep(0.01)
+
+    # The first request outlives its lock; a retry takes it over and finishes
+    await IdempotencyKey.get_motor_collection().update_one(
+        {"key": "orders:user-1:key-2"}, {"$set": {"locked_until": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert await idempotency_service.run("orders", "user-1", "key-2", {}, handler) == {"id": "order-2"}
+
+    release_first.set()
+    with pytest.raises(RuntimeError):
+        await first
+
+    record = await IdempotencyKey.find_one(IdempotencyKey.key == "orders:user-1:key-2")
+    assert record is not None and record.completed and record.response == {"id": "order-2"}
+
+
+async def test_waiting_for_a_released_key_polls_until_the_deadline(db, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 0.3)
+    lookups = []
+
+    # The key keeps vanishing and being re-acquired by someone else
+    async def find_one(*args, **kwargs):
+        lookups.append(1)
+        assert len(lookups) < 50, "polling without waiting"
+        return None
+
+    async def acquire(record_key, fingerprint):
+        return None
+
+    monkeypatch.setattr(IdempotencyKey.get_motor_collection(), "find_one", find_one)
+    monkeypatch.setattr(IdempotencyService, "_acquire", staticmethod(acquire))
+
+    with pytest.raises(HTTPException) as error:
+        await IdempotencyService._replay("orders:user-1:key-3", "hash")
+
+    assert error.value.status_code == 409
+    assert len(lookups) <= 0.3 / idempotency_module.WAIT_POLL_SECONDS + 2
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.core.config import settings
+from app.main import app
+from app.models.booking import Booking
+from app.models.meeting_link import PooledMeetingLink, MeetingLinkStatus
+from app.models.tutor import TutorProfile
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services import meeting_link_pool as pool_module
+from app.services.fake_calendar import FakeCalendarService
+from app.services.meeting_link_pool import MeetingLinkPool
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    calendar = FakeCalendarService()
+    monkeypatch.setattr(pool_module, "google_meet_service", calendar)
+    monkeypatch.setattr(settings, "MEET_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "MEET_POOL_LOW_WATERMARK", 3)
+    return calendar
+
+
+async def test_refill_provisions_placeholder_events(db, calendar):
+    pool = MeetingLinkPool()
+
+    assert not await pool.run_once()  # Reached the target size, nothing more to do
+    links = await PooledMeetingLink.find_all().to_list()
+    assert len(links) == 3
+    assert {link.event_id for link in links} == set(calendar.events)
+    assert all(link.status == MeetingLinkStatus.AVAILABLE for link in links)
+
+
+async def test_claim_and_release(db, calendar):
+    pool = MeetingLinkPool()
+    await pool.run_once()
+
+    link = await pool.claim("booking-1")
+    assert link.status == MeetingLinkStatus.CLAIMED and link.booking_id == "booking-1"
+    assert await pool.release(link)
+    assert not await pool.release(link)  # Already back in the pool
+
+    stored = await PooledMeetingLink.get(link.id)
+    assert stored.status == MeetingLinkStatus.AVAILABLE and stored.booking_id is None
+
+
+async def test_concurrent_confirms_keep_one_link(db, calendar, monkeypatch):
+    pool = pool_module.meeting_link_pool
+    monkeypatch.setattr(pool, "_needs_refill", lambda: False)
+    await MeetingLinkPool().run_once()
+
+    # Hold each confirm after its claim so both pass the status check before either writes
+    claim = pool.claim
+
+    async def slow_claim(booking_id):
+        link = await claim(booking_id)
+        await asyncio.sleep(0.05)
+        return link
+    monkeypatch.setattr(pool, "claim", slow_claim)
+
+    user = User(email="tutor@example.com", full_name="Tutor", hashed_password="x", role=UserRole.TUTOR)
+    await user.insert()
+    tutor = TutorProfile(user_id=str(user.id), full_name="Tutor", email=user.email)
+    await tutor.insert()
+    booking = Booking(
+        student_id="student", tutor_id=str(tutor.id), subject="Maths",
+        scheduled_at=datetime.utcnow() + timedelta(days=1), price=100.0
+    )
+    await booking.insert()
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = await asyncio.gather(*[
+                client.post(f"/api/bookings/{booking.id}/confirm") for _ in range(2)
+            ])
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert sorted(r.status_code for r in responses) == [200, 400]
+    claimed = await PooledMeetingLink.find(PooledMeetingLink.status == MeetingLinkStatus.CLAIMED).to_list()
+    assert len(claimed) == 1
+    assert claimed[0].event_id == (await Booking.get(booking.id)).google_event_id
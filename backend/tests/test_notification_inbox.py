@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.main import app
+from app.models.announcement import Announcement
+from app.models.notification import Notification, NotificationType
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def inbox(db):
+    """A student with 25 notifications (pairs share a timestamp) and two announcements."""
+    user = User(email="student@example.com", full_name="Student", hashed_password="x", role=UserRole.STUDENT)
+    await user.insert()
+    start = datetime.utcnow() - timedelta(hours=1)
+    await Notification.insert_many([
+        Notification(
+            user_id=str(user.id), type=NotificationType.SYSTEM, title=f"n{i}", message="",
+            is_read=i % 3 == 0, created_at=start + timedelta(minutes=i // 2)
+        )
+        for i in range(25)
+    ] + [
+        Notification(user_id="someone-else", type=NotificationType.SYSTEM, title="other", message="", created_at=start)
+    ])
+    await Announcement.insert_many([
+        Announcement(title="a1", message="", created_at=start + timedelta(minutes=3)),
+        Announcement(title="tutors", message="", audience=UserRole.TUTOR, created_at=start + timedelta(minutes=4)),
+    ])
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.pop(get_current_user)
+
+
+async def _all_pages(client, **params) -> list:
+    seen, cursor = [], None
+    while True:
+        page = (await client.get("/api/notifications", params={**params, **({"before": cursor} if cursor else {})})).json()
+        assert len(page["notifications"]) <= params["limit"]
+        seen += page["notifications"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+
+async def test_keyset_pages_cover_the_inbox_newest_first(inbox):
+    seen = await _all_pages(inbox, limit=7)
+
+    titles = [n["title"] for n in seen]
+    assert len(titles) == 26 and len({n["id"] for n in seen}) == 26
+    assert "other" not in titles and "tutors" not in titles
+    created = [n["created_at"] for n in seen]
+    assert created == sorted(created, reverse=True)
+    assert titles[0] in ("n23", "n24") and titles.index("n8") < titles.index("a1") < titles.index("n5")
+
+
+async def test_unread_pages_and_bad_cursor(inbox):
+    seen = await _all_pages(inbox, limit=5, unread_only=True)
+
+    assert len(seen) == 17 and not any(n["is_read"] for n in seen)  # 16 notifications and the announcement
+    page = (await inbox.get("/api/notifications", params={"limit": 5})).json()
+    assert page["unread_count"] == 17
+    assert (await inbox.get("/api/notifications", params={"before": "garbage"})).status_code == 400
+
+
+async def test_inbox_index_matches_the_query(db):
+    indexes = await Notification.get_motor_collection().index_information()
+
+    assert [("user_id", 1), ("is_read", 1), ("created_at", -1), ("_id", -1)] in [
+        list(index["key"]) for index in indexes.values()
+    ]
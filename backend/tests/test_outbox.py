@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.main import app
+from app.models.booking import Booking, BookingEventType, BookingStatus, OutboxEvent
+from app.models.payment import Payment
+from app.models.tutor import TutorProfile
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services import outbox_service as outbox_module
+from app.services.email_service import email_service
+from app.services.outbox_service import outbox_relay
+
+pytestmark = pytest.mark.anyio
+
+
+async def _booking(**fields) -> Booking:
+    booking = Booking(**{
+        "student_id": "student", "tutor_id": "tutor", "subject": "Maths",
+        "scheduled_at": datetime.utcnow() + timedelta(days=1), "price": 100.0, **fields
+    })
+    await booking.insert()
+    return booking
+
+
+async def test_relay_runs_events_once_and_treats_disabled_email_as_done(db, monkeypatch):
+    monkeypatch.setattr(email_service, "username", "")
+    sent = []
+
+    async def send_booking_notification(**kwargs):
+        sent.append(kwargs)
+        return True
+
+    monkeypatch.setattr(email_service, "send_booking_notification", send_booking_notification)
+    booking = await _booking(tutor_email="tutor@example.com", outbox=[
+        OutboxEvent(type=BookingEventType.CREATE_PAYMENT),
+        OutboxEvent(type=BookingEventType.EMAIL_NEW_BOOKING, payload={"tutor_user_id": "tutor-user"}),
+    ])
+
+    assert not await outbox_relay.run_once()
+
+    stored = await Booking.get(booking.id)
+    assert stored.outbox == [] and stored.outbox_locked_until is None
+    assert await Payment.find(Payment.booking_id == str(booking.id)).count() == 1
+    assert sent == []
+
+    # Redelivery is harmless
+    await Booking.get_motor_collection().update_one(
+        {"_id": booking.id}, {"$push": {"outbox": OutboxEvent(type=BookingEventType.CREATE_PAYMENT).to_document()}}
+    )
+    await outbox_relay.run_once()
+    assert await Payment.find(Payment.booking_id == str(booking.id)).count() == 1
+
+
+async def test_email_handler_raises_only_on_real_send_failures(db, monkeypatch):
+    booking = await _booking(tutor_email="tutor@example.com")
+
+    async def send_booking_notification(**kwargs):
+        return False
+
+    monkeypatch.setattr(email_service, "send_booking_notification", send_booking_notification)
+
+    monkeypatch.setattr(email_service, "username", "")
+    await outbox_module.handle_email_new_booking(booking, {"tutor_user_id": "tutor-user"})
+
+    monkeypatch.setattr(email_service, "username", "mailer")
+    monkeypatch.setattr(email_service, "password", "secret")
+    with pytest.raises(RuntimeError, match="Failed to send"):
+        await outbox_module.handle_email_new_booking(booking, {"tutor_user_id": "tutor-user"})
+
+
+async def test_claimed_booking_is_leased_to_one_relay(db):
+    await _booking(outbox=[OutboxEvent(type=BookingEventType.CANCEL_MEETING)])
+
+    claimed = await outbox_relay._claim_next()
+    assert claimed is not None
+    assert await outbox_relay._claim_next() is None  # Leased until released
+
+    await outbox_relay.process_booking(claimed)
+    stored = await Booking.get(claimed.id)
+    assert stored.outbox == [] and stored.outbox_locked_until is None
+
+
+@pytest.fixture
+async def tutor_client(db):
+    user = User(email="tutor@example.com", full_name="Tutor", hashed_password="x", role=UserRole.TUTOR)
+    await user.insert()
+    tutor = TutorProfile(user_id=str(user.id), full_name="Tutor", email=user.email)
+    await tutor.insert()
+    app.dependency_overrides[get_current_user] = lambda: user
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client, tutor
+    app.dependency_overrides.pop(get_current_user)
+
+
+async def test_confirm_is_conditional_and_queues_one_meeting(tutor_client, monkeypatch):
+    client, tutor = tutor_client
+    monkeypatch.setattr(outbox_module.outbox_relay, "wake", lambda: None)
+    booking = await _booking(tutor_id=str(tutor.id))
+
+    first = await client.post(f"/api/bookings/{booking.id}/confirm")
+    second = await client.post(f"/api/bookings/{booking.id}/confirm")
+
+    assert (first.status_code, second.status_code) == (200, 400)
+    stored = await Booking.get(booking.id)
+    assert stored.status == BookingStatus.CONFIRMED
+    assert [e.type for e in stored.outbox] == [BookingEventType.CREATE_MEETING]
+
+
+async def test_cancel_cancels_the_meet_event_attached_after_the_read(tutor_client, monkeypatch):
+    client, tutor = tutor_client
+    monkeypatch.setattr(outbox_module.outbox_relay, "wake", lambda: None)
+    booking = await _booking(tutor_id=str(tutor.id), status=BookingStatus.CONFIRMED, outbox=[
+        OutboxEvent(type=BookingEventType.CREATE_MEETING)
+    ])
+
+    # The relay attaches the Meet event between the route's read and its write
+    get = Booking.get
+
+    async def stale_get(booking_id, *args, **kwargs):
+        stale = await get(booking_id, *args, **kwargs)
+        await Booking.get_motor_collection().update_one(
+            {"_id": booking.id}, {"$set": {"google_event_id": "evt-late", "meeting_link": "https://meet"}}
+        )
+        return stale
+
+    monkeypatch.setattr(Booking, "get", stale_get)
+    first = await client.post(f"/api/bookings/{booking.id}/cancel")
+    monkeypatch.setattr(Booking, "get", get)
+    second = await client.post(f"/api/bookings/{booking.id}/cancel")
+
+    assert (first.status_code, second.status_code) == (200, 400)
+    stored = await Booking.get(booking.id)
+    assert stored.status == BookingStatus.CANCELLED
+    # Pending Meet creation dropped, the late event cancelled exactly once
+    assert [(e.type, e.payload) for e in stored.outbox] == [
+        (BookingEventType.CANCEL_MEETING, {"google_event_id": "evt-late"})
+    ]
@@ -0,0 +1,146 @@
+import time
+from datetime import datetime, timedelta
+import httpx
+import pytest
+import razorpay_stub
+from app.core.config import settings
+from app.models.payment import Payment, PaymentStatus
+from app.services.payment_reconciliation import (
+    payment_reconciler, CAPTURED_NOT_COMPLETED, REFUNDED_NOT_REFUNDED, FAILED_STILL_PENDING, MISSING_LOCALLY,
+    PROVIDER_PAGE_SIZE
+)
+from app.services.payment_service import payment_service
+from app.services.razorpay_service import razorpay_service
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stub(monkeypatch):
+    """Razorpay client wired to the in-process stub app."""
+    monkeypatch.setattr(settings, "RAZORPAY_MAX_RETRIES", 0)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=razorpay_stub.app), base_url="http://stub/v1")
+    monkeypatch.setattr(razorpay_service, "_client", client)
+    await client.delete("http://stub/_stub/payments")
+    yield client
+    await client.aclose()
+
+
+async def _payment(order_id: str, status: PaymentStatus) -> Payment:
+    payment = await payment_service.create_payment(f"booking-{order_id}", "student", "tutor", 100.0, "INR")
+    await Payment.get_motor_collection().update_one(
+        {"_id": payment.id}, {"$set": {"razorpay_order_id": order_id, "status": status.value}}
+    )
+    return payment
+
+
+async def _load_scenario(stub) -> dict:
+    payments = {
+        "captured": await _payment("order_captured", PaymentStatus.PENDING),
+        "refunded": await _payment("order_refunded", PaymentStatus.COMPLETED),
+        "failed": await _payment("order_failed", PaymentStatus.PENDING),
+        "settled": await _payment("order_ok", PaymentStatus.COMPLETED),
+    }
+    now = int(time.time())
+    await stub.post("http://stub/_stub/payments", json=[
+        {"id": "pay_1", "order_id": "order_captured", "status": "captured", "amount": 10000, "created_at": now},
+        {"id": "pay_2", "order_id": "order_refunded", "status": "refunded", "amount": 10000, "created_at": now},
+        {"id": "pay_3", "order_id": "order_failed", "status": "failed", "amount": 10000, "created_at": now},
+        {"id": "pay_4", "order_id": "order_ok", "status": "captured", "amount": 10000, "created_at": now},
+        {"id": "pay_5", "order_id": "order_unknown", "status": "captured", "amount": 10000, "created_at": now},
+    ])
+    return payments
+
+
+def _window():
+    return datetime.utcnow() - timedelta(hours=1), datetime.utcnow() + timedelta(minutes=1)
+
+
+async def test_dry_run_reports_without_writing(db, stub):
+    payments = await _load_scenario(stub)
+    before = {doc["_id"]: doc async for doc in Payment.get_motor_collection().find({})}
+
+    report = await payment_reconciler.reconcile(*_window(), apply=False)
+
+    assert report["applied"] is False and report["provider_orders"] == 5
+    assert report["discrepancies"] == {
+        CAPTURED_NOT_COMPLETED: 1, REFUNDED_NOT_REFUNDED: 1, FAILED_STILL_PENDING: 1, MISSING_LOCALLY: 1
+    }
+    assert report["corrected"] == {}
+    assert {s["razorpay_order_id"] for s in report["samples"]} == {
+        "order_captured", "order_refunded", "order_failed", "order_unknown"
+    }
+    after = {doc["_id"]: doc async for doc in Payment.get_motor_collection().find({})}
+    assert after == before
+    assert (await Payment.get(payments["captured"].id)).status == PaymentStatus.PENDING
+
+
+async def test_reconcile_against_stub(db, stub):
+    payments = await _load_scenario(stub)
+    start, end = _window()
+
+    applied = await payment_reconciler.reconcile(start, end, apply=True)
+    assert applied["corrected"] == {CAPTURED_NOT_COMPLETED: 1, REFUNDED_NOT_REFUNDED: 1, FAILED_STILL_PENDING: 1}
+    completed = await Payment.get(payments["captured"].id)
+    assert completed.status == PaymentStatus.COMPLETED and completed.razorpay_payment_id == "pay_1"
+    assert (await Payment.get(payments["refunded"].id)).status == PaymentStatus.REFUNDED
+    assert (await Payment.get(payments["failed"].id)).status == PaymentStatus.FAILED
+    assert (await Payment.get(payments["settled"].id)).status == PaymentStatus.COMPLETED
+
+    again = await payment_reconciler.reconcile(start, end, apply=True)
+    assert again["discrepancies"] == {MISSING_LOCALLY: 1}
+
+
+@pytest.mark.parametrize("provider_payments, expected_skips", [
+    # Past one round of PAGE_SIZE x CONCURRENCY; the partial page in round three stops it
+    (450, [0, 100, 200, 300, 400, 500]),
+    # An exact multiple needs one round of empty pages to see the end
+    (200, [0, 100, 200, 300]),
+    # Short first page
+    (30, [0, 100]),
+])
+async def test_provider_pages_until_a_short_page(db, stub, monkeypatch, provider_payments, expected_skips):
+    monkeypatch.setattr(settings, "RAZORPAY_RECONCILE_PAGE_CONCURRENCY", 2)
+    skips = []
+    list_payments = razorpay_service.list_payments
+
+    async def spy(start, end, skip=0, count=PROVIDER_PAGE_SIZE):
+        skips.append(skip)
+        return await list_payments(start, end, skip=skip, count=count)
+
+    monkeypatch.setattr(razorpay_service, "list_payments", spy)
+    now = int(time.time())
+    await stub.post("http://stub/_stub/payments", json=[
+        {"id": f"pay_{i}", "order_id": f"order_{i}", "status": "captured", "amount": 10000, "created_at": now - i}
+        for i in range(provider_payments)
+    ])
+
+    orders = await payment_reconciler._fetch_provider_orders(*_window())
+
+    assert len(orders) == provider_payments
+    assert sorted(skips) == expected_skips
+
+
+async def test_corrections_span_batches(db, stub, monkeypatch):
+    monkeypatch.setattr(settings, "RAZORPAY_RECONCILE_BATCH_SIZE", 3)
+    chunks = []
+    reconcile_chunk = payment_reconciler._reconcile_chunk
+
+    async def spy(orders, *args):
+        chunks.append(len(orders))
+        await reconcile_chunk(orders, *args)
+
+    monkeypatch.setattr(payment_reconciler, "_reconcile_chunk", spy)
+    pending = [await _payment(f"order_{i}", PaymentStatus.PENDING) for i in range(7)]
+    now = int(time.time())
+    await stub.post("http://stub/_stub/payments", json=[
+        {"id": f"pay_{i}", "order_id": f"order_{i}", "status": "captured", "amount": 10000, "created_at": now}
+        for i in range(7)
+    ])
+
+    report = await payment_reconciler.reconcile(*_window(), apply=True)
+
+    assert chunks == [3, 3, 1]
+    assert report["corrected"][CAPTURED_NOT_COMPLETED] == 7
+    for payment in pending:
+        assert (await Payment.get(payment.id)).status == PaymentStatus.COMPLETED
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from app.models.platform_settings import PlatformSettings
+from app.services.platform_settings_cache import PlatformSettingsCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_first_reads_create_one_document(db):
+    results = await asyncio.gather(*(PlatformSettings.get_or_create() for _ in range(5)))
+
+    assert {r.id for r in results} == {results[0].id}
+    assert await PlatformSettings.count() == 1
+
+
+async def test_workers_pick_up_each_others_writes_within_one_poll(db, monkeypatch):
+    writer, reader = PlatformSettingsCache(), PlatformSettingsCache()
+    assert (await reader.get()).minimum_withdrawal_amount == 10.0
+
+    reloads = []
+    reload = reader.reload
+
+    async def counting_reload():
+        reloads.append(1)
+        return await reload()
+
+    monkeypatch.setattr(reader, "reload", counting_reload)
+
+    # Unchanged version: the poll reads only the version, and hot-path reads stay in memory
+    await reader.run_once()
+    assert reloads == []
+
+    updated = await writer.update({"minimum_withdrawal_amount": 25.0}, updated_by="admin-1")
+    assert updated.version == 1 and (await writer.get()).minimum_withdrawal_amount == 25.0
+    assert (await reader.get()).minimum_withdrawal_amount == 10.0  # Stale until it polls
+
+    await reader.run_once()
+    current = await reader.get()
+    assert reloads == [1] and current.minimum_withdrawal_amount == 25.0 and current.updated_by == "admin-1"
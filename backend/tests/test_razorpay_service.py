@@ -0,0 +1,67 @@
+import httpx
+import pytest
+import razorpay_stub
+from app.core.config import settings
+from app.services.razorpay_service import RazorpayService
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """Stub app behind a network that fails the first few requests."""
+
+    def __init__(self, failures: list):
+        self.failures = failures  # "503", "connect" or "read" per failing request
+        self.requests = []
+        self.stub = httpx.ASGITransport(app=razorpay_stub.app)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(f"{request.method} {request.url.path}")
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == "503":
+            return httpx.Response(503, json={"error": {"description": "Service unavailable"}})
+        if failure == "connect":
+            raise httpx.ConnectError("connection refused", request=request)
+        if failure == "read":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return await self.stub.handle_async_request(request)
+
+
+@pytest.fixture
+def razorpay(monkeypatch):
+    monkeypatch.setattr(settings, "RAZORPAY_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "RAZORPAY_RETRY_BASE_SECONDS", 0.0)
+
+    def connect(failures: list):
+        service = RazorpayService()
+        transport = FlakyTransport(failures)
+        service._client = httpx.AsyncClient(transport=transport, base_url="http://stub/v1")
+        return service, transport
+
+    return connect
+
+
+async def test_idempotent_calls_retry_transient_failures(razorpay):
+    service, transport = razorpay(["503", "read"])
+
+    payment = await service.fetch_payment("pay_retry")
+
+    assert payment["id"] == "pay_retry" and len(transport.requests) == 3
+    metrics = service.get_metrics()["fetch_payment"]
+    assert (metrics["calls"], metrics["errors"], metrics["retries"]) == (3, 2, 2)
+    assert metrics["latency_ms_p50"] is not None
+
+
+async def test_money_movements_retry_only_requests_that_never_arrived(razorpay):
+    service, transport = razorpay(["connect"])
+    assert (await service.create_order(10.0))["success"]
+    assert transport.requests == ["POST /v1/orders", "POST /v1/orders"]
+
+    # The refund may have been applied; repeating it could refund twice
+    service, transport = razorpay(["read"])
+    assert await service.refund_payment("pay_once") is None
+    assert transport.requests == ["POST /v1/payments/pay_once/refund"]
+
+    service, transport = razorpay(["503", "503", "503"])
+    assert await service.fetch_payment("pay_down") is None
+    assert len(transport.requests) == 3  # Gives up after RAZORPAY_MAX_RETRIES
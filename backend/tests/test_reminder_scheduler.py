@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.models.tutor import TutorProfile
+from app.services.email_service import email_service
+from app.services.notification_service import notification_service
+from app.services.reminder_scheduler import ReminderScheduler
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """(user_id, booking_id) of every reminder notification, plus reminder email recipients."""
+    reminders = {"notifications": [], "emails": []}
+
+    async def notify_booking_reminder(user_id, booking_id, **kwargs):
+        reminders["notifications"].append((user_id, booking_id))
+
+    async def send_session_reminder_email(to_email, **kwargs):
+        reminders["emails"].append(to_email)
+        return True
+
+    monkeypatch.setattr(notification_service, "notify_booking_reminder", notify_booking_reminder)
+    monkeypatch.setattr(email_service, "send_session_reminder_email", send_session_reminder_email)
+    monkeypatch.setattr(settings, "REMINDER_OFFSETS_MINUTES", [1440, 15])
+    monkeypatch.setattr(settings, "REMINDER_RESCAN_SECONDS", 0.0)  # Re-read the window every tick
+    return reminders
+
+
+async def _booking(tutor: TutorProfile, starts_in: timedelta, status=BookingStatus.CONFIRMED) -> Booking:
+    booking = Booking(
+        student_id="student-user", tutor_id=str(tutor.id), subject="Maths", status=status,
+        scheduled_at=datetime.utcnow() + starts_in, price=100.0, student_email="student@example.com"
+    )
+    await booking.insert()
+    return booking
+
+
+async def test_due_reminders_are_sent_once_across_ticks_and_leaders(db, sent):
+    tutor = TutorProfile(user_id="tutor-user")
+    await tutor.insert()
+    due = await _booking(tutor, timedelta(minutes=14))
+    later = await _booking(tutor, timedelta(minutes=40))
+    await _booking(tutor, timedelta(minutes=14), status=BookingStatus.CANCELLED)
+
+    scheduler = ReminderScheduler()
+    for _ in range(2):
+        await scheduler.run_once()
+
+    assert sent["notifications"] == [("student-user", str(due.id)), ("tutor-user", str(due.id))]
+    assert sent["emails"] == ["student@example.com"]
+    assert (await Booking.get(due.id)).reminders_sent == [15]
+    # The later reminder is held once in the heap despite the rescan
+    assert [entry[1:] for entry in scheduler._heap] == [(str(later.id), 15)]
+
+    # A new leader reloads the window but skips what was already sent
+    await ReminderScheduler().run_once()
+    assert len(sent["notifications"]) == 2
+
+
+async def test_reminder_is_skipped_for_a_booking_cancelled_after_loading(db, sent):
+    tutor = TutorProfile(user_id="tutor-user")
+    await tutor.insert()
+    booking = await _booking(tutor, timedelta(minutes=20))
+    scheduler = ReminderScheduler()
+    await scheduler.run_once()
+    assert len(scheduler._heap) == 1
+
+    await Booking.get_motor_collection().update_one(
+        {"_id": booking.id}, {"$set": {"status": BookingStatus.CANCELLED.value}}
+    )
+    await scheduler._fire_due(datetime.utcnow() + timedelta(minutes=10))
+
+    assert scheduler._heap == [] and sent == {"notifications": [], "emails": []}
+    assert (await Booking.get(booking.id)).reminders_sent == []
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+import pytest
+from app.models.payment import Payment, PaymentStatus, PlatformRevenue
+from app.services.payment_service import payment_service
+from app.services.revenue_rollup import revenue_rollup
+
+pytestmark = pytest.mark.anyio
+
+
+def _payment(i: int, completed_at: datetime, currency: str = "INR", first: bool = False) -> Payment:
+    return Payment(
+        booking_id=f"booking-{currency}-{i}", student_id="student", tutor_id="tutor", currency=currency,
+        session_amount=100.0, admission_fee=10.0 if first else 0.0, commission_fee=5.0,
+        total_platform_fee=15.0 if first else 5.0, tutor_earnings=85.0 if first else 95.0,
+        status=PaymentStatus.COMPLETED, is_first_booking=first, completed_at=completed_at
+    )
+
+
+async def _row(date: datetime, currency: str = "INR") -> PlatformRevenue:
+    return await PlatformRevenue.find_one({"date": date, "currency": currency})
+
+
+async def test_concurrent_completions_and_refunds_land_in_their_day(db):
+    day = datetime(2026, 3, 4)
+    payments = [_payment(i, day.replace(hour=i), first=i == 0) for i in range(6)]
+
+    await asyncio.gather(*(revenue_rollup.record_completed([p]) for p in payments))
+    await revenue_rollup.record_completed([_payment(0, day.replace(hour=23), currency="USD")])
+    await revenue_rollup.record_refunded([payments[1]])
+
+    row = await _row(day)
+    assert row.total_bookings == 5 and row.new_student_bookings == 1
+    assert row.total_session_fees == 500.0 and row.total_platform_revenue == 35.0
+    assert row.total_tutor_payouts == 465.0
+    assert row.total_refunds == 100.0 and row.refunded_bookings == 1
+    assert (await _row(day, "USD")).total_session_fees == 100.0
+
+
+async def test_revenue_stats_never_mix_currencies(db):
+    now = datetime.utcnow()
+    await revenue_rollup.record_completed([_payment(i, now) for i in range(3)])
+    await revenue_rollup.record_completed([_payment(0, now, currency="USD")])
+
+    stats = await payment_service.get_revenue_stats()
+
+    assert [(s.currency, s.total_revenue, s.total_payments) for s in stats] == [("INR", 15.0, 3), ("USD", 5.0, 1)]
+    assert stats[0].monthly_revenue == 15.0 and stats[0].weekly_bookings == 3
+    assert [s.currency for s in await payment_service.get_revenue_stats("USD")] == ["USD"]
+
+
+async def test_rebuild_restores_rows_from_payments(db):
+    day = datetime(2026, 3, 4)
+    payments = [_payment(i, day.replace(hour=i)) for i in range(3)]
+    await Payment.insert_many(payments)
+    await revenue_rollup.record_completed(payments)
+    await PlatformRevenue.get_motor_collection().update_one({"date": day}, {"$set": {"total_bookings": 99}})
+    await revenue_rollup.record_completed([_payment(9, datetime(2026, 3, 5))])  # No payment behind it
+
+    assert await revenue_rollup.rebuild() == 1
+
+    assert (await _row(day)).total_bookings == 3
+    assert await _row(datetime(2026, 3, 5)) is None
@@ -0,0 +1,66 @@
+from datetime import datetime
+import httpx
+import pytest
+from app.main import app
+from app.models.payment import Payment, PaymentStatus
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services.revenue_rollup import revenue_rollup
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def admin_client(db):
+    admin = User(email="admin@example.com", full_name="Admin", hashed_password="x", role=UserRole.ADMIN)
+    await admin.insert()
+    app.dependency_overrides[get_current_user] = lambda: admin
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.pop(get_current_user)
+
+
+async def _completed(day: int, amount: float):
+    await revenue_rollup.record_completed([Payment(
+        booking_id=f"booking-{day}-{amount}", student_id="student", tutor_id="tutor", session_amount=amount,
+        commission_fee=amount / 20, total_platform_fee=amount / 20, status=PaymentStatus.COMPLETED,
+        completed_at=datetime(2026, 3, day, 12)
+    )])
+
+
+async def test_daily_series_fills_empty_days(admin_client):
+    await _completed(2, 100.0)
+    await _completed(2, 300.0)
+    await _completed(4, 200.0)
+
+    # Offset-aware bounds are compared as UTC: 05:30+05:30 is midnight UTC
+    response = await admin_client.get("/api/admin/revenue/timeseries", params={
+        "start": "2026-03-02T05:30:00+05:30", "end": "2026-03-05T00:00:00Z"
+    })
+
+    assert response.status_code == 200
+    series = response.json()
+    assert series["buckets"] == ["2026-03-02T00:00:00", "2026-03-03T00:00:00", "2026-03-04T00:00:00"]
+    assert series["session_fees"] == [400.0, 0, 200.0]
+    assert series["revenue"] == [20.0, 0, 10.0]
+    assert series["bookings"] == [2, 0, 1]
+
+
+async def test_weekly_series_and_range_checks(admin_client):
+    await _completed(2, 100.0)  # Before start
+    await _completed(8, 100.0)  # Sunday of the week starting Monday the 2nd
+    await _completed(9, 100.0)
+
+    series = (await admin_client.get("/api/admin/revenue/timeseries", params={
+        "start": "2026-03-04T00:00:00", "end": "2026-03-16T00:00:00", "granularity": "week"
+    })).json()
+    assert series["buckets"] == ["2026-03-02T00:00:00", "2026-03-09T00:00:00"]
+    # Buckets are labelled by week start but only count days inside [start, end)
+    assert series["bookings"] == [1, 1]
+
+    for params in [
+        {"start": "2026-03-05T00:00:00", "end": "2026-03-01T00:00:00"},
+        {"start": "2000-01-01T00:00:00", "end": "2026-03-01T00:00:00", "granularity": "day"},
+    ]:
+        assert (await admin_client.get("/api/admin/revenue/timeseries", params=params)).status_code == 400
+    assert (await admin_client.get("/api/admin/revenue/timeseries", params={"granularity": "hour"})).status_code == 422
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models.booking import Booking, BookingStatus
+from app.models.tutor import TutorProfile
+from app.services.session_sweeper import SessionSweeper, complete_bookings
+
+pytestmark = pytest.mark.anyio
+
+
+async def _confirmed_bookings(tutor: TutorProfile, count: int):
+    bookings = []
+    for _ in range(count):
+        booking = Booking(
+            student_id="student-1", tutor_id=str(tutor.id), subject="Maths",
+            scheduled_at=datetime.utcnow() - timedelta(hours=2), price=500.0,
+            status=BookingStatus.CONFIRMED
+        )
+        await booking.insert()
+        bookings.append(booking)
+    return bookings
+
+
+async def test_lessons_counted_once_when_counter_write_is_retried(db, monkeypatch):
+    tutor = TutorProfile(user_id="tutor-user")
+    await tutor.insert()
+    bookings = await _confirmed_bookings(tutor, 3)
+    assert await complete_bookings([b.id for b in bookings], [BookingStatus.CONFIRMED]) == 3
+
+    # The counter write lands but the tick dies before it returns
+    collection = TutorProfile.get_motor_collection()
+    bulk_write = collection.bulk_write
+    crashed = []
+
+    async def bulk_write_then_crash(*args, **kwargs):
+        result = await bulk_write(*args, **kwargs)
+        if not crashed:
+            crashed.append(True)
+            raise ConnectionError("connection reset")
+        return result
+
+    monkeypatch.setattr(collection, "bulk_write", bulk_write_then_crash)
+
+    sweeper = SessionSweeper()
+    with pytest.raises(ConnectionError):
+        await sweeper._apply_completions()
+    assert not await sweeper._apply_completions()  # Nothing left to resume
+
+    assert (await TutorProfile.get(tutor.id)).total_lessons == 3
+    assert await Booking.find(Booking.completion_applied == False).count() == 0  # noqa: E712
+
+
+async def test_completing_again_does_not_recount(db):
+    tutor = TutorProfile(user_id="tutor-user")
+    await tutor.insert()
+    bookings = await _confirmed_bookings(tutor, 2)
+
+    await complete_bookings([b.id for b in bookings], [BookingStatus.CONFIRMED])
+    await SessionSweeper()._apply_completions()
+    # Already completed: the conditional transition does not reopen them
+    assert await complete_bookings([b.id for b in bookings], [BookingStatus.CONFIRMED]) == 0
+    await SessionSweeper()._apply_completions()
+
+    assert (await TutorProfile.get(tutor.id)).total_lessons == 2
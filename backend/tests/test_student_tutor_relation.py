@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+import pytest
+from app.core import database
+from app.models.payment import StudentTutorRelation
+from app.services.payment_service import payment_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_duplicate_legacy_relations_are_merged_before_the_unique_index(mongo, raw_db):
+    relations = raw_db["student_tutor_relations"]
+    await relations.create_index([("student_id", 1), ("tutor_id", 1)])  # Legacy non-unique index
+    await relations.insert_many([
+        {"student_id": "s", "tutor_id": "t", "first_booking_id": "b1", "first_booking_date": datetime(2024, 1, 1),
+         "total_bookings": 2, "total_spent": 200.0, "booking_ids": ["b1", "b2"]},
+        {"student_id": "s", "tutor_id": "t", "first_booking_id": "b3", "first_booking_date": datetime(2024, 1, 2),
+         "total_bookings": 1, "total_spent": 50.0, "booking_ids": ["b2", "b3"]},
+        {"student_id": "s", "tutor_id": "other", "first_booking_id": "b4", "first_booking_date": datetime(2024, 1, 3),
+         "total_bookings": 1, "total_spent": 10.0},
+    ])
+
+    await database.connect_to_mongo()
+    try:
+        indexes = await relations.index_information()
+        assert indexes["student_id_1_tutor_id_1"].get("unique")
+
+        merged = await StudentTutorRelation.find_one(
+            StudentTutorRelation.student_id == "s", StudentTutorRelation.tutor_id == "t"
+        )
+        assert merged.first_booking_id == "b1"
+        assert merged.total_bookings == 3 and merged.total_spent == 250.0
+        assert merged.booking_ids == ["b1", "b2", "b3"]
+        assert await StudentTutorRelation.count() == 2
+
+        # Counting a booking again is a no-op, and the first booking keeps its answer
+        assert not await payment_service.record_booking_relation("s", "t", "b3", 50.0)
+        assert await payment_service.record_booking_relation("s", "t", "b1", 100.0)
+        assert (await StudentTutorRelation.get(merged.id)).total_bookings == 3
+    finally:
+        await database.close_mongo_connection()
+
+
+async def test_concurrent_first_bookings_count_once(db):
+    results = await asyncio.gather(*[
+        payment_service.record_booking_relation("s", "t", "b1", 100.0) for _ in range(5)
+    ])
+    assert all(results)  # Every retry of the first booking gets the same answer
+    assert not await payment_service.record_booking_relation("s", "t", "b2", 100.0)
+
+    relation = await StudentTutorRelation.find_one(StudentTutorRelation.student_id == "s")
+    assert relation.total_bookings == 2 and relation.total_spent == 200.0
+    assert relation.booking_ids == ["b1", "b2"]
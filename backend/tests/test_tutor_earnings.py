@@ -0,0 +1,75 @@
+import pytest
+from app.models.payment import Payment, PaymentStatus
+from app.models.tutor import TutorProfile
+from app.services.payment_service import payment_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def _tutors():
+    tutors = []
+    for name in ("Ana", "Ben", "Cy"):
+        tutor = TutorProfile(user_id=f"{name}-user", full_name=name, email=f"{name.lower()}@example.com")
+        await tutor.insert()
+        tutors.append(str(tutor.id))
+    ana, ben, _ = tutors
+    rows = [
+        (ana, PaymentStatus.COMPLETED, 90.0), (ana, PaymentStatus.COMPLETED, 45.5),
+        (ana, PaymentStatus.PENDING, 30.0), (ana, PaymentStatus.FAILED, 500.0),
+        (ben, PaymentStatus.COMPLETED, 200.0),
+    ]
+    await Payment.insert_many([
+        Payment(
+            booking_id=f"booking-{i}", student_id="student", tutor_id=tutor_id, session_amount=earnings + 10,
+            total_platform_fee=10.0, tutor_earnings=earnings, status=status
+        )
+        for i, (tutor_id, status, earnings) in enumerate(rows)
+    ])
+    return tutors
+
+
+async def test_bulk_earnings_partition_by_status(db):
+    ana, ben, cy = await _tutors()
+
+    earnings = await payment_service.get_tutor_earnings_bulk([ana, ben, cy])
+
+    assert earnings[ana] == {
+        "tutor_id": ana, "total_sessions": 2, "total_earnings": 135.5,
+        "platform_fees_paid": 20.0, "pending_earnings": 30.0
+    }
+    assert earnings[ben]["total_earnings"] == 200.0 and earnings[ben]["pending_earnings"] == 0.0
+    assert earnings[cy]["total_sessions"] == 0
+
+
+async def test_report_is_one_aggregation_paged_before_the_profile_join(db, monkeypatch):
+    # mongomock has no $unionWith, so capture the pipeline rather than run it
+    calls = []
+
+    class Cursor:
+        async def to_list(self, length):
+            return []
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            raise StopAsyncIteration
+
+    def aggregate(pipeline, **kwargs):
+        calls.append((pipeline, kwargs))
+        return Cursor()
+
+    monkeypatch.setattr(Payment.get_motor_collection(), "aggregate", aggregate)
+
+    await payment_service.get_tutor_earnings_report(skip=50, limit=25, sort_by="pending_earnings", descending=False)
+    assert [row async for row in payment_service.stream_tutor_earnings()] == []
+
+    (page, page_options), (stream, stream_options) = calls
+    stages = [next(iter(stage)) for stage in page]
+    assert stages.count("$group") == 2 and "$unionWith" in stages
+    assert page[stages.index("$sort")]["$sort"] == {"pending_earnings": 1, "_id": 1}
+    # Only the requested page is joined with tutor profiles
+    assert stages.index("$skip") < stages.index("$limit") < stages.index("$lookup")
+    assert page[stages.index("$skip")]["$skip"] == 50 and page[stages.index("$limit")]["$limit"] == 25
+    assert page_options == {"allowDiskUse": True}
+    assert "$skip" not in [next(iter(stage)) for stage in stream] and stream_options["batchSize"] == 500
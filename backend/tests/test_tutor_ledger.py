@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.models.payment import Payment, PaymentStatus
+from app.models.tutor import TutorProfile
+from app.models.tutor_balance import TutorBalance
+from app.models.withdrawal import Withdrawal, WithdrawalStatus
+from app.services.payment_service import payment_service
+from app.services.tutor_ledger import TutorLedgerService, tutor_ledger
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def tutor(db) -> TutorProfile:
+    tutor = TutorProfile(user_id=str(ObjectId()))
+    await tutor.insert()
+    return tutor
+
+
+async def _payment(tutor: TutorProfile, earnings: float, status=PaymentStatus.PENDING) -> Payment:
+    payment = Payment(
+        booking_id=str(ObjectId()), student_id="student", tutor_id=str(tutor.id),
+        session_amount=earnings, tutor_earnings=earnings, status=status
+    )
+    await payment.insert()
+    return payment
+
+
+async def _complete(payments) -> list:
+    return await payment_service.transition_payments(
+        {p.id: {} for p in payments}, [PaymentStatus.PENDING], PaymentStatus.COMPLETED, "completed_at"
+    )
+
+
+async def test_first_read_builds_from_history(tutor):
+    await _payment(tutor, 100.0, PaymentStatus.COMPLETED)
+    await _payment(tutor, 50.0, PaymentStatus.PENDING)
+    await Withdrawal(tutor_id=tutor.user_id, amount=30.0, status=WithdrawalStatus.PENDING).insert()
+    await Withdrawal(tutor_id=tutor.user_id, amount=20.0, status=WithdrawalStatus.COMPLETED).insert()
+
+    balance = await tutor_ledger.get_balance(str(tutor.id))
+
+    assert balance.total_earnings == 100.0
+    assert (balance.available, balance.pending_withdrawals, balance.withdrawn_amount) == (50.0, 30.0, 20.0)
+    assert await tutor_ledger.reconcile([str(tutor.id)]) == []
+
+
+async def test_concurrent_first_credits_count_each_payment_once(tutor, monkeypatch):
+    await _payment(tutor, 10.0, PaymentStatus.COMPLETED)  # From before the ledger
+    first, second = await _complete([await _payment(tutor, 100.0), await _payment(tutor, 40.0)])
+
+    # Both credits build the missing row before either inserts it
+    expected = TutorLedgerService._expected
+    building = []
+
+    async def slow_expected(tutor_ids, *args):
+        values = await expected(tutor_ids, *args)
+        building.append(tutor_ids)
+        await asyncio.sleep(0.05)
+        return values
+
+    monkeypatch.setattr(TutorLedgerService, "_expected", staticmethod(slow_expected))
+    await asyncio.gather(payment_service.record_completed([first]), payment_service.record_completed([second]))
+
+    assert len(building) == 2
+    balance = await TutorBalance.find_one(TutorBalance.tutor_id == str(tutor.id))
+    assert balance.total_earnings == 150.0 and balance.available == 150.0
+    assert await Payment.find(Payment.effects_pending != None).count() == 0  # noqa: E711
+
+
+async def test_refund_debits_once(tutor):
+    [payment] = await _complete([await _payment(tutor, 100.0)])
+    await payment_service.record_completed([payment])
+
+    await payment_service.refund_payment(str(payment.id))
+    await payment_service.refund_payment(str(payment.id))  # Already refunded: no second debit
+
+    balance = await tutor_ledger.get_balance(str(tutor.id))
+    assert balance.total_earnings == 0.0 and balance.available == 0.0
+
+
+async def test_reserve_never_overdraws(tutor):
+    [payment] = await _complete([await _payment(tutor, 100.0)])
+    await payment_service.record_completed([payment])
+
+    results = await asyncio.gather(*[tutor_ledger.reserve(str(tutor.id), 40.0) for _ in range(3)])
+
+    assert sum(result is not None for result in results) == 2
+    assert await tutor_ledger.reserve(str(tutor.id), 30.0) is None
+    balance = await tutor_ledger.get_balance(str(tutor.id))
+    assert (balance.available, balance.pending_withdrawals) == (20.0, 80.0)
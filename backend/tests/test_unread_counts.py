@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.main import app
+from app.models.announcement import AnnouncementReceipt
+from app.models.counter import Counter
+from app.models.notification import Notification, NotificationType
+from app.models.user import User, UserRole
+from app.routes.auth import get_current_user
+from app.services.announcement_service import announcement_service
+from app.services.notification_service import notification_service
+from app.services.unread_counter import counter_name, unread_counter_repair, unread_counters, REPAIR_MIN_AGE_SECONDS
+from app.services.websocket_manager import manager, NotificationPayload
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeConnection:
+    role = None
+
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, data: str) -> bool:
+        self.sent.append(data)
+        return True
+
+
+@pytest.fixture
+async def user(db) -> User:
+    user = User(email="student@example.com", full_name="Student", hashed_password="x", role=UserRole.STUDENT)
+    await user.insert()
+    return user
+
+
+@pytest.fixture
+def online(user, monkeypatch):
+    """The user has a socket on this worker."""
+    user_id = str(user.id)
+    monkeypatch.setitem(manager.active_connections, user_id, [FakeConnection()])
+    yield user_id
+    manager.unread_counts.pop(user_id, None)
+    manager.announcement_receipts.pop(user_id, None)
+
+
+async def _notify(user_id: str) -> Notification:
+    return await notification_service.create_notification(
+        user_id=user_id, notification_type=NotificationType.SYSTEM, title="Hi", message="Hello", send_realtime=False
+    )
+
+
+async def test_counter_follows_creates_and_conditional_reads(user):
+    user_id = str(user.id)
+    first = await _notify(user_id)  # Counter not seeded yet: the $inc creates nothing
+    assert await Counter.find_one(Counter.name == counter_name(user_id)) is None
+    assert await unread_counters.get(user_id) == 1  # Seeded from an exact count
+    await _notify(user_id)
+    assert await unread_counters.get(user_id) == 2
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for _ in range(2):
+                assert (await client.put(f"/api/notifications/{first.id}/read")).status_code == 200
+            badge = (await client.get("/api/notifications/unread-count")).json()
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert await unread_counters.get(user_id) == 1
+    assert badge["count"] == 1
+
+
+async def test_repair_fixes_settled_counters_only(user):
+    user_id, other_id = str(user.id), "other-user"
+    for _ in range(3):
+        await _notify(user_id)
+    await _notify(other_id)
+    await unread_counters.get(user_id)
+    await unread_counters.get(other_id)
+
+    old = datetime.utcnow() - timedelta(seconds=REPAIR_MIN_AGE_SECONDS + 1)
+    collection = Counter.get_motor_collection()
+    await collection.update_one({"name": counter_name(user_id)}, {"$set": {"value": 7, "updated_at": old}})
+    await collection.update_one({"name": counter_name(other_id)}, {"$set": {"value": 9}})  # Just written
+
+    assert await unread_counter_repair.repair() == 1
+    assert await unread_counters.get(user_id) == 3
+    assert await unread_counters.get(other_id) == 9
+
+
+async def test_online_badge_reuses_mirrored_receipts(user, online, monkeypatch):
+    receipts = AnnouncementReceipt.get_motor_collection()
+    find = receipts.find
+    lookups = []
+
+    def counting_find(*args, **kwargs):
+        lookups.append(args)
+        return find(*args, **kwargs)
+
+    monkeypatch.setattr(receipts, "find", counting_find)
+    announcement = await announcement_service.publish("Maintenance", "Tonight at 10")
+
+    # Each new notification re-sends the badge; only the first looks at receipts
+    for _ in range(2):
+        await _notify(online)
+    await notification_service.send_unread_count(online)
+    assert len(lookups) == 1
+    assert await notification_service.get_unread_count(online, "student", cached=False) == 3
+
+    # A read on this worker drops the copy
+    assert await announcement_service.mark_read(online, str(announcement.id))
+    assert await notification_service.get_unread_count(online, "student", cached=False) == 2
+    assert len(lookups) == 2
+
+    # A change made on another worker arrives as a flagged unread count
+    await AnnouncementReceipt.get_motor_collection().update_one(
+        {"user_id": online}, {"$set": {"read_at": None}}
+    )
+    await manager.deliver_local([online], NotificationPayload.unread_count(3, receipts_changed=True))
+    assert online not in manager.announcement_receipts
+    assert await notification_service.get_unread_count(online, "student", cached=False) == 3
+
+    # Publishing drops every copy; offline users are never mirrored
+    await announcement_service.publish("Second", "Another one")
+    assert manager.announcement_receipts == {}
+    await notification_service.get_unread_count("offline-user", "student", cached=False)
+    assert "offline-user" not in manager.announcement_receipts
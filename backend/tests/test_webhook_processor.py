@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.models.booking import Booking
+from app.models.notification import Notification
+from app.models.payment import Payment, PaymentStatus
+from app.models.tutor import TutorProfile
+from app.models.tutor_balance import TutorBalance
+from app.models.webhook_event import WebhookEvent, WebhookEventStatus
+from app.services import webhook_processor as processor_module
+from app.services.payment_service import payment_service
+from app.services.webhook_processor import WebhookProcessor
+
+pytestmark = pytest.mark.anyio
+
+
+async def _captured_event(event_id: str, order_id: str) -> WebhookEvent:
+    event = WebhookEvent(
+        event_id=event_id,
+        event="payment.captured",
+        payload={"payment": {"entity": {"id": f"pay_{order_id}", "order_id": order_id}}}
+    )
+    await event.insert()
+    return event
+
+
+async def _pending_payment(tutor: TutorProfile, order_id: str) -> Payment:
+    booking = Booking(
+        student_id="student-1", tutor_id=str(tutor.id), subject="Maths",
+        scheduled_at=datetime.utcnow() + timedelta(days=1), price=1000.0
+    )
+    await booking.insert()
+    payment = Payment(
+        booking_id=str(booking.id), student_id="student-1", tutor_id=str(tutor.id),
+        session_amount=1000.0, tutor_earnings=900.0, razorpay_order_id=order_id
+    )
+    await payment.insert()
+    return payment
+
+
+async def test_effects_resume_after_batch_fails_midway(db, monkeypatch):
+    tutor_user_id = str(ObjectId())
+    tutor = TutorProfile(user_id=tutor_user_id)
+    await tutor.insert()
+    payments = [await _pending_payment(tutor, f"order_{i}") for i in range(2)]
+    for i in range(2):
+        await _captured_event(f"evt_{i}", f"order_{i}")
+
+    # The ledger write fails once, after the batch has already completed both payments
+    record_completed = payment_service.record_completed
+    calls = []
+
+    async def flaky_record_completed(completed):
+        calls.append(len(completed))
+        if len(calls) == 1:
+            raise RuntimeError("ledger unavailable")
+        await record_completed(completed)
+
+    monkeypatch.setattr(payment_service, "record_completed", flaky_record_completed)
+
+    processor = WebhookProcessor()
+    await processor.run_once()
+
+    # The per-event retry finds the effects freshly marked and leaves the events pending
+    for payment in payments:
+        stored = await Payment.get(payment.id)
+        assert stored.status == PaymentStatus.COMPLETED
+        assert stored.effects_pending == PaymentStatus.COMPLETED
+    assert {e.status for e in await WebhookEvent.find_all().to_list()} == {WebhookEventStatus.PENDING}
+    assert await TutorBalance.find_one(TutorBalance.tutor_id == str(tutor.id)) is None
+    assert await Notification.find(Notification.user_id == tutor_user_id).count() == 0
+
+    # Once the mark is old enough the processor takes the effects over
+    monkeypatch.setattr(processor_module, "EFFECTS_RESUME_AFTER_SECONDS", 0)
+    await WebhookEvent.get_motor_collection().update_many({}, {"$set": {"next_attempt_at": None}})
+    await processor.run_once()
+
+    for payment in payments:
+        stored = await Payment.get(payment.id)
+        assert stored.effects_pending is None
+        assert (await Booking.get(stored.booking_id)).payment_status == "paid"
+    assert {e.status for e in await WebhookEvent.find_all().to_list()} == {WebhookEventStatus.PROCESSED}
+    balance = await TutorBalance.find_one(TutorBalance.tutor_id == str(tutor.id))
+    assert balance.available == 1800.0 and balance.total_earnings == 1800.0
+    assert await Notification.find(Notification.user_id == tutor_user_id).count() == 2
+
+    # A later redelivery is a no-op
+    await WebhookEvent.get_motor_collection().update_many(
+        {}, {"$set": {"status": WebhookEventStatus.PENDING.value, "next_attempt_at": None}}
+    )
+    await processor.run_once()
+    balance = await TutorBalance.find_one(TutorBalance.tutor_id == str(tutor.id))
+    assert balance.available == 1800.0
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import pytest
+from app.core.config import settings
+from app.services.websocket_manager import ConnectionManager, SLOW_CONSUMER_CLOSE_CODE
+from app.services.ws_backplane import InMemoryBackplane
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeWebSocket:
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(json.loads(data)["n"])
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_full_queue_evicts_only_the_slow_socket(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 3)
+    worker = ConnectionManager(InMemoryBackplane())
+    fast, slow = FakeWebSocket(), FakeWebSocket(stalled=True)
+    await worker.connect(fast, "alice")
+    await worker.connect(slow, "alice")
+
+    # The stalled writer holds one message; three more fill its queue, the fifth overflows
+    for n in range(5):
+        await worker.send_personal_message({"n": n}, "alice")
+        await _settle()
+    await _settle()
+
+    assert fast.sent == [0, 1, 2, 3, 4]
+    assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE and worker.evicted_count == 1
+    assert [c.websocket for c in worker.active_connections["alice"]] == [fast]
+
+
+async def test_send_timeout_evicts_and_disconnect_cleans_up(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+    worker = ConnectionManager(InMemoryBackplane())
+    slow = FakeWebSocket(stalled=True)
+    await worker.connect(slow, "bob")
+
+    await worker.send_personal_message({"n": 1}, "bob")
+    await asyncio.sleep(0.1)
+    await _settle()
+
+    assert not worker.is_user_online("bob") and slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+
+    fine = FakeWebSocket()
+    connection = await worker.connect(fine, "bob")
+    worker.unread_counts["bob"] = 2
+    await worker.disconnect(fine, "bob")
+    await _settle()
+    assert worker.active_connections == {} and worker.unread_counts == {}
+    assert connection._writer.cancelled() and fine.closed_with == 1000
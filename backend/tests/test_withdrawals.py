@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.main import app
+from app.models.user import User, UserRole
+from app.models.withdrawal import Withdrawal, WithdrawalStatus
+from app.routes.auth import get_current_user
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def admin_client(db):
+    admin = User(email="admin@example.com", full_name="Admin", hashed_password="x", role=UserRole.ADMIN)
+    await admin.insert()
+    app.dependency_overrides[get_current_user] = lambda: admin
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.pop(get_current_user)
+
+
+async def _withdrawals(count: int) -> list:
+    start = datetime(2026, 1, 1)
+    statuses = list(WithdrawalStatus)
+    withdrawals = [
+        Withdrawal(
+            tutor_id="tutor-user", amount=10.0 + i, status=statuses[i % len(statuses)],
+            # Pairs share a timestamp to exercise the _id tie-break
+            created_at=start + timedelta(minutes=i // 2)
+        )
+        for i in range(count)
+    ]
+    await Withdrawal.insert_many(withdrawals)
+    return await Withdrawal.find_all().to_list()
+
+
+async def test_all_withdrawals_is_bounded_by_default(admin_client):
+    await _withdrawals(60)
+
+    response = await admin_client.get("/api/withdrawals/admin/all")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 50
+    assert (await admin_client.get("/api/withdrawals/admin/all", params={"limit": 500})).status_code == 422
+
+
+async def test_queue_pages_through_every_status(admin_client):
+    stored = await _withdrawals(23)
+    seen, cursor = [], None
+    while True:
+        params = {"all_statuses": True, "order": "desc", "limit": 5, **({"cursor": cursor} if cursor else {})}
+        page = (await admin_client.get("/api/withdrawals/admin/queue", params=params)).json()
+        seen += page["withdrawals"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 23 and len({w["id"] for w in seen}) == 23
+    assert [w["id"] for w in seen] == [
+        str(w.id) for w in sorted(stored, key=lambda w: (w.created_at, w.id), reverse=True)
+    ]
+
+    pending = (await admin_client.get("/api/withdrawals/admin/queue")).json()["withdrawals"]
+    assert {w["status"] for w in pending} == {"pending"}
+    assert [w["created_at"] for w in pending] == sorted(w["created_at"] for w in pending)
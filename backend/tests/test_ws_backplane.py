@@ -0,0 +1,76 @@
+import asyncio
+import json
+import pytest
+from app.services import ws_backplane
+from app.services.websocket_manager import ConnectionManager
+from app.services.ws_backplane import InMemoryBackplane, MongoBackplane
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeConnection:
+    def __init__(self, role=None):
+        self.role = role
+        self.sent = []
+
+    def enqueue(self, data: str) -> bool:
+        self.sent.append(json.loads(data))
+        return True
+
+
+def _worker(backplane, **users) -> ConnectionManager:
+    """A worker's connection manager holding one fake socket per user."""
+    worker = ConnectionManager(backplane)
+    for user_id, role in users.items():
+        worker.active_connections[user_id] = [FakeConnection(role)]
+    return worker
+
+
+def _received(worker: ConnectionManager, user_id: str) -> list:
+    return [m["data"] for m in worker.active_connections[user_id][0].sent]
+
+
+async def _until(condition, timeout: float = 2.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_in_memory_backplane_delivers_by_user_and_role():
+    worker = _worker(InMemoryBackplane(), alice="student", bob="tutor")
+
+    await worker.send_personal_message({"data": 1}, "alice")
+    await worker.broadcast({"data": 2}, role="tutor")
+    await worker.broadcast({"data": 3})
+    await worker.send_to_users({"data": 4}, ["bob", "offline"])
+
+    assert _received(worker, "alice") == [1, 3]
+    assert _received(worker, "bob") == [2, 3, 4]
+
+
+async def test_mongo_backplane_fans_out_across_workers_once(raw_db, monkeypatch):
+    # mongomock has no capped collections; a plain one is tailed by re-opening the cursor
+    monkeypatch.setattr(ws_backplane, "TAIL_RETRY_SECONDS", 0.01)
+    collection = raw_db["ws_events"]
+    await collection.insert_one({"origin": "old-worker", "user_ids": ["bob"], "role": None, "message": {"data": 0}})
+
+    planes = [MongoBackplane(), MongoBackplane()]
+    for plane in planes:
+        plane._collection = collection
+    first, second = _worker(planes[0], alice="student"), _worker(planes[1], bob="tutor", cy="student")
+    for plane in planes:
+        plane.start()
+    try:
+        await asyncio.sleep(0.05)  # Both tails are past the events published before they started
+        await first.send_personal_message({"data": 1}, "bob")
+        await first.send_many([("alice", {"data": 2}), ("cy", {"data": 3})])
+        await second.broadcast({"data": 4}, role="student")
+        await _until(lambda: len(_received(first, "alice")) == 2 and len(_received(second, "cy")) == 2)
+        await asyncio.sleep(0.05)  # Several more tail passes: nothing is delivered twice
+    finally:
+        for plane in planes:
+            await plane.stop()
+
+    assert _received(second, "bob") == [1]
+    assert _received(first, "alice") == [2, 4]
+    assert sorted(_received(second, "cy")) == [3, 4]  # Own events are delivered ahead of the tail
@@ -58,6 +58,7 @@ const AdminDashboard: React.FC = () => {
   const [payments, setPayments] = useState<PaymentRecord[]>([]);
   const [blogs, setBlogs] = useState<BlogListItem[]>([]);
   const [withdrawals, setWithdrawals] = useState<WithdrawalResponse[]>([]);
+  const [withdrawalsCursor, setWithdrawalsCursor] = useState<string | null>(null);
   const [withdrawalStats, setWithdrawalStats] = useState<WithdrawalStats | null>(null);
 
   // Filter states
@@ -105,7 +106,7 @@ const AdminDashboard: React.FC = () => {
         adminAPI.getRevenueStats(),
         adminAPI.getPayments(),
         blogAPI.getAllBlogs(),
-        withdrawalAPI.getAllWithdrawals(),
+        withdrawalAPI.getWithdrawalQueue(withdrawalFilter.status),
         withdrawalAPI.getWithdrawalStats(),
         adminAPI.getSettings().catch(() => ({ minimum_withdrawal_amount: 10 }))
       ]);
@@ -116,7 +117,8 @@ const AdminDashboard: React.FC = () => {
       setRevenueStats(revenueData);
       setPayments(paymentsData);
       setBlogs(blogsData);
-      setWithdrawals(withdrawalsData);
+      setWithdrawals(withdrawalsData.withdrawals);
+      setWithdrawalsCursor(withdrawalsData.next_cursor || null);
       setWithdrawalStats(withdrawalStatsData);
       setMinWithdrawalAmount(settingsData.minimum_withdrawal_amount);
       setMinWithdrawalInput(String(settingsData.minimum_withdrawal_amount));
@@ -337,6 +339,21 @@ const AdminDashboard: React.FC = () => {
   };
 
   // Withdrawal Actions
+  const loadWithdrawals = async (status: string, cursor?: string | null) => {
+    const page = await withdrawalAPI.getWithdrawalQueue(status, cursor);
+    setWithdrawals(prev => cursor ? [...prev, ...page.withdrawals] : page.withdrawals);
+    setWithdrawalsCursor(page.next_cursor || null);
+  };
+
+  const handleWithdrawalStatusFilter = async (status: string) => {
+    setWithdrawalFilter({ ...withdrawalFilter, status });
+    try {
+      await loadWithdrawals(status);
+    } catch {
+      showMessage('error', 'Failed to load withdrawals');
+    }
+  };
+
   const handleUpdateWithdrawal = async (withdrawalId: string, status: 'approved' | 'rejected' | 'completed') => {
     setActionLoading(withdrawalId);
     try {
@@ -347,11 +364,10 @@ const AdminDashboard: React.FC = () => {
       });
 
       // Refresh data
-      const [withdrawalsData, withdrawalStatsData] = await Promise.all([
-        withdrawalAPI.getAllWithdrawals(),
+      const [, withdrawalStatsData] = await Promise.all([
+        loadWithdrawals(withdrawalFilter.status),
         withdrawalAPI.getWithdrawalStats()
       ]);
-      setWithdrawals(withdrawalsData);
       setWithdrawalStats(withdrawalStatsData);
       setSelectedWithdrawal(null);
       setWithdrawalNotes('');
@@ -422,7 +438,6 @@ const AdminDashboard: React.FC = () => {
   });
 
   const filteredWithdrawals = withdrawals.filter(w => {
-    if (withdrawalFilter.status && w.status !== withdrawalFilter.status) return false;
     if (withdrawalFilter.search) {
       const search = withdrawalFilter.search.toLowerCase();
       if (!w.tutor_name?.toLowerCase().includes(search) && !w.tutor_email?.toLowerCase().includes(search)) return false;
@@ -1235,7 +1250,7 @@ const AdminDashboard: React.FC = () => {
               </div>
               <select
                 value={withdrawalFilter.status}
-                onChange={(e) => setWithdrawalFilter({ ...withdrawalFilter, status: e.target.value })}
+                onChange={(e) => handleWithdrawalStatusFilter(e.target.value)}
                 className="px-4 py-2 border border-gray-200 rounded-xl focus:outline-none focus:ring-2 focus:ring-primary-500 bg-white"
               >
                 <option value="">All Status</option>
@@ -1425,6 +1440,16 @@ const AdminDashboard: React.FC = () => {
                   No withdrawal requests found
                 </div>
               )}
+              {withdrawalsCursor && (
+                <div className="p-4 text-center border-t border-gray-100">
+                  <button
+                    onClick={() => loadWithdrawals(withdrawalFilter.status, withdrawalsCursor).catch(() => showMessage('error', 'Failed to load withdrawals'))}
+                    className="px-4 py-2 text-primary-600 hover:bg-primary-50 rounded-lg transition-colors font-medium text-sm"
+                  >
+                    Load more
+                  </button>
+                </div>
+              )}
             </div>
           </motion.div>
         )}
@@ -741,6 +741,11 @@ export interface WithdrawalResponse {
   processed_at?: string;
 }
 
+export interface WithdrawalPage {
+  withdrawals: WithdrawalResponse[];
+  next_cursor?: string | null;
+}
+
 export interface WithdrawalStats {
   pending_count: number;
   pending_amount: number;
@@ -809,8 +814,21 @@ export const withdrawalAPI = {
   },
 
   // Admin endpoints
-  getAllWithdrawals: async (status?: string): Promise<WithdrawalResponse[]> => {
-    const response = await api.get('/withdrawals/admin/all', { params: status ? { status } : {} });
+  getAllWithdrawals: async (status?: string, limit?: number): Promise<WithdrawalResponse[]> => {
+    const response = await api.get('/withdrawals/admin/all', { params: { ...(status ? { status } : {}), ...(limit ? { limit } : {}) } });
+    return response.data;
+  },
+
+  // Newest first; an empty status lists every request
+  getWithdrawalQueue: async (status?: string, cursor?: string | null, limit = 50): Promise<WithdrawalPage> => {
+    const response = await api.get('/withdrawals/admin/queue', {
+      params: {
+        order: 'desc',
+        limit,
+        ...(status ? { status } : { all_statuses: true }),
+        ...(cursor ? { cursor } : {}),
+      },
+    });
     return response.data;
   },
 